@@ -0,0 +1,182 @@
+# can_encoder.py
+import struct
+from typing import Dict, Any, List
+import can
+from can_vss_converter import CANMessageDefinition, CANSignalType, can_fd_length, motorola_lsb, multiplexer_of
+
+_F32 = struct.Struct("<f")
+_F64 = struct.Struct("<d")
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+
+class CANMessageEncoder:
+    """
+    Encodes signal values into CAN frames; the inverse of extract_signal_from_data
+
+    Each message definition is compiled once into a pack plan and a reusable
+    can.Message whose data buffer is rewritten in place on every encode.
+    """
+
+    def __init__(self, message_definitions: Dict[int, CANMessageDefinition]):
+        """
+        Initialize encoder
+
+        Args:
+            message_definitions: CAN ID to message definition mapping (kept by
+                                 reference, so later additions are picked up)
+        """
+        self.message_definitions = message_definitions
+        # CAN ID -> (message definition, pack plan, reusable message, mux)
+        # mux is (multiplexer name, mux value -> pack plan) or None
+        self._compiled: Dict[int, tuple] = {}
+        # Integer signals skipped because their value was NaN (logged once each)
+        self.nan_skipped = 0
+        self._nan_signals = set()
+
+    def _compile(self, msg_def: CANMessageDefinition) -> tuple:
+        """Compile a message definition into a pack plan and frame buffer"""
+        plan = []
+        pages: Dict[int, list] = {}
+        for signal_name, signal_def in msg_def.signals.items():
+            signal_type = signal_def.signal_type
+            mask = (1 << signal_def.bit_length) - 1
+            if signal_type in (CANSignalType.INT8, CANSignalType.INT16, CANSignalType.INT32):
+                raw_min, raw_max = -(1 << (signal_def.bit_length - 1)), mask >> 1
+            else:
+                raw_min, raw_max = 0, mask
+
+            big_endian = signal_def.byte_order == "big_endian"
+            if big_endian:
+                # Bit offset from the LSB of the payload read as a big-endian integer
+                shift = msg_def.dlc * 8 - 1 - motorola_lsb(signal_def.start_bit, signal_def.bit_length)
+                if shift < 0:
+                    raise ValueError(f"Signal {signal_name} does not fit in {msg_def.dlc} bytes")
+            else:
+                shift = signal_def.start_bit
+                if shift + signal_def.bit_length > msg_def.dlc * 8:
+                    raise ValueError(f"Signal {signal_name} does not fit in {msg_def.dlc} bytes")
+
+            if signal_type == CANSignalType.FLOAT32:
+                to_bits = lambda value: _U32.unpack(_F32.pack(value))[0]
+            elif signal_type == CANSignalType.FLOAT64:
+                to_bits = lambda value: _U64.unpack(_F64.pack(value))[0]
+            else:
+                to_bits = None
+
+            entry = (
+                signal_name,
+                shift,
+                mask,
+                raw_min,
+                raw_max,
+                signal_type == CANSignalType.BOOLEAN,
+                to_bits,
+                big_endian,
+                signal_def.scale,
+                signal_def.offset,
+                signal_def.min_val,
+                signal_def.max_val,
+            )
+            if signal_def.mux_value is None:
+                plan.append(entry)
+            else:
+                pages.setdefault(signal_def.mux_value, []).append(entry)
+
+        # Multiplexed: each page plan packs the common signals plus that page's
+        multiplexer = multiplexer_of(msg_def)
+        mux = None
+        if multiplexer is not None:
+            mux = (multiplexer.name, {mux_value: plan + page for mux_value, page in pages.items()})
+
+        is_fd = msg_def.is_fd or msg_def.dlc > 8
+        msg = can.Message(
+            arbitration_id=msg_def.can_id,
+            data=bytearray(can_fd_length(msg_def.dlc) if is_fd else msg_def.dlc),
+            is_extended_id=msg_def.is_extended,
+            is_fd=is_fd,
+            bitrate_switch=is_fd and msg_def.bitrate_switch
+        )
+        compiled = (msg_def, plan, msg, mux)
+        self._compiled[msg_def.can_id] = compiled
+        return compiled
+
+    def encode(self, can_id: int, values: Dict[str, Any]) -> can.Message:
+        """
+        Pack signal values into the frame of a CAN ID
+
+        Signals missing from values are encoded as raw 0. Infinite values
+        of integer signals clamp to the raw range; NaN leaves the signal at
+        raw 0 and is logged once per signal. For a multiplexed
+        message only the page selected by the multiplexer value in values is
+        packed. The returned message is reused by the next encode of the same
+        CAN ID.
+
+        Args:
+            can_id: CAN ID of a defined message
+            values: Signal name to physical value
+
+        Returns:
+            CAN message with the packed payload
+        """
+        msg_def = self.message_definitions[can_id]
+        compiled = self._compiled.get(can_id)
+        if compiled is None or compiled[0] is not msg_def:
+            compiled = self._compile(msg_def)
+        _, plan, msg, mux = compiled
+        if mux is not None:
+            mux_value = values.get(mux[0])
+            if mux_value is not None:
+                plan = mux[1].get(int(mux_value), plan)
+
+        payload = 0
+        payload_be = 0
+        for (name, shift, mask, raw_min, raw_max, is_bool, to_bits, big_endian,
+             scale, offset, min_val, max_val) in plan:
+            value = values.get(name)
+            if value is None:
+                continue
+            if is_bool:
+                raw = 1 if value else 0
+            else:
+                if min_val is not None and value < min_val:
+                    value = min_val
+                if max_val is not None and value > max_val:
+                    value = max_val
+                if to_bits is not None:
+                    raw = to_bits((value - offset) / scale)
+                else:
+                    # Clamp before rounding: round() fails on inf and NaN
+                    scaled = (value - offset) / scale
+                    if scaled <= raw_min:
+                        raw = raw_min
+                    elif scaled >= raw_max:
+                        raw = raw_max
+                    elif scaled == scaled:
+                        raw = int(round(scaled))
+                    else:
+                        self.nan_skipped += 1
+                        if name not in self._nan_signals:
+                            self._nan_signals.add(name)
+                            print(f"CAN 0x{can_id:X}: signal {name} is NaN, not encoded")
+                        continue
+            if big_endian:
+                payload_be |= (raw & mask) << shift
+            else:
+                payload |= (raw & mask) << shift
+
+        if payload_be:
+            payload |= int.from_bytes(payload_be.to_bytes(msg_def.dlc, "big"), "little")
+        msg.data[:msg_def.dlc] = payload.to_bytes(msg_def.dlc, "little")
+        return msg
+
+    def encode_many(self, values_by_id: Dict[int, Dict[str, Any]]) -> List[can.Message]:
+        """
+        Encode several messages
+
+        Args:
+            values_by_id: CAN ID to signal values
+
+        Returns:
+            List of CAN messages
+        """
+        return [self.encode(can_id, values) for can_id, values in values_by_id.items()]
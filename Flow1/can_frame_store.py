@@ -0,0 +1,162 @@
+# can_frame_store.py
+import threading
+from typing import List, Optional, Tuple
+import numpy as np
+import can
+
+# Bits of the per-frame flags column
+FLAG_EXTENDED_ID = 0x01
+FLAG_FD = 0x02
+FLAG_BRS = 0x04
+FLAG_REMOTE = 0x08
+
+class CanFrameStore:
+    """
+    Columnar ring buffer of CAN frames backed by preallocated NumPy arrays
+
+    Frames are stored as a float64 timestamp, uint32 id, uint8 dlc, uint8
+    flags and a fixed-size payload row instead of can.Message objects. It
+    behaves like the list/deque RX buffers it replaces: append(), len(),
+    iteration (yielding can.Message objects built on demand) and clear().
+    When full, the oldest frame is overwritten. Payloads longer than
+    payload_size (CAN FD frames in an 8-byte store) are cut to payload_size
+    and their dlc clamped to match; such frames are counted in truncated.
+
+    It is safe to append from a receive thread (e.g. a can.Notifier) while
+    other threads read: every method holds lock, and readers copy the rows
+    they return. Hold lock yourself to combine several reads consistently.
+    """
+
+    def __init__(self, capacity: int = 100000, payload_size: int = 8):
+        """
+        Initialize frame store
+
+        Args:
+            capacity: Maximum number of frames held
+            payload_size: Bytes stored per frame (8 for classic CAN, 64 for CAN FD)
+        """
+        self.capacity = capacity
+        self.payload_size = payload_size
+
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.ids = np.zeros(capacity, dtype=np.uint32)
+        self.dlcs = np.zeros(capacity, dtype=np.uint8)
+        self.flags = np.zeros(capacity, dtype=np.uint8)
+        self.payloads = np.zeros((capacity, payload_size), dtype=np.uint8)
+
+        # Memoryviews make scalar writes in append() cheap
+        self._ts_view = memoryview(self.timestamps)
+        self._id_view = memoryview(self.ids)
+        self._dlc_view = memoryview(self.dlcs)
+        self._flag_view = memoryview(self.flags)
+        self._payload_view = memoryview(self.payloads).cast("B")
+        self._zeros = bytes(payload_size)
+
+        self.lock = threading.RLock()
+        self._head = 0  # total frames ever appended
+        self._tail = 0  # sequence number of the oldest frame not cleared
+        self.dropped = 0
+        self.truncated = 0
+
+    def append(self, msg: can.Message):
+        """Store one CAN message, overwriting the oldest frame when full"""
+        flags = (
+            (FLAG_EXTENDED_ID if msg.is_extended_id else 0)
+            | (FLAG_FD if msg.is_fd else 0)
+            | (FLAG_BRS if msg.bitrate_switch else 0)
+            | (FLAG_REMOTE if msg.is_remote_frame else 0)
+        )
+        data = msg.data
+        size = self.payload_size
+        n = len(data)
+        dlc = msg.dlc
+        truncated = n > size
+        if truncated:
+            n = dlc = size
+
+        with self.lock:
+            head = self._head
+            i = head % self.capacity
+            if head - self._tail >= self.capacity:
+                self._tail += 1
+                self.dropped += 1
+
+            self._ts_view[i] = msg.timestamp
+            self._id_view[i] = msg.arbitration_id
+            self._dlc_view[i] = dlc
+            if truncated:
+                self.truncated += 1
+            self._flag_view[i] = flags
+
+            offset = i * size
+            self._payload_view[offset:offset + n] = data[:n]
+            if n < size:
+                self._payload_view[offset + n:offset + size] = self._zeros[n:]
+
+            self._head = head + 1
+
+    def clear(self):
+        """Drop all stored frames"""
+        with self.lock:
+            self._tail = self._head
+
+    def __len__(self) -> int:
+        return self._head - self._tail
+
+    def _indices(self) -> np.ndarray:
+        """Physical row indices of stored frames, oldest first"""
+        return np.arange(self._tail, self._head) % self.capacity
+
+    def _message(self, i: int) -> can.Message:
+        flags = int(self.flags[i])
+        dlc = int(self.dlcs[i])
+        return can.Message(
+            timestamp=float(self.timestamps[i]),
+            arbitration_id=int(self.ids[i]),
+            is_extended_id=bool(flags & FLAG_EXTENDED_ID),
+            is_remote_frame=bool(flags & FLAG_REMOTE),
+            is_fd=bool(flags & FLAG_FD),
+            bitrate_switch=bool(flags & FLAG_BRS),
+            dlc=dlc,
+            data=self.payloads[i, :min(dlc, self.payload_size)].tobytes()
+        )
+
+    def __iter__(self):
+        # Messages are built under the lock, so the appender cannot overwrite rows mid-read
+        with self.lock:
+            messages = [self._message(int(i)) for i in self._indices()]
+        return iter(messages)
+
+    def __getitem__(self, index: int) -> can.Message:
+        with self.lock:
+            length = len(self)
+            if index < 0:
+                index += length
+            if not 0 <= index < length:
+                raise IndexError("frame index out of range")
+            return self._message((self._tail + index) % self.capacity)
+
+    def get_by_id(self, can_id: int) -> List[can.Message]:
+        """Get stored messages of specific CAN ID, oldest first"""
+        with self.lock:
+            indices = self._indices()
+            return [self._message(int(i)) for i in indices[self.ids[indices] == can_id]]
+
+    def latest(self, can_id: int) -> Optional[can.Message]:
+        """Get latest stored message of specific CAN ID"""
+        with self.lock:
+            indices = self._indices()
+            matches = indices[self.ids[indices] == can_id]
+            return self._message(int(matches[-1])) if len(matches) else None
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get stored frames as columns, oldest first
+
+        Returns:
+            Tuple (timestamps, ids, dlcs, payloads) of array copies
+        """
+        with self.lock:
+            indices = self._indices()
+            return (self.timestamps[indices], self.ids[indices],
+                    self.dlcs[indices], self.payloads[indices])
@@ -0,0 +1,119 @@
+# can_rx_queue.py
+import threading
+from collections import deque
+from enum import Enum
+from typing import Dict, List, Optional
+import can
+
+class OverflowPolicy(Enum):
+    """What CanRxQueue does with a frame when it is full"""
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    LATEST_PER_ID = "latest_per_id"
+
+class CanRxQueue:
+    """
+    Bounded, thread-safe queue between the CAN notifier and its consumer
+
+    The notifier thread calls put(); the consumer calls drain(), which
+    removes queued frames atomically so nothing that arrives while a batch
+    is being processed can be lost to a clear().
+    """
+
+    def __init__(self, capacity: int = 10000, policy=OverflowPolicy.DROP_OLDEST):
+        """
+        Initialize RX queue
+
+        Args:
+            capacity: Maximum number of queued frames (distinct CAN IDs for LATEST_PER_ID)
+            policy: OverflowPolicy or its string value
+        """
+        self.capacity = capacity
+        self.policy = OverflowPolicy(policy)
+        self.lock = threading.Lock()
+
+        # LATEST_PER_ID keeps one frame per CAN ID, in first-arrival order
+        if self.policy == OverflowPolicy.LATEST_PER_ID:
+            self._frames: Dict[int, can.Message] = {}
+        else:
+            self._frames = deque()
+
+        # Statistics
+        self.stats = {
+            "received": 0,
+            "drained": 0,
+            "dropped": 0,
+            "coalesced": 0,
+            "high_watermark": 0
+        }
+
+    def put(self, msg: can.Message) -> bool:
+        """
+        Queue one frame according to the overflow policy
+
+        Returns:
+            False if the frame was dropped
+        """
+        with self.lock:
+            stats = self.stats
+            stats["received"] += 1
+            frames = self._frames
+
+            if self.policy == OverflowPolicy.LATEST_PER_ID:
+                if msg.arbitration_id in frames:
+                    stats["coalesced"] += 1
+                elif len(frames) >= self.capacity:
+                    stats["dropped"] += 1
+                    return False
+                frames[msg.arbitration_id] = msg
+            elif len(frames) < self.capacity:
+                frames.append(msg)
+            elif self.policy == OverflowPolicy.DROP_OLDEST:
+                frames.popleft()
+                frames.append(msg)
+                stats["dropped"] += 1
+            else:
+                stats["dropped"] += 1
+                return False
+
+            if len(frames) > stats["high_watermark"]:
+                stats["high_watermark"] = len(frames)
+            return True
+
+    def __call__(self, msg: can.Message):
+        """Allow the queue itself to be registered as a can.Notifier listener"""
+        if msg:
+            self.put(msg)
+
+    def drain(self, max_items: Optional[int] = None) -> List[can.Message]:
+        """
+        Remove and return queued frames, oldest first
+
+        Args:
+            max_items: Upper bound on frames returned (all if None)
+        """
+        with self.lock:
+            frames = self._frames
+            if self.policy == OverflowPolicy.LATEST_PER_ID:
+                if max_items is None or max_items >= len(frames):
+                    batch = list(frames.values())
+                    frames.clear()
+                else:
+                    keys = list(frames)[:max_items]
+                    batch = [frames.pop(key) for key in keys]
+            elif max_items is None or max_items >= len(frames):
+                batch = list(frames)
+                frames.clear()
+            else:
+                batch = [frames.popleft() for _ in range(max_items)]
+
+            self.stats["drained"] += len(batch)
+            return batch
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def get_statistics(self) -> Dict[str, int]:
+        """Get queue statistics"""
+        with self.lock:
+            return self.stats.copy()
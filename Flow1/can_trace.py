@@ -0,0 +1,276 @@
+# can_trace.py
+import asyncio
+import struct
+import threading
+import time
+from typing import Dict, Iterator, Optional, Tuple
+import numpy as np
+import can
+from can_frame_store import FLAG_BRS, FLAG_EXTENDED_ID, FLAG_FD, FLAG_REMOTE
+
+# File layout: 16-byte header, then fixed-size little-endian records
+#   header: magic (8s), version (u16), payload_size (u16), reserved (u32)
+#   record: timestamp (f64), id (u32), dlc (u8), flags (u8), reserved (u16), payload
+TRACE_MAGIC = b"CANTRACE"
+TRACE_VERSION = 1
+_HEADER = struct.Struct("<8sHHI")
+
+def record_dtype(payload_size: int) -> np.dtype:
+    """NumPy dtype of one trace record"""
+    return np.dtype([
+        ("timestamp", "<f8"),
+        ("id", "<u4"),
+        ("dlc", "u1"),
+        ("flags", "u1"),
+        ("reserved", "<u2"),
+        ("payload", "u1", (payload_size,)),
+    ])
+
+class CanTraceWriter:
+    """
+    Appends CAN frames to a binary trace file
+
+    Frames are packed into a preallocated buffer with one struct call each
+    and written in blocks. The writer is a plain callable, so it can be
+    added to a can.Notifier next to other listeners.
+    """
+
+    def __init__(self, path: str, payload_size: int = 8, buffer_frames: int = 4096):
+        """
+        Initialize writer (creates or truncates the file)
+
+        Args:
+            path: Trace file path
+            payload_size: Bytes stored per frame (8 for classic CAN, 64 for CAN FD)
+            buffer_frames: Frames packed in memory before each file write
+        """
+        self.path = path
+        self.payload_size = payload_size
+        self._record = struct.Struct(f"<dIBBH{payload_size}s")
+        self._buffer = bytearray(self._record.size * buffer_frames)
+        self._buffer_frames = buffer_frames
+        self._pos = 0
+        self._lock = threading.Lock()
+        self.frames_written = 0
+        self.truncated = 0
+
+        self._file = open(path, "wb")
+        self._file.write(_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, payload_size, 0))
+
+    def write(self, msg: can.Message):
+        """Append one frame; data beyond payload_size is cut and counted in truncated"""
+        flags = (
+            (FLAG_EXTENDED_ID if msg.is_extended_id else 0)
+            | (FLAG_FD if msg.is_fd else 0)
+            | (FLAG_BRS if msg.bitrate_switch else 0)
+            | (FLAG_REMOTE if msg.is_remote_frame else 0)
+        )
+        dlc = msg.dlc
+        truncated = len(msg.data) > self.payload_size
+        if truncated:
+            dlc = self.payload_size
+        with self._lock:
+            self._record.pack_into(
+                self._buffer, self._pos * self._record.size,
+                msg.timestamp, msg.arbitration_id, dlc, flags, 0, bytes(msg.data)
+            )
+            if truncated:
+                self.truncated += 1
+            self._pos += 1
+            self.frames_written += 1
+            if self._pos == self._buffer_frames:
+                self._write_buffer()
+
+    __call__ = write
+
+    def write_store(self, store):
+        """
+        Append every frame of a CanFrameStore, oldest first, in one block
+
+        Args:
+            store: CanFrameStore with a payload size not above this trace's
+        """
+        with store.lock:
+            timestamps, ids, dlcs, payloads = store.arrays()
+            flags = store.flags[store._indices()]
+        records = np.zeros(len(ids), dtype=record_dtype(self.payload_size))
+        records["timestamp"] = timestamps
+        records["id"] = ids
+        # dlc never claims more bytes than the trace row holds
+        records["dlc"] = np.minimum(dlcs, self.payload_size)
+        records["flags"] = flags
+        width = min(payloads.shape[1], self.payload_size)
+        records["payload"][:, :width] = payloads[:, :width]
+        with self._lock:
+            self._write_buffer()
+            self._file.write(records.tobytes())
+            self.frames_written += len(records)
+            self.truncated += int(np.count_nonzero(dlcs > self.payload_size))
+
+    def _write_buffer(self):
+        if self._pos:
+            self._file.write(memoryview(self._buffer)[:self._pos * self._record.size])
+            self._pos = 0
+
+    def flush(self):
+        """Write buffered frames to the file"""
+        with self._lock:
+            self._write_buffer()
+            self._file.flush()
+
+    def close(self):
+        """Flush and close the file; stop the notifier feeding this writer first"""
+        with self._lock:
+            if self._file.closed:
+                return
+            self._write_buffer()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class CanTrace:
+    """
+    Read-only, memory-mapped view of a trace file
+
+    records is a NumPy structured array over the file itself; nothing is
+    loaded until accessed, so captures larger than memory can be sliced
+    and decoded directly.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open trace file
+
+        Args:
+            path: Trace file written by CanTraceWriter
+        """
+        with open(path, "rb") as f:
+            magic, version, payload_size, _ = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != TRACE_MAGIC:
+            raise ValueError(f"{path} is not a CAN trace file")
+        if version != TRACE_VERSION:
+            raise ValueError(f"Unsupported CAN trace version {version}")
+
+        self.path = path
+        self.payload_size = payload_size
+        dtype = record_dtype(payload_size)
+        count = (self._file_size(path) - _HEADER.size) // dtype.itemsize
+        if count:
+            self.records = np.memmap(path, dtype=dtype, mode="r", offset=_HEADER.size, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=dtype)
+
+    @staticmethod
+    def _file_size(path: str) -> int:
+        with open(path, "rb") as f:
+            return f.seek(0, 2)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def message(self, index: int) -> can.Message:
+        """Build the can.Message of one record"""
+        record = self.records[index]
+        flags = int(record["flags"])
+        dlc = int(record["dlc"])
+        return can.Message(
+            timestamp=float(record["timestamp"]),
+            arbitration_id=int(record["id"]),
+            is_extended_id=bool(flags & FLAG_EXTENDED_ID),
+            is_remote_frame=bool(flags & FLAG_REMOTE),
+            is_fd=bool(flags & FLAG_FD),
+            bitrate_switch=bool(flags & FLAG_BRS),
+            dlc=dlc,
+            data=record["payload"][:min(dlc, self.payload_size)].tobytes()
+        )
+
+    def __iter__(self) -> Iterator[can.Message]:
+        for i in range(len(self.records)):
+            yield self.message(i)
+
+def decode_trace(path: str, converter) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Decode a whole trace offline, one vectorized pass per CAN ID
+
+    Args:
+        path: Trace file
+        converter: CANtoVSSConverter with the message definitions and mappings
+
+    Returns:
+        VSS path to (timestamps, values) arrays in capture order; frames
+        where a multiplexed signal's page was not active are left out
+    """
+    records = CanTrace(path).records
+    ids = records["id"]
+    result = {}
+    for can_id in np.unique(ids):
+        rows = np.flatnonzero(ids == can_id)
+        matrix = records["payload"][rows]
+        timestamps = records["timestamp"][rows]
+        for vss_path, values in converter.convert_frame_matrix(int(can_id), matrix).items():
+            if np.ma.isMaskedArray(values):
+                # Multiplexed signal: keep the frames where its page was active
+                present = ~np.ma.getmaskarray(values)
+                result[vss_path] = (timestamps[present], values.data[present])
+            else:
+                result[vss_path] = (timestamps, values)
+    return result
+
+async def replay_into_converter(path: str, converter, speed: Optional[float] = 1.0,
+                                chunk_size: int = 4096) -> int:
+    """
+    Stream a trace into a CANtoVSSConverter as if it came off the bus
+
+    With a speed, frames are released at their captured timing (2.0 replays
+    twice as fast). With speed=None frames are decoded a chunk at a time,
+    one vectorized pass per CAN ID, and published as fast as possible.
+
+    Args:
+        path: Trace file
+        converter: CANtoVSSConverter (connected, to publish to Kuksa)
+        speed: Timing factor, or None for as fast as possible
+        chunk_size: Frames decoded per chunk when speed is None
+
+    Returns:
+        Number of frames replayed
+    """
+    trace = CanTrace(path)
+    records = trace.records
+    if not len(records):
+        return 0
+
+    if speed is None:
+        for start in range(0, len(records), chunk_size):
+            chunk = records[start:start + chunk_size]
+            ids = chunk["id"]
+            decoded = {}
+            for can_id in np.unique(ids):
+                rows = np.flatnonzero(ids == can_id)
+                arrays = converter.convert_frame_matrix(int(can_id), chunk["payload"][rows])
+                if arrays:
+                    decoded[int(can_id)] = (rows, {p: v.tolist() for p, v in arrays.items()})
+            # Publish in capture order
+            frames = [None] * len(chunk)
+            for rows, values in decoded.values():
+                for k, row in enumerate(rows.tolist()):
+                    # Masked values (inactive mux page) become None in tolist()
+                    frames[row] = {p: v[k] for p, v in values.items() if v[k] is not None}
+            for vss_signals in frames:
+                if vss_signals:
+                    await converter.send_vss_signals(vss_signals)
+            await asyncio.sleep(0)
+        return len(records)
+
+    timestamps = records["timestamp"]
+    t0 = float(timestamps[0])
+    start = time.perf_counter()
+    for i in range(len(records)):
+        delay = (float(timestamps[i]) - t0) / speed - (time.perf_counter() - start)
+        if delay > 0.001:
+            await asyncio.sleep(delay)
+        await converter.process_and_send_can_message(trace.message(i))
+    return len(records)
@@ -0,0 +1,161 @@
+# can_tx_scheduler.py
+import heapq
+import threading
+import time
+from typing import Dict
+import can
+
+def bus_supports_native_periodic(bus) -> bool:
+    """True if the bus backend implements periodic sending itself (e.g. socketcan BCM)"""
+    return type(bus)._send_periodic_internal is not can.BusABC._send_periodic_internal
+
+def _snapshot(msg: can.Message) -> can.Message:
+    """Copy of a message with its own data buffer"""
+    return can.Message(
+        arbitration_id=msg.arbitration_id,
+        data=bytearray(msg.data),
+        is_extended_id=msg.is_extended_id,
+        is_fd=msg.is_fd,
+        bitrate_switch=msg.bitrate_switch
+    )
+
+class CyclicTxScheduler:
+    """
+    Transmits each CAN message at its own CANMessageDefinition.cycle_time
+
+    Callers only update the latest content of a message; the scheduler owns
+    the timing. Backends with native periodic sending get one python-can
+    periodic task per message; all other backends share a single timer
+    thread. Messages without a cycle time are sent immediately.
+    """
+
+    def __init__(self, bus, message_definitions: Dict, use_native=None):
+        """
+        Initialize TX scheduler
+
+        Args:
+            bus: python-can bus
+            message_definitions: CAN ID to CANMessageDefinition mapping
+            use_native: Force native periodic tasks on/off (auto-detect if None)
+        """
+        self.bus = bus
+        self.message_definitions = message_definitions
+        self.use_native = bus_supports_native_periodic(bus) if use_native is None else use_native
+
+        # CAN ID -> latest message content
+        self._latest: Dict[int, can.Message] = {}
+        # Native mode: CAN ID -> python-can periodic task
+        self._tasks = {}
+        # Timer mode: heap of (due time, CAN ID, period)
+        self._heap = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._running = False
+        self._thread = None
+
+        # Statistics
+        self.stats = {
+            "frames_sent": 0,
+            "event_frames_sent": 0,
+            "send_errors": 0
+        }
+
+    def _cycle_time(self, can_id: int) -> float:
+        """Cycle time of a CAN ID in seconds, 0 if not cyclic"""
+        msg_def = self.message_definitions.get(can_id)
+        return msg_def.cycle_time / 1000.0 if msg_def and msg_def.cycle_time else 0.0
+
+    def update(self, msg: can.Message):
+        """
+        Set the content of a message
+
+        Cyclic messages go out at their next cycle with this content; others
+        are sent right away. Cyclic content is copied, so the caller may
+        reuse msg (CANMessageEncoder does) while it is being transmitted.
+        """
+        can_id = msg.arbitration_id
+        period = self._cycle_time(can_id)
+        if not period:
+            self._send(msg)
+            self.stats["event_frames_sent"] += 1
+            return
+
+        first = can_id not in self._latest
+        msg = _snapshot(msg)
+        self._latest[can_id] = msg
+
+        if self.use_native:
+            task = self._tasks.get(can_id)
+            if task is None:
+                self._tasks[can_id] = self.bus.send_periodic(msg, period)
+            else:
+                task.modify_data(msg)
+        elif first:
+            with self._lock:
+                heapq.heappush(self._heap, (time.perf_counter(), can_id, period))
+            self._wakeup.set()
+            self.start()
+
+    def update_many(self, messages):
+        """Set the content of several messages"""
+        for msg in messages:
+            self.update(msg)
+
+    def _send(self, msg: can.Message):
+        try:
+            self.bus.send(msg)
+        except can.CanError as e:
+            self.stats["send_errors"] += 1
+            print("CAN send failed:", e)
+
+    def _run(self):
+        """Single timer thread: send whatever is due, sleep until the next deadline"""
+        while self._running:
+            with self._lock:
+                due, can_id, period = self._heap[0] if self._heap else (None, None, None)
+            if due is None:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            delay = due - time.perf_counter()
+            if delay > 0:
+                # Woken early when a new message is added
+                if self._wakeup.wait(delay):
+                    self._wakeup.clear()
+                continue
+
+            next_due = due + period
+            if next_due < time.perf_counter():
+                # Fell behind by more than a cycle: skip instead of bursting
+                next_due = time.perf_counter() + period
+            with self._lock:
+                heapq.heapreplace(self._heap, (next_due, can_id, period))
+            self._send(self._latest[can_id])
+            self.stats["frames_sent"] += 1
+
+    def start(self):
+        """Start the timer thread (not used with native periodic tasks)"""
+        if self.use_native or self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="can-tx-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop all cyclic transmission"""
+        for task in self._tasks.values():
+            task.stop()
+        self._tasks.clear()
+
+        self._running = False
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._heap.clear()
+        self._latest.clear()
+
+    def get_statistics(self) -> Dict[str, int]:
+        """Get TX statistics"""
+        return self.stats.copy()
@@ -1,12 +1,19 @@
 # can_vss_converter.py
 import asyncio
+import heapq
 import json
+import os
+import struct
+import time
 from typing import Dict, List, Any, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from enum import Enum
+import numpy as np
 import can
 from kuksa_client.grpc import Datapoint
 from kuksa_client.grpc.aio import VSSClient
+from kuksa_connection import acquire_connection, release_connection
+from kuksa_writer import KuksaBatchWriter
 
 class CANSignalType(Enum):
     """Type of CAN signal"""
@@ -17,7 +24,9 @@ class CANSignalType(Enum):
     INT8 = "int8"
     INT16 = "int16"
     INT32 = "int32"
-    FLOAT = "float"
+    FLOAT = "float"  # scaled integer returned as float
+    FLOAT32 = "float32"  # IEEE-754 single precision
+    FLOAT64 = "float64"  # IEEE-754 double precision
 
 @dataclass
 class CANSignalDefinition:
@@ -32,6 +41,12 @@ class CANSignalDefinition:
     max_val: Optional[float] = None
     unit: str = ""
     description: str = ""
+    byte_order: str = "little_endian"  # "big_endian" (Motorola): start_bit is the MSB, DBC numbering
+    multiplexer: bool = False  # selects the active mux page of the message
+    mux_value: Optional[int] = None  # only present when the multiplexer has this value
+    deadband: float = 0.0  # absolute change needed to republish
+    deadband_rel: float = 0.0  # change relative to the last published value
+    max_silence: Optional[float] = None  # seconds; None uses the converter default
 
 @dataclass
 class CANMessageDefinition:
@@ -42,23 +57,394 @@ class CANMessageDefinition:
     signals: Dict[str, CANSignalDefinition]
     cycle_time: int = 0  # in ms
     description: str = ""
+    is_fd: bool = False  # CAN FD frame; implied when dlc > 8
+    bitrate_switch: bool = False  # CAN FD data phase at the higher bitrate (BRS)
+    is_extended: bool = False  # 29-bit identifier; implied when can_id > 0x7FF
+    
+    def __post_init__(self):
+        if self.can_id > 0x7FF:
+            self.is_extended = True
+
+# Payload lengths a CAN FD frame can carry
+CAN_FD_LENGTHS = (0, 1, 2, 3, 4, 5, 6, 7, 8, 12, 16, 20, 24, 32, 48, 64)
+
+def can_fd_length(size: int) -> int:
+    """Smallest CAN FD payload length that holds size bytes"""
+    for length in CAN_FD_LENGTHS:
+        if length >= size:
+            return length
+    raise ValueError(f"{size} bytes exceed the 64-byte CAN FD payload")
+
+def pack_fd_message(can_id: int, name: str, messages: List[CANMessageDefinition],
+                    bitrate_switch: bool = True) -> CANMessageDefinition:
+    """
+    Pack several classic message layouts into one CAN FD message definition
+
+    Each source message keeps its own layout in consecutive byte slots of
+    the FD payload (first message at byte 0, the next after its dlc, ...),
+    so one FD frame carries what used to take one frame per message. The
+    cycle time is the shortest non-zero one of the sources.
+
+    Args:
+        can_id: CAN ID of the FD message
+        name: Name of the FD message
+        messages: Source message definitions; signal names must be unique
+        bitrate_switch: Send the data phase at the higher bitrate
+
+    Returns:
+        CAN FD message definition
+    """
+    signals = {}
+    slot = 0
+    for msg_def in messages:
+        for signal_name, signal_def in msg_def.signals.items():
+            if signal_name in signals:
+                raise ValueError(f"Signal {signal_name} appears in more than one packed message")
+            signals[signal_name] = replace(signal_def, start_bit=signal_def.start_bit + 8 * slot)
+        slot += msg_def.dlc
+
+    cycle_times = [msg_def.cycle_time for msg_def in messages if msg_def.cycle_time]
+    return CANMessageDefinition(
+        can_id=can_id,
+        name=name,
+        dlc=can_fd_length(slot),
+        signals=signals,
+        cycle_time=min(cycle_times) if cycle_times else 0,
+        description="Packed " + ", ".join(f"0x{m.can_id:X}" for m in messages),
+        is_fd=True,
+        bitrate_switch=bitrate_switch
+    )
+
+# Full-match masks of standard (11-bit) and extended (29-bit) CAN IDs
+_STANDARD_MASK = 0x7FF
+_EXTENDED_MASK = 0x1FFFFFFF
+
+def build_can_filters(can_ids, max_filters: Optional[int] = None,
+                      extended_ids=()) -> List[Dict[str, Any]]:
+    """
+    Build python-can acceptance filters that pass the given CAN IDs
+
+    Each ID starts as an exact-match filter. With max_filters, the IDs are
+    sorted and the pair of neighbouring filters whose merge keeps the most
+    mask bits is merged repeatedly (mask keeps only the bits on which both
+    agree), so the result may also pass a few neighbouring IDs; those are
+    still dropped by the decoder. Pairs are kept in a heap, so this is
+    O(n log n) even for a full DBC. IDs above 0x7FF are always extended.
+
+    Args:
+        can_ids: CAN IDs to receive
+        max_filters: Upper bound on the number of filters (None = one per ID)
+        extended_ids: IDs up to 0x7FF that are 29-bit identifiers
+
+    Returns:
+        List of {"can_id", "can_mask", "extended"} dicts for can.Bus(can_filters=...)
+    """
+    keys = sorted({(can_id > _STANDARD_MASK or can_id in extended_ids, can_id) for can_id in can_ids})
+    filters = [[can_id, _EXTENDED_MASK if extended else _STANDARD_MASK, extended]
+               for extended, can_id in keys]
+
+    count = len(filters)
+    limit = max(max_filters, 1) if max_filters else count
+    if count > limit:
+        # Doubly linked list over the sorted filters; a heap entry is stale
+        # once either side has been merged since it was pushed
+        next_of = list(range(1, count)) + [None]
+        prev_of = [None] + list(range(count - 1))
+        version = [0] * count
+        alive = [True] * count
+        heap = []
+
+        def push(i):
+            j = next_of[i]
+            if j is None or filters[i][2] != filters[j][2]:
+                return
+            mask = filters[i][1] & filters[j][1] & ~(filters[i][0] ^ filters[j][0])
+            heapq.heappush(heap, (-bin(mask).count("1"), i, j, version[i], version[j], mask))
+
+        for i in range(count):
+            push(i)
+        while count > limit and heap:
+            _, i, j, version_i, version_j, mask = heapq.heappop(heap)
+            if not (alive[i] and alive[j]) or version[i] != version_i or version[j] != version_j:
+                continue
+            filters[i] = [filters[i][0] & mask, mask, filters[i][2]]
+            version[i] += 1
+            alive[j] = False
+            next_of[i] = next_of[j]
+            if next_of[j] is not None:
+                prev_of[next_of[j]] = i
+            count -= 1
+            if prev_of[i] is not None:
+                push(prev_of[i])
+            push(i)
+        # heap runs dry when only one standard and one extended filter are left
+        filters = [f for f, keep in zip(filters, alive) if keep]
+
+    return [{"can_id": can_id, "can_mask": mask, "extended": extended}
+            for can_id, mask, extended in filters]
+
+# Decode kinds used by compiled signal plans (resolved once, not per frame)
+_KIND_BOOL = 0
+_KIND_NUMERIC = 1
+_KIND_FLOAT32 = 2
+_KIND_FLOAT64 = 3
+
+_FLOAT_KINDS = {CANSignalType.FLOAT32: (_KIND_FLOAT32, 32), CANSignalType.FLOAT64: (_KIND_FLOAT64, 64)}
+_F32 = struct.Struct("<f")
+_F64 = struct.Struct("<d")
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+
+def float_from_bits(bits: int, kind: int) -> float:
+    """Reinterpret the raw bits of an IEEE-754 signal as a float"""
+    if kind == _KIND_FLOAT32:
+        return _F32.unpack(_U32.pack(bits))[0]
+    return _F64.unpack(_U64.pack(bits))[0]
+
+def motorola_lsb(start_bit: int, bit_length: int) -> int:
+    """
+    Position of the least significant bit of a big-endian (Motorola) signal
+
+    start_bit is the signal's MSB in DBC numbering (bit 7 of byte 0 is the
+    first bit on the wire). The result counts bits from the MSB of byte 0,
+    i.e. bit positions in the payload read as one big-endian integer.
+    """
+    msb = (start_bit // 8) * 8 + 7 - start_bit % 8
+    return msb + bit_length - 1
+
+def compile_signal(signal_def: CANSignalDefinition) -> tuple:
+    """
+    Compile a signal definition into a flat decode tuple
+
+    The tuple layout is (need_byte, shift, mask, sign_bit, kind, scale,
+    offset, min_val, max_val, big_endian, unpack). need_byte is the byte that
+    must be present to decode. shift is the bit offset in the little-endian
+    payload integer; for big-endian signals it is one past the LSB position
+    in the big-endian payload integer (see motorola_lsb). Byte-aligned IEEE
+    floats get a struct unpack_from in unpack and their byte offset in shift.
+    sign_bit is 0 for unsigned signals.
+
+    Args:
+        signal_def: Signal definition
+
+    Returns:
+        Decode tuple for the signal
+    """
+    signal_type = signal_def.signal_type
+    start_bit = signal_def.start_bit
+    bit_length = signal_def.bit_length
+    big_endian = signal_def.byte_order == "big_endian"
+    mask = (1 << bit_length) - 1
+    sign_bit = 0
+    if signal_type in (CANSignalType.INT8, CANSignalType.INT16, CANSignalType.INT32):
+        sign_bit = 1 << (bit_length - 1)
+
+    kind = _KIND_BOOL if signal_type == CANSignalType.BOOLEAN else _KIND_NUMERIC
+    scale = signal_def.scale
+    offset = signal_def.offset
+    if signal_type == CANSignalType.FLOAT:
+        # Float signals are scaled integers returned as float
+        scale = float(scale)
+        offset = float(offset)
+    min_val = signal_def.min_val
+    max_val = signal_def.max_val
+
+    if big_endian:
+        lsb = motorola_lsb(start_bit, bit_length)
+        need_byte = lsb // 8
+        shift = lsb + 1
+    else:
+        need_byte = start_bit // 8
+        shift = start_bit
+
+    unpack = None
+    if signal_type in _FLOAT_KINDS:
+        kind, width = _FLOAT_KINDS[signal_type]
+        if bit_length != width:
+            raise ValueError(f"Signal {signal_def.name}: {signal_type.value} needs {width} bits")
+        if start_bit % 8 == (7 if big_endian else 0):
+            # Byte-aligned: unpack straight from the payload
+            first_byte = start_bit // 8
+            code = "f" if width == 32 else "d"
+            unpack = struct.Struct((">" if big_endian else "<") + code).unpack_from
+            shift = first_byte
+            need_byte = first_byte + width // 8 - 1
+
+    return (
+        need_byte,
+        shift,
+        mask,
+        sign_bit,
+        kind,
+        scale,
+        offset,
+        min_val,
+        max_val,
+        big_endian,
+        unpack,
+    )
+
+def multiplexer_of(msg_def: CANMessageDefinition) -> Optional[CANSignalDefinition]:
+    """Multiplexer signal of a message, or None if it is not multiplexed"""
+    for signal_def in msg_def.signals.values():
+        if signal_def.multiplexer:
+            return signal_def
+    return None
+
+def compile_multiplexer(signal_def: CANSignalDefinition) -> tuple:
+    """Decode tuple yielding the raw multiplexer value (no scaling or limits)"""
+    return compile_signal(replace(
+        signal_def, signal_type=CANSignalType.UINT32, scale=1, offset=0, min_val=None, max_val=None
+    ))
+
+def decode_signal(data: bytes, compiled: tuple, raw: Optional[int] = None) -> Any:
+    """
+    Decode one compiled signal from a payload
+
+    Args:
+        data: Payload bytes
+        compiled: Tuple from compile_signal
+        raw: data as a little-endian integer, if already computed
+
+    Returns:
+        Decoded value, or None if the payload is too short
+    """
+    need_byte, shift, mask, sign_bit, kind, scale, offset, min_val, max_val, big_endian, unpack = compiled
+    size = len(data)
+    if need_byte >= size:
+        return None
+
+    if unpack is not None:
+        value = unpack(data, shift)[0]
+    else:
+        if big_endian:
+            value = (int.from_bytes(data, "big") >> (size * 8 - shift)) & mask
+        else:
+            if raw is None:
+                raw = int.from_bytes(data, "little")
+            value = (raw >> shift) & mask
+        if kind == _KIND_BOOL:
+            return bool(value)
+        if kind != _KIND_NUMERIC:
+            value = float_from_bits(value, kind)
+        elif sign_bit and value & sign_bit:
+            value -= mask + 1
+
+    result = (value * scale) + offset
+    if min_val is not None and result < min_val:
+        result = min_val
+    if max_val is not None and result > max_val:
+        result = max_val
+    return result
+
+def decode_signal_batch(matrix: np.ndarray, compiled: tuple) -> np.ndarray:
+    """
+    Decode one compiled signal from every row of a payload matrix
+
+    Args:
+        matrix: uint8 array of shape (N, width), one zero-padded frame per row
+        compiled: Tuple from compile_signal
+
+    Returns:
+        Array of N decoded values (bool for boolean signals, float64 otherwise)
+    """
+    need_byte, shift, mask, sign_bit, kind, scale, offset, min_val, max_val, big_endian, unpack = compiled
+    bit_length = mask.bit_length()
+
+    if unpack is not None:
+        # Byte-aligned IEEE float: reinterpret the byte columns in place
+        num_bytes = need_byte - shift + 1
+        if matrix.shape[1] <= need_byte:
+            matrix = np.pad(matrix, ((0, 0), (0, need_byte + 1 - matrix.shape[1])))
+        dtype = np.dtype(f"{'>' if big_endian else '<'}f{num_bytes}")
+        value = np.ascontiguousarray(matrix[:, shift:need_byte + 1]).view(dtype).ravel()
+        result = value.astype(np.float64)
+    else:
+        if big_endian:
+            first_byte = (shift - bit_length) // 8
+            num_bytes = need_byte - first_byte + 1
+            drop = (need_byte + 1) * 8 - shift
+        else:
+            first_byte = need_byte
+            drop = shift % 8
+            num_bytes = (drop + bit_length + 7) // 8
+
+        if num_bytes <= 8:
+            # Assemble the covering bytes into one uint64 column
+            value = np.zeros(matrix.shape[0], dtype=np.uint64)
+            for i in range(min(num_bytes, matrix.shape[1] - first_byte)):
+                byte_shift = 8 * (num_bytes - 1 - i) if big_endian else 8 * i
+                value |= matrix[:, first_byte + i].astype(np.uint64) << np.uint64(byte_shift)
+            value = (value >> np.uint64(drop)) & np.uint64(mask)
+        else:
+            # Unaligned 64-bit signal spans nine bytes; decode row by row
+            rows = [row.tobytes() for row in matrix]
+            if big_endian:
+                value = np.array([(int.from_bytes(row, "big") >> (len(row) * 8 - shift)) & mask
+                                  for row in rows], dtype=np.uint64)
+            else:
+                value = np.array([(int.from_bytes(row, "little") >> shift) & mask
+                                  for row in rows], dtype=np.uint64)
+
+        if kind == _KIND_BOOL:
+            return value != 0
+
+        if kind == _KIND_FLOAT32:
+            result = value.astype(np.uint32).view(np.float32).astype(np.float64)
+        elif kind == _KIND_FLOAT64:
+            result = value.view(np.float64).copy()
+        else:
+            if sign_bit:
+                # Arithmetic shift pair sign-extends the field to int64
+                pad = np.int64(64 - bit_length)
+                value = (value.view(np.int64) << pad) >> pad
+            result = value.astype(np.float64)
+
+    result = result * float(scale) + float(offset)
+    if min_val is not None:
+        np.maximum(result, min_val, out=result)
+    if max_val is not None:
+        np.minimum(result, max_val, out=result)
+    return result
 
 class CANtoVSSConverter:
     """
     Class to convert CAN messages to VSS signals and send to Kuksa
     """
     
-    def __init__(self, kuksa_host: str = "127.0.0.1", kuksa_port: int = 55555):
+    def __init__(self, kuksa_host: str = "127.0.0.1", kuksa_port: int = 55555,
+                 flush_interval: float = 0.1, max_batch_size: int = 256,
+                 publish_on_change: bool = True, max_silence: float = 1.0):
         """
         Initialize CAN to VSS converter
         
         Args:
             kuksa_host: Kuksa server host
             kuksa_port: Kuksa server port
+            flush_interval: Kuksa writer flush window in seconds
+            max_batch_size: Number of distinct VSS paths that forces a flush
+            publish_on_change: Only publish values that changed beyond their deadband
+            max_silence: Default heartbeat; an unchanged value is republished
+                         after this many seconds (0 disables)
         """
         self.kuksa_host = kuksa_host
         self.kuksa_port = kuksa_port
         self.vss_client = None
+        self.publish_on_change = publish_on_change
+        self.max_silence = max_silence
+        
+        # VSS path -> (last published value, monotonic publish time)
+        self.last_published: Dict[str, tuple] = {}
+        # VSS path -> (deadband, deadband_rel, max_silence)
+        self._deadbands: Dict[str, tuple] = {}
+        # CAN ID -> VSS paths it put into _deadbands
+        self._deadband_paths: Dict[int, List[str]] = {}
+        
+        # Batched writer: coalesces values per VSS path, one RPC per flush
+        self.writer = KuksaBatchWriter(
+            flush_interval=flush_interval,
+            max_batch_size=max_batch_size
+        )
         
         # CAN ID to message definition mapping
         self.message_definitions: Dict[int, CANMessageDefinition] = {}
@@ -66,6 +452,13 @@ class CANtoVSSConverter:
         # CAN ID to VSS path mapping
         self.can_to_vss_mapping: Dict[int, Dict[str, str]] = {}
         
+        # CAN ID to compiled decode plan: list of (vss_path, compiled signal)
+        self._decode_plans: Dict[int, List[tuple]] = {}
+        
+        # Multiplexed CAN IDs: (compiled multiplexer, mux value -> decode plan);
+        # each page plan already includes the signals present on every page
+        self._mux_plans: Dict[int, tuple] = {}
+        
         # Initialize with default mappings
         self._initialize_default_mappings()
         
@@ -74,6 +467,7 @@ class CANtoVSSConverter:
             "messages_received": 0,
             "messages_converted": 0,
             "signals_sent": 0,
+            "signals_suppressed": 0,
             "errors": 0
         }
     
@@ -152,16 +546,130 @@ class CANtoVSSConverter:
         self.can_to_vss_mapping[0x102] = {
             "AmbientLight": "Vehicle.Body.Lights.AmbientLight"
         }
+        
+        self.compile_decode_plans()
+    
+    def _compile_decode_plan(self, can_id: int):
+        """Compile the decode plan of one CAN ID from its definition and mapping"""
+        msg_def = self.message_definitions.get(can_id)
+        mapping = self.can_to_vss_mapping.get(can_id)
+        self._mux_plans.pop(can_id, None)
+        # Forget thresholds and heartbeats of signals that were removed or remapped
+        stale = self._deadband_paths.pop(can_id, [])
+        for vss_path in stale:
+            self._deadbands.pop(vss_path, None)
+        paths = []
+        if msg_def is not None and mapping:
+            paths = [mapping[name] for name in msg_def.signals if name in mapping]
+            self._deadband_paths[can_id] = paths
+        for vss_path in set(stale).difference(paths):
+            self.last_published.pop(vss_path, None)
+        if msg_def is None or not mapping:
+            self._decode_plans.pop(can_id, None)
+            return
+        
+        plan = []
+        pages: Dict[int, List[tuple]] = {}
+        for signal_name, signal_def in msg_def.signals.items():
+            vss_path = mapping.get(signal_name)
+            if vss_path is not None:
+                entry = (vss_path, compile_signal(signal_def))
+                if signal_def.mux_value is None:
+                    plan.append(entry)
+                else:
+                    pages.setdefault(signal_def.mux_value, []).append(entry)
+                max_silence = signal_def.max_silence
+                self._deadbands[vss_path] = (
+                    signal_def.deadband,
+                    signal_def.deadband_rel,
+                    self.max_silence if max_silence is None else max_silence
+                )
+        self._decode_plans[can_id] = plan
+        
+        multiplexer = multiplexer_of(msg_def)
+        if multiplexer is not None and pages:
+            self._mux_plans[can_id] = (
+                compile_multiplexer(multiplexer),
+                {mux_value: plan + page for mux_value, page in pages.items()}
+            )
+    
+    def compile_decode_plans(self):
+        """
+        Rebuild decode plans for all CAN IDs
+        
+        Call this after editing message_definitions or can_to_vss_mapping
+        directly; the add_* and load_* methods already do it.
+        """
+        self._decode_plans = {}
+        self._mux_plans = {}
+        self._deadbands = {}
+        self._deadband_paths = {}
+        for can_id in self.message_definitions:
+            self._compile_decode_plan(can_id)
+        for vss_path in [p for p in self.last_published if p not in self._deadbands]:
+            del self.last_published[vss_path]
     
     def add_message_definition(self, msg_def: CANMessageDefinition):
         """Add a new CAN message definition"""
         self.message_definitions[msg_def.can_id] = msg_def
+        self._compile_decode_plan(msg_def.can_id)
+    
+    def add_fd_container(self, can_id: int, name: str, source_ids: List[int],
+                         bitrate_switch: bool = True) -> CANMessageDefinition:
+        """
+        Define a CAN FD message packing several defined messages (see pack_fd_message)
+        
+        VSS mappings of the source messages are copied, so the FD frame
+        decodes to the same VSS paths. Call again after the source
+        definitions or mappings change.
+        
+        Args:
+            can_id: CAN ID of the FD message
+            name: Name of the FD message
+            source_ids: CAN IDs of the messages to pack, in payload order
+            bitrate_switch: Send the data phase at the higher bitrate
+            
+        Returns:
+            The FD message definition
+        """
+        msg_def = pack_fd_message(
+            can_id, name, [self.message_definitions[i] for i in source_ids], bitrate_switch
+        )
+        self.message_definitions[can_id] = msg_def
+        # Rebuilt from scratch, so calling this again picks up changed sources
+        mapping = self.can_to_vss_mapping[can_id] = {}
+        for source_id in source_ids:
+            mapping.update(self.can_to_vss_mapping.get(source_id, {}))
+        self._compile_decode_plan(can_id)
+        return msg_def
+    
+    def can_filters(self, max_filters: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Acceptance filters passing only CAN IDs that decode to VSS signals
+        
+        Pass them to can.Bus(can_filters=...) or bus.set_filters(): socketcan
+        applies them in the kernel, other interfaces in python-can, so
+        unmapped frames never reach convert_can_message. Bus filters apply
+        to every listener on that bus: RX stores and trace recorders then
+        hold only these IDs too (CanInterface.start_recording(all_traffic=True)
+        records everything).
+        
+        Args:
+            max_filters: Upper bound on the number of filters (see build_can_filters)
+            
+        Returns:
+            python-can filter list
+        """
+        extended_ids = {can_id for can_id in self._decode_plans
+                        if self.message_definitions[can_id].is_extended}
+        return build_can_filters(self._decode_plans, max_filters, extended_ids)
     
     def add_vss_mapping(self, can_id: int, signal_name: str, vss_path: str):
         """Add a new CAN to VSS mapping"""
         if can_id not in self.can_to_vss_mapping:
             self.can_to_vss_mapping[can_id] = {}
         self.can_to_vss_mapping[can_id][signal_name] = vss_path
+        self._compile_decode_plan(can_id)
     
     def load_mappings_from_json(self, json_file: str):
         """
@@ -185,22 +693,42 @@ class CANtoVSSConverter:
                     "can_id": "0x100",
                     "name": "HeadlampControl",
                     "dlc": 8,
+                    "cycle_time": 50,
+                    "is_fd": false,
+                    "bitrate_switch": false,
                     "signals": [
                         {
                             "name": "HeadlampStatus",
                             "start_bit": 0,
                             "bit_length": 8,
-                            "type": "uint8"
+                            "type": "uint8",
+                            "byte_order": "little_endian",
+                            "scale": 1.0,
+                            "offset": 0,
+                            "min": 0,
+                            "max": 255,
+                            "unit": "",
+                            "deadband": 0,
+                            "max_silence": 1.0
                         }
                     ]
                 }
-            ]
+            ],
+            "dbc_files": ["vehicle.dbc"]
         }
+        
+        DBC files (paths relative to the JSON file) are imported first, so
+        message_definitions entries can override single messages.
         """
         try:
             with open(json_file, 'r') as f:
                 config = json.load(f)
             
+            # Import DBC databases
+            base_dir = os.path.dirname(os.path.abspath(json_file))
+            for dbc_file in config.get("dbc_files", []):
+                self.load_dbc(os.path.join(base_dir, dbc_file), compile_plans=False)
+            
             # Load message definitions
             if "message_definitions" in config:
                 for msg_def in config["message_definitions"]:
@@ -212,7 +740,19 @@ class CANtoVSSConverter:
                             name=sig_def["name"],
                             start_bit=sig_def["start_bit"],
                             bit_length=sig_def["bit_length"],
-                            signal_type=CANSignalType(sig_def["type"])
+                            signal_type=CANSignalType(sig_def["type"]),
+                            scale=sig_def.get("scale", 1.0),
+                            offset=sig_def.get("offset", 0.0),
+                            min_val=sig_def.get("min", sig_def.get("min_val")),
+                            max_val=sig_def.get("max", sig_def.get("max_val")),
+                            unit=sig_def.get("unit", ""),
+                            description=sig_def.get("description", ""),
+                            byte_order=sig_def.get("byte_order", "little_endian"),
+                            multiplexer=sig_def.get("multiplexer", False),
+                            mux_value=sig_def.get("mux_value"),
+                            deadband=sig_def.get("deadband", 0.0),
+                            deadband_rel=sig_def.get("deadband_rel", 0.0),
+                            max_silence=sig_def.get("max_silence")
                         )
                         signals[sig_def["name"]] = signal
                     
@@ -221,7 +761,11 @@ class CANtoVSSConverter:
                         name=msg_def["name"],
                         dlc=msg_def["dlc"],
                         signals=signals,
-                        description=msg_def.get("description", "")
+                        cycle_time=msg_def.get("cycle_time", 0),
+                        description=msg_def.get("description", ""),
+                        is_fd=msg_def.get("is_fd", msg_def["dlc"] > 8),
+                        bitrate_switch=msg_def.get("bitrate_switch", False),
+                        is_extended=msg_def.get("is_extended", False)
                     )
                     
                     self.message_definitions[can_id] = message_def
@@ -237,11 +781,43 @@ class CANtoVSSConverter:
                     for signal in mapping["signals"]:
                         self.can_to_vss_mapping[can_id][signal["name"]] = signal["vss_path"]
             
+            self.compile_decode_plans()
             print(f"Loaded mappings from {json_file}")
             
         except Exception as e:
             print(f"Error loading mappings from JSON: {e}")
     
+    def load_dbc(self, dbc_file: str, use_cache: bool = True, cache_dir: Optional[str] = None,
+                 compile_plans: bool = True):
+        """
+        Import all message definitions of a DBC database
+        
+        Parsed databases are cached in binary form (see dbc_loader), so an
+        unchanged DBC loads without parsing. VSS mappings are added as usual.
+        
+        Args:
+            dbc_file: Path to the .dbc file
+            use_cache: Read and write the binary cache
+            cache_dir: Cache directory (dbc_loader.DEFAULT_CACHE_DIR if None)
+            compile_plans: Rebuild decode plans afterwards
+        """
+        from dbc_loader import DEFAULT_CACHE_DIR, load_dbc
+        
+        try:
+            start = time.perf_counter()
+            if use_cache:
+                cache_dir = cache_dir or DEFAULT_CACHE_DIR
+            else:
+                cache_dir = None
+            messages = load_dbc(dbc_file, cache_dir)
+            self.message_definitions.update(messages)
+            if compile_plans:
+                self.compile_decode_plans()
+            print(f"Loaded {len(messages)} message definitions from {dbc_file} "
+                  f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+        except Exception as e:
+            print(f"Error loading DBC file: {e}")
+    
     def extract_signal_from_data(self, data: bytes, signal_def: CANSignalDefinition) -> Any:
         """
         Extract signal value from CAN data bytes
@@ -254,65 +830,7 @@ class CANtoVSSConverter:
             Extracted signal value
         """
         try:
-            # Calculate byte position and bit mask
-            start_byte = signal_def.start_bit // 8
-            start_bit_in_byte = signal_def.start_bit % 8
-            
-            # Extract relevant bytes
-            num_bytes = (signal_def.bit_length + 7) // 8
-            relevant_bytes = data[start_byte:start_byte + num_bytes]
-            
-            if not relevant_bytes:
-                return None
-            
-            # Convert to integer (little-endian)
-            value = 0
-            for i, byte in enumerate(relevant_bytes):
-                value |= byte << (i * 8)
-            
-            # Apply bit mask for bits within byte
-            if start_bit_in_byte > 0 or signal_def.bit_length < (num_bytes * 8):
-                bit_mask = (1 << signal_def.bit_length) - 1
-                value = (value >> start_bit_in_byte) & bit_mask
-            
-            # Convert based on signal type
-            if signal_def.signal_type == CANSignalType.BOOLEAN:
-                return bool(value)
-            elif signal_def.signal_type in [CANSignalType.UINT8, CANSignalType.UINT16, CANSignalType.UINT32]:
-                # Apply scale and offset
-                result = (value * signal_def.scale) + signal_def.offset
-                # Apply min/max bounds if defined
-                if signal_def.min_val is not None:
-                    result = max(result, signal_def.min_val)
-                if signal_def.max_val is not None:
-                    result = min(result, signal_def.max_val)
-                return result
-            elif signal_def.signal_type in [CANSignalType.INT8, CANSignalType.INT16, CANSignalType.INT32]:
-                # Handle signed values
-                # Check if value is negative (most significant bit of the extracted bits)
-                if value & (1 << (signal_def.bit_length - 1)):
-                    # Two's complement conversion
-                    value = value - (1 << signal_def.bit_length)
-                
-                result = (value * signal_def.scale) + signal_def.offset
-                # Apply min/max bounds if defined
-                if signal_def.min_val is not None:
-                    result = max(result, signal_def.min_val)
-                if signal_def.max_val is not None:
-                    result = min(result, signal_def.max_val)
-                return result
-            elif signal_def.signal_type == CANSignalType.FLOAT:
-                # For simplicity, treat as scaled integer
-                # In real implementation, you might need proper float decoding
-                result = (value * signal_def.scale) + signal_def.offset
-                if signal_def.min_val is not None:
-                    result = max(result, signal_def.min_val)
-                if signal_def.max_val is not None:
-                    result = min(result, signal_def.max_val)
-                return float(result)
-            
-            return value
-            
+            return decode_signal(data, compile_signal(signal_def))
         except Exception as e:
             print(f"Error extracting signal: {e}")
             return None
@@ -321,6 +839,9 @@ class CANtoVSSConverter:
         """
         Convert CAN message to VSS signals
         
+        For a multiplexed message only the signals of the page selected by
+        the multiplexer value (plus those on every page) are decoded.
+        
         Args:
             can_msg: CAN message object
             
@@ -332,28 +853,50 @@ class CANtoVSSConverter:
         try:
             self.stats["messages_received"] += 1
             
-            can_id = can_msg.arbitration_id
-            
-            # Check if we have definition for this CAN ID
-            if can_id not in self.message_definitions:
+            # Only CAN IDs with both a definition and a VSS mapping have a plan
+            plan = self._decode_plans.get(can_msg.arbitration_id)
+            if plan is None:
                 return vss_signals
             
-            msg_def = self.message_definitions[can_id]
+            data = can_msg.data
+            size = len(data)
+            raw = int.from_bytes(data, "little")
+            raw_be = None
             
-            # Check if we have VSS mapping for this CAN ID
-            if can_id not in self.can_to_vss_mapping:
-                return vss_signals
+            mux = self._mux_plans.get(can_msg.arbitration_id)
+            if mux is not None:
+                mux_value = decode_signal(data, mux[0], raw)
+                if mux_value is not None:
+                    plan = mux[1].get(mux_value, plan)
             
-            # Extract each signal from the message
-            for signal_name, signal_def in msg_def.signals.items():
-                # Extract signal value
-                value = self.extract_signal_from_data(can_msg.data, signal_def)
+            for vss_path, compiled in plan:
+                need_byte, shift, mask, sign_bit, kind, scale, offset, min_val, max_val, big_endian, unpack = compiled
+                if need_byte >= size:
+                    continue
                 
-                if value is not None:
-                    # Get VSS path for this signal
-                    if signal_name in self.can_to_vss_mapping[can_id]:
-                        vss_path = self.can_to_vss_mapping[can_id][signal_name]
-                        vss_signals[vss_path] = value
+                if unpack is not None:
+                    value = unpack(data, shift)[0]
+                else:
+                    if big_endian:
+                        if raw_be is None:
+                            raw_be = int.from_bytes(data, "big")
+                        value = (raw_be >> (size * 8 - shift)) & mask
+                    else:
+                        value = (raw >> shift) & mask
+                    if kind == _KIND_BOOL:
+                        vss_signals[vss_path] = bool(value)
+                        continue
+                    if kind != _KIND_NUMERIC:
+                        value = float_from_bits(value, kind)
+                    elif sign_bit and value & sign_bit:
+                        value -= mask + 1
+                
+                result = (value * scale) + offset
+                if min_val is not None and result < min_val:
+                    result = min_val
+                if max_val is not None and result > max_val:
+                    result = max_val
+                vss_signals[vss_path] = result
             
             if vss_signals:
                 self.stats["messages_converted"] += 1
@@ -365,29 +908,209 @@ class CANtoVSSConverter:
         
         return vss_signals
     
+    def convert_can_batch(self, frames: List[can.Message]) -> Dict[str, np.ndarray]:
+        """
+        Convert a burst of CAN messages with the same CAN ID to VSS value arrays
+        
+        Frames are packed into one uint8 matrix and every signal is decoded
+        as column operations. Frames shorter than the message definition
+        are zero-padded.
+        
+        Args:
+            frames: CAN messages, all with the same arbitration ID
+            
+        Returns:
+            Dictionary mapping VSS paths to arrays of values, one per frame
+        """
+        if not frames:
+            return {}
+        
+        can_id = frames[0].arbitration_id
+        if any(msg.arbitration_id != can_id for msg in frames):
+            raise ValueError("convert_can_batch expects frames with a single CAN ID")
+        
+        msg_def = self.message_definitions.get(can_id)
+        lengths = {len(msg.data) for msg in frames}
+        width = max(max(lengths), msg_def.dlc if msg_def else 0)
+        if lengths == {width}:
+            payload = b"".join(msg.data for msg in frames)
+        else:
+            payload = b"".join(bytes(msg.data).ljust(width, b"\x00") for msg in frames)
+        matrix = np.frombuffer(payload, dtype=np.uint8).reshape(len(frames), width)
+        return self.convert_frame_matrix(can_id, matrix)
+    
+    def convert_frame_matrix(self, can_id: int, matrix: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Convert payloads of one CAN ID, one frame per matrix row, to VSS value arrays
+        
+        Bytes beyond the matrix width decode as 0, so rows can come straight
+        from a columnar store or trace file without repacking. Signals of a
+        multiplexed message are decoded only on the rows whose mux page
+        carries them and come back as NumPy masked arrays (same dtype as
+        unmultiplexed signals), masked on the other rows.
+        
+        Args:
+            can_id: CAN ID of all rows
+            matrix: uint8 array of shape (N, width)
+            
+        Returns:
+            Dictionary mapping VSS paths to arrays of values, one per row
+        """
+        vss_arrays = {}
+        self.stats["messages_received"] += len(matrix)
+        
+        plan = self._decode_plans.get(can_id)
+        if plan is None:
+            return vss_arrays
+        
+        try:
+            for vss_path, compiled in plan:
+                vss_arrays[vss_path] = decode_signal_batch(matrix, compiled)
+            
+            mux = self._mux_plans.get(can_id)
+            if mux is not None:
+                mux_compiled, pages = mux
+                mux_values = decode_signal_batch(matrix, mux_compiled)
+                static = len(plan)
+                for mux_value, page_plan in pages.items():
+                    rows = np.flatnonzero(mux_values == mux_value)
+                    if not len(rows):
+                        continue
+                    page_matrix = matrix[rows]
+                    for vss_path, compiled in page_plan[static:]:
+                        page_values = decode_signal_batch(page_matrix, compiled)
+                        values = vss_arrays.get(vss_path)
+                        if values is None:
+                            values = vss_arrays[vss_path] = np.ma.masked_all(
+                                len(matrix), dtype=page_values.dtype)
+                        values[rows] = page_values
+            
+            if not vss_arrays:
+                return vss_arrays
+            self.stats["messages_converted"] += len(matrix)
+            self.stats["signals_sent"] += len(matrix) * len(vss_arrays)
+            
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"Error converting CAN batch: {e}")
+        
+        return vss_arrays
+    
+    def convert_can_batches(self, frames: List[can.Message]) -> Dict[int, Dict[str, np.ndarray]]:
+        """
+        Group CAN messages by CAN ID and convert each group with convert_can_batch
+        
+        Args:
+            frames: CAN messages, e.g. a drained RX buffer
+            
+        Returns:
+            Dictionary mapping CAN IDs to their VSS value arrays
+        """
+        groups: Dict[int, List[can.Message]] = {}
+        for msg in frames:
+            groups.setdefault(msg.arbitration_id, []).append(msg)
+        
+        return {can_id: self.convert_can_batch(group) for can_id, group in groups.items()}
+    
     async def connect_to_kuksa(self):
-        """Establish connection to Kuksa server"""
+        """
+        Attach to the shared Kuksa connection
+        
+        If the server is unreachable the connection keeps retrying in the
+        background and queued signals are held until it is back.
+        """
         try:
-            self.vss_client = VSSClient(host=self.kuksa_host, port=self.kuksa_port)
-            await self.vss_client.__aenter__()
-            print(f"Connected to Kuksa server at {self.kuksa_host}:{self.kuksa_port}")
-            return True
+            self.vss_client = await acquire_connection(self.kuksa_host, self.kuksa_port)
+            self.writer.client = self.vss_client
+            self.writer.start()
+            return self.vss_client.connected
         except Exception as e:
             print(f"Failed to connect to Kuksa: {e}")
             return False
     
     async def disconnect_from_kuksa(self):
-        """Disconnect from Kuksa server"""
+        """Flush pending signals and release the shared Kuksa connection"""
         try:
             if self.vss_client:
-                await self.vss_client.__aexit__(None, None, None)
-                print("Disconnected from Kuksa server")
+                await self.writer.stop()
+                await release_connection(self.vss_client)
+                self.vss_client = None
         except Exception as e:
             print(f"Error disconnecting from Kuksa: {e}")
     
+    def filter_changes(self, vss_signals: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Keep only values that differ from the last published one
+        
+        A numeric value passes when it moved more than the signal's absolute
+        or relative deadband; any value passes once its max_silence heartbeat
+        has elapsed. Passing values are recorded as published.
+        
+        Args:
+            vss_signals: Dictionary mapping VSS paths to values
+            
+        Returns:
+            Dictionary with the values to publish
+        """
+        now = time.monotonic()
+        last_published = self.last_published
+        changed = {}
+        
+        for vss_path, value in vss_signals.items():
+            last = last_published.get(vss_path)
+            if last is not None:
+                last_value, last_time = last
+                deadband, deadband_rel, max_silence = self._deadbands.get(
+                    vss_path, (0.0, 0.0, self.max_silence))
+                if not (max_silence and now - last_time >= max_silence):
+                    if value == last_value:
+                        continue
+                    if (deadband or deadband_rel) and not isinstance(value, bool):
+                        if abs(value - last_value) <= max(deadband, deadband_rel * abs(last_value)):
+                            continue
+            
+            changed[vss_path] = value
+            last_published[vss_path] = (value, now)
+        
+        self.stats["signals_suppressed"] += len(vss_signals) - len(changed)
+        return changed
+    
+    def republish_silent(self) -> int:
+        """
+        Republish values whose max_silence heartbeat elapsed without a new frame
+        
+        filter_changes only sees values when frames arrive; call this
+        periodically so a silent bus still produces heartbeats.
+        
+        Returns:
+            Number of values queued
+        """
+        if not self.publish_on_change or not self.vss_client:
+            return 0
+        
+        now = time.monotonic()
+        due = {}
+        for vss_path, (value, last_time) in self.last_published.items():
+            max_silence = self._deadbands.get(vss_path, (0.0, 0.0, self.max_silence))[2]
+            if max_silence and now - last_time >= max_silence:
+                due[vss_path] = value
+        
+        if due:
+            for vss_path, value in due.items():
+                self.last_published[vss_path] = (value, now)
+            self.writer.submit(due)
+        return len(due)
+    
+    def reset_published(self):
+        """Forget last published values so the next values are all sent"""
+        self.last_published.clear()
+    
     async def send_vss_signals(self, vss_signals: Dict[str, Any]):
         """
-        Send VSS signals to Kuksa server
+        Queue VSS signals for the batched Kuksa writer
+        
+        Values are coalesced per VSS path and sent in one RPC per flush window.
+        With publish_on_change, unchanged values are dropped first.
         
         Args:
             vss_signals: Dictionary mapping VSS paths to values
@@ -395,22 +1118,16 @@ class CANtoVSSConverter:
         if not vss_signals or not self.vss_client:
             return
         
-        try:
-            # Prepare data for Kuksa
-            data_to_send = {}
-            for vss_path, value in vss_signals.items():
-                data_to_send[vss_path] = Datapoint(value=value)
-            
-            # Send to Kuksa
-            await self.vss_client.set_current_values(data_to_send)
-            
-            # Optional: Print what was sent
-            # for vss_path, value in vss_signals.items():
-            #     print(f"Sent to Kuksa: {vss_path} = {value}")
-                
-        except Exception as e:
-            self.stats["errors"] += 1
-            print(f"Error sending VSS signals to Kuksa: {e}")
+        if self.publish_on_change:
+            vss_signals = self.filter_changes(vss_signals)
+            if not vss_signals:
+                return
+        
+        self.writer.submit(vss_signals)
+    
+    async def flush(self):
+        """Send all queued VSS signals to Kuksa now"""
+        await self.writer.flush()
     
     async def process_and_send_can_message(self, can_msg: can.Message):
         """
@@ -437,5 +1154,6 @@ class CANtoVSSConverter:
         print(f"Messages received: {stats['messages_received']}")
         print(f"Messages converted: {stats['messages_converted']}")
         print(f"Signals sent: {stats['signals_sent']}")
+        print(f"Signals suppressed: {stats['signals_suppressed']}")
         print(f"Errors: {stats['errors']}")
         print("=======================================\n")
\ No newline at end of file
@@ -0,0 +1,236 @@
+# dbc_loader.py
+import hashlib
+import marshal
+import os
+import re
+from typing import Dict, Optional
+from can_vss_converter import CANMessageDefinition, CANSignalDefinition, CANSignalType
+
+# Cache location; override with the DBC_CACHE_DIR environment variable
+DEFAULT_CACHE_DIR = os.environ.get(
+    "DBC_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "vecu_dbc")
+)
+# Part of the cache key; bump when parsing or the definition classes change
+PARSER_VERSION = 5
+
+_MESSAGE_RE = re.compile(r"^BO_\s+(\d+)\s+(\w+)\s*:\s*(\d+)")
+_SIGNAL_RE = re.compile(
+    r"^SG_\s+(\w+)\s*(M|m\d+M?)?\s*:\s*(\d+)\|(\d+)@([01])([+-])\s*"
+    r"\(\s*([^,\s]+)\s*,\s*([^)\s]+)\s*\)\s*"
+    r"\[\s*([^|\s]*)\s*\|\s*([^\]\s]*)\s*\]\s*"
+    r"\"([^\"]*)\""
+)
+_MESSAGE_COMMENT_RE = re.compile(r'CM_\s+BO_\s+(\d+)\s+"((?:[^"\\]|\\.)*)"\s*;', re.S)
+_SIGNAL_COMMENT_RE = re.compile(r'CM_\s+SG_\s+(\d+)\s+(\w+)\s+"((?:[^"\\]|\\.)*)"\s*;', re.S)
+_CYCLE_TIME_RE = re.compile(r'BA_\s+"GenMsgCycleTime"\s+BO_\s+(\d+)\s+(\d+)\s*;')
+_VALUE_TYPE_RE = re.compile(r"SIG_VALTYPE_\s+(\d+)\s+(\w+)\s*:?\s*([12])\s*;")
+_FRAME_FORMAT_RE = re.compile(r'BA_\s+"VFrameFormat"\s+BO_\s+(\d+)\s+(\d+)\s*;')
+_BRS_RE = re.compile(r'BA_\s+"CANFD_BRS"\s+BO_\s+(\d+)\s+(\d+)\s*;')
+
+# DBC marks extended (29-bit) frame IDs with bit 31
+_EXTENDED_FLAG = 0x80000000
+# VFrameFormat values of CAN FD frames (StandardCAN_FD, ExtendedCAN_FD)
+_FD_FRAME_FORMATS = (14, 15)
+
+def _signal_type(bit_length: int, signed: bool) -> CANSignalType:
+    """Closest CANSignalType for an integer DBC signal"""
+    if bit_length == 1 and not signed:
+        return CANSignalType.BOOLEAN
+    if signed:
+        if bit_length <= 8:
+            return CANSignalType.INT8
+        return CANSignalType.INT16 if bit_length <= 16 else CANSignalType.INT32
+    if bit_length <= 8:
+        return CANSignalType.UINT8
+    return CANSignalType.UINT16 if bit_length <= 16 else CANSignalType.UINT32
+
+def _number(text: str) -> float:
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+def parse_dbc(text: str) -> Dict[int, CANMessageDefinition]:
+    """
+    Parse DBC database text into message definitions
+
+    Reads messages (BO_), signals (SG_) with layout, byte order, sign,
+    scale/offset, range, unit and multiplexing (M multiplexer, mN signals on
+    page N; extended mNM multiplexers are read as plain page N signals),
+    IEEE float signals (SIG_VALTYPE_),
+    message and signal comments (CM_), the GenMsgCycleTime attribute and
+    the CAN FD attributes VFrameFormat and CANFD_BRS (BRS defaults to on
+    for FD frames). A [0|0] range means unbounded. Two messages with the
+    same ID, standard or extended, raise ValueError.
+
+    Args:
+        text: DBC file content
+
+    Returns:
+        CAN ID to message definition
+    """
+    messages: Dict[int, CANMessageDefinition] = {}
+    current = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("BO_ "):
+            match = _MESSAGE_RE.match(line)
+            if not match:
+                current = None
+                continue
+            raw_id = int(match.group(1))
+            can_id = raw_id & ~_EXTENDED_FLAG
+            if can_id in messages:
+                # Definitions are keyed by the bare ID, so a standard and an
+                # extended frame with the same number cannot both be kept
+                other = messages[can_id]
+                raise ValueError(
+                    f"DBC message {match.group(2)} reuses CAN ID 0x{can_id:X} of {other.name}"
+                    f" ({'extended' if other.is_extended else 'standard'} frame)"
+                )
+            current = messages[can_id] = CANMessageDefinition(
+                can_id=can_id,
+                name=match.group(2),
+                dlc=int(match.group(3)),
+                signals={},
+                is_extended=bool(raw_id & _EXTENDED_FLAG)
+            )
+        elif line.startswith("SG_ ") and current is not None:
+            match = _SIGNAL_RE.match(line)
+            if not match:
+                print(f"Skipping unsupported DBC signal line: {line}")
+                continue
+            (name, mux, start_bit, bit_length, byte_order, sign,
+             scale, offset, min_val, max_val, unit) = match.groups()
+            bit_length = int(bit_length)
+            min_val = _number(min_val) if min_val else 0
+            max_val = _number(max_val) if max_val else 0
+            unbounded = min_val == 0 and max_val == 0
+            current.signals[name] = CANSignalDefinition(
+                name=name,
+                start_bit=int(start_bit),
+                bit_length=bit_length,
+                signal_type=_signal_type(bit_length, sign == "-"),
+                scale=_number(scale),
+                offset=_number(offset),
+                min_val=None if unbounded else min_val,
+                max_val=None if unbounded else max_val,
+                unit=unit,
+                byte_order="little_endian" if byte_order == "1" else "big_endian",
+                multiplexer=mux == "M",
+                mux_value=int(mux[1:].rstrip("M")) if mux and mux != "M" else None
+            )
+        elif not line.startswith("SG_"):
+            current = None
+
+    for match in _MESSAGE_COMMENT_RE.finditer(text):
+        msg_def = messages.get(int(match.group(1)) & ~_EXTENDED_FLAG)
+        if msg_def:
+            msg_def.description = match.group(2)
+    for match in _SIGNAL_COMMENT_RE.finditer(text):
+        msg_def = messages.get(int(match.group(1)) & ~_EXTENDED_FLAG)
+        if msg_def and match.group(2) in msg_def.signals:
+            msg_def.signals[match.group(2)].description = match.group(3)
+    for match in _VALUE_TYPE_RE.finditer(text):
+        msg_def = messages.get(int(match.group(1)) & ~_EXTENDED_FLAG)
+        signal = msg_def.signals.get(match.group(2)) if msg_def else None
+        if signal:
+            signal.signal_type = CANSignalType.FLOAT32 if match.group(3) == "1" else CANSignalType.FLOAT64
+    for match in _CYCLE_TIME_RE.finditer(text):
+        msg_def = messages.get(int(match.group(1)) & ~_EXTENDED_FLAG)
+        if msg_def:
+            msg_def.cycle_time = int(match.group(2))
+    for match in _FRAME_FORMAT_RE.finditer(text):
+        msg_def = messages.get(int(match.group(1)) & ~_EXTENDED_FLAG)
+        if msg_def and int(match.group(2)) in _FD_FRAME_FORMATS:
+            msg_def.is_fd = True
+            msg_def.bitrate_switch = True
+    for match in _BRS_RE.finditer(text):
+        msg_def = messages.get(int(match.group(1)) & ~_EXTENDED_FLAG)
+        if msg_def and msg_def.is_fd:
+            msg_def.bitrate_switch = match.group(2) == "1"
+    for msg_def in messages.values():
+        if msg_def.dlc > 8 and not msg_def.is_fd:
+            msg_def.is_fd = True
+
+    return messages
+
+# Cached signal fields, in CANSignalDefinition order
+_SIGNAL_FIELDS = ("name", "start_bit", "bit_length", "signal_type", "scale", "offset",
+                  "min_val", "max_val", "unit", "description", "byte_order",
+                  "multiplexer", "mux_value")
+_TYPES = list(CANSignalType)
+
+def _to_rows(messages: Dict[int, CANMessageDefinition]) -> list:
+    """Flatten definitions into plain tuples for marshal"""
+    rows = []
+    for msg_def in messages.values():
+        signals = []
+        for sig in msg_def.signals.values():
+            values = [getattr(sig, name) for name in _SIGNAL_FIELDS]
+            values[3] = _TYPES.index(sig.signal_type)
+            signals.append(tuple(values))
+        rows.append((msg_def.can_id, msg_def.name, msg_def.dlc, msg_def.cycle_time,
+                     msg_def.description, msg_def.is_fd, msg_def.bitrate_switch,
+                     msg_def.is_extended, signals))
+    return rows
+
+def _from_rows(rows: list) -> Dict[int, CANMessageDefinition]:
+    """Rebuild definitions from cached tuples"""
+    types = _TYPES
+    messages = {}
+    for (can_id, name, dlc, cycle_time, description, is_fd, bitrate_switch,
+         is_extended, signals) in rows:
+        signal_defs = {}
+        for (sig_name, start_bit, bit_length, type_index, scale, offset,
+             min_val, max_val, unit, sig_description, byte_order, multiplexer, mux_value) in signals:
+            signal_defs[sig_name] = CANSignalDefinition(
+                sig_name, start_bit, bit_length, types[type_index], scale, offset,
+                min_val, max_val, unit, sig_description, byte_order, multiplexer, mux_value
+            )
+        messages[can_id] = CANMessageDefinition(
+            can_id, name, dlc, signal_defs, cycle_time, description, is_fd, bitrate_switch, is_extended
+        )
+    return messages
+
+def load_dbc(dbc_path: str, cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+             encoding: str = "latin-1") -> Dict[int, CANMessageDefinition]:
+    """
+    Load a DBC file, using a pre-parsed binary cache
+
+    The parsed definitions are stored under cache_dir as marshalled plain
+    tuples, keyed by the SHA-256 of the file content and PARSER_VERSION; an
+    unchanged database is rebuilt from them instead of parsed again.
+
+    Args:
+        dbc_path: Path to the .dbc file
+        cache_dir: Cache directory (no caching if None)
+        encoding: Text encoding of the DBC file
+
+    Returns:
+        CAN ID to message definition
+    """
+    with open(dbc_path, "rb") as f:
+        content = f.read()
+
+    cache_file = None
+    if cache_dir:
+        digest = hashlib.sha256(content).hexdigest()
+        cache_file = os.path.join(cache_dir, f"{digest}-v{PARSER_VERSION}.bin")
+        try:
+            with open(cache_file, "rb") as f:
+                return _from_rows(marshal.loads(f.read()))
+        except Exception:
+            pass
+
+    messages = parse_dbc(content.decode(encoding))
+
+    if cache_file:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_file = f"{cache_file}.tmp-{os.getpid()}"
+            with open(tmp_file, "wb") as f:
+                f.write(marshal.dumps(_to_rows(messages)))
+            os.replace(tmp_file, cache_file)
+        except Exception as e:
+            print(f"Could not cache parsed DBC {dbc_path}: {e}")
+
+    return messages
@@ -0,0 +1,299 @@
+# fmu_batch.py
+import multiprocessing as mp
+import time
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional, Union
+import numpy as np
+
+# autoLamp parameters set per scenario (scenario field -> FMU variable name)
+AUTO_PARAMETERS = {"threshold": "threshold", "hysteresis": "hysteresis"}
+
+@dataclass
+class Scenario:
+    """
+    One co-simulation run of the batch
+
+    ambient describes the ambient light profile: a dict with "kind" and its
+    settings, or an array with one sample per step.
+
+    - {"kind": "sine", "offset": 250, "amplitude": 100, "frequency": 1.0}
+      (frequency in rad/s; the default is the profile of run_simulation)
+    - {"kind": "constant", "value": 300}
+    - {"kind": "step", "before": 400, "after": 100, "at": 5.0}
+    - {"kind": "ramp", "start": 400, "end": 100}
+    """
+    name: str = ""
+    ambient: Union[Dict[str, Any], np.ndarray] = field(default_factory=lambda: {"kind": "sine"})
+    threshold: Optional[float] = None
+    hysteresis: Optional[float] = None
+    T_END: float = 10.0
+    dt: float = 0.05
+
+    @classmethod
+    def from_dict(cls, row: Dict[str, Any]) -> "Scenario":
+        """Create a scenario from a table row; unknown keys are ignored"""
+        names = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in row.items() if key in names})
+
+    def steps(self) -> int:
+        """Number of simulation steps"""
+        return int(np.ceil(self.T_END / self.dt - 1e-9))
+
+def ambient_profile(scenario: Scenario) -> np.ndarray:
+    """
+    Ambient light value of every step of a scenario
+
+    Args:
+        scenario: Scenario
+
+    Returns:
+        float64 array with one value per step
+    """
+    n = scenario.steps()
+    t = np.arange(n) * scenario.dt
+    profile = scenario.ambient
+    if not isinstance(profile, dict):
+        samples = np.asarray(profile, dtype=np.float64)
+        if len(samples) < n:
+            raise ValueError(f"Scenario {scenario.name}: ambient has {len(samples)} samples, needs {n}")
+        return samples[:n]
+
+    kind = profile.get("kind", "sine")
+    if kind == "sine":
+        return (profile.get("offset", 250.0)
+                + profile.get("amplitude", 100.0) * np.sin(profile.get("frequency", 1.0) * t))
+    if kind == "constant":
+        return np.full(n, float(profile["value"]))
+    if kind == "step":
+        return np.where(t < profile["at"], float(profile["before"]), float(profile["after"]))
+    if kind == "ramp":
+        return np.linspace(profile["start"], profile["end"], n)
+    raise ValueError(f"Unknown ambient profile kind: {kind}")
+
+def sample_scenarios(n: int, seed: Optional[int] = None, threshold=(150.0, 350.0),
+                     hysteresis=(0.0, 50.0), offset=(150.0, 350.0), amplitude=(0.0, 200.0),
+                     frequency=(0.1, 2.0), T_END: float = 10.0, dt: float = 0.05) -> List[Scenario]:
+    """
+    Draw Monte-Carlo scenarios with uniformly distributed settings
+
+    Args:
+        n: Number of scenarios
+        seed: Random seed, for reproducible sweeps
+        threshold, hysteresis: (low, high) ranges of the autoLamp parameters
+        offset, amplitude, frequency: (low, high) ranges of a sine ambient profile
+        T_END: Simulation time of each scenario
+        dt: Time step
+
+    Returns:
+        List of scenarios
+    """
+    rng = np.random.default_rng(seed)
+    draw = lambda bounds: rng.uniform(bounds[0], bounds[1], n)
+    thresholds, hystereses = draw(threshold), draw(hysteresis)
+    offsets, amplitudes, frequencies = draw(offset), draw(amplitude), draw(frequency)
+    return [
+        Scenario(
+            name=f"mc_{i}",
+            ambient={"kind": "sine", "offset": offsets[i], "amplitude": amplitudes[i],
+                     "frequency": frequencies[i]},
+            threshold=float(thresholds[i]),
+            hysteresis=float(hystereses[i]),
+            T_END=T_END,
+            dt=dt
+        )
+        for i in range(n)
+    ]
+
+# Per-process FMU instances, created once by the pool initializer
+_worker = None
+
+class _BatchWorker:
+    """Both FMUs of one pool process, reset and reused for every scenario"""
+
+    def __init__(self, auto_fmu_path: str, lamp_fmu_path: str):
+        from fmpy.fmi2 import FMU2Slave
+        from fmu_cache import load_fmu
+        from fmu_io import FMUIOBinding
+
+        self._binding = FMUIOBinding
+        fmus = []
+        for path, name in ((auto_fmu_path, "autoLamp"), (lamp_fmu_path, "lampController")):
+            md, unzipdir = load_fmu(path)
+            fmu = FMU2Slave(
+                guid=md.guid,
+                unzipDirectory=unzipdir,
+                modelIdentifier=md.coSimulation.modelIdentifier,
+                instanceName=f"{name}_batch"
+            )
+            fmu.instantiate()
+            fmus.append((fmu, md))
+        (self.auto_fmu, self.md_auto), (self.lamp_fmu, self.md_lamp) = fmus
+
+        self.auto_io = FMUIOBinding(self.auto_fmu, self.md_auto,
+                                    inputs=["ambient_light"], outputs=["headlamp"])
+        self.lamp_io = FMUIOBinding(self.lamp_fmu, self.md_lamp,
+                                    inputs=["headlamp"], outputs=["lamp_power"])
+        # Parameter bindings by set of parameter names
+        self._param_io = {}
+        self._used = False
+
+    def _initialize(self, parameters: Dict[str, float]):
+        """Bring both FMUs back to t=0 with the scenario parameters"""
+        for fmu in (self.auto_fmu, self.lamp_fmu):
+            if self._used:
+                fmu.reset()
+            fmu.setupExperiment(startTime=0)
+            fmu.enterInitializationMode()
+        self._used = True
+
+        if parameters:
+            names = tuple(parameters)
+            param_io = self._param_io.get(names)
+            if param_io is None:
+                param_io = self._param_io[names] = self._binding(
+                    self.auto_fmu, self.md_auto, inputs=list(names), outputs=[])
+            param_io.set_inputs(parameters)
+
+        self.auto_fmu.exitInitializationMode()
+        self.lamp_fmu.exitInitializationMode()
+
+    def run(self, scenario: Scenario) -> Dict[str, np.ndarray]:
+        """Run one scenario and return its step columns"""
+        parameters = {
+            variable: getattr(scenario, key)
+            for key, variable in AUTO_PARAMETERS.items()
+            if getattr(scenario, key) is not None
+        }
+        self._initialize(parameters)
+
+        ambient = ambient_profile(scenario)
+        n = len(ambient)
+        dt = scenario.dt
+        t = np.arange(n) * dt
+        headlamp = np.empty(n, dtype=np.bool_)
+        power = np.empty(n, dtype=np.float64)
+
+        auto_io, lamp_io = self.auto_io, self.lamp_io
+        auto_step, lamp_step = self.auto_fmu.doStep, self.lamp_fmu.doStep
+        auto_in, lamp_in = auto_io.inputs, lamp_io.inputs
+        auto_out, lamp_out = auto_io.outputs, lamp_io.outputs
+        for i in range(n):
+            auto_in["ambient_light"] = ambient[i]
+            auto_io.write_inputs()
+            auto_step(t[i], dt)
+            auto_io.read_outputs()
+            lamp_in["headlamp"] = auto_out["headlamp"]
+            lamp_io.write_inputs()
+            lamp_step(t[i], dt)
+            lamp_io.read_outputs()
+            headlamp[i] = auto_out["headlamp"]
+            power[i] = lamp_out["lamp_power"]
+
+        return {"t": t, "ambient": ambient, "headlamp": headlamp, "power": power}
+
+def _init_worker(auto_fmu_path: str, lamp_fmu_path: str):
+    global _worker
+    try:
+        _worker = _BatchWorker(auto_fmu_path, lamp_fmu_path)
+    except Exception as e:
+        # Raised from _run_scenario instead: a failing pool initializer is restarted forever
+        _worker = e
+
+def _run_scenario(scenario: Scenario) -> Dict[str, np.ndarray]:
+    if isinstance(_worker, Exception):
+        raise RuntimeError(f"FMU batch worker failed to start: {_worker}")
+    return _worker.run(scenario)
+
+class BatchRunner:
+    """
+    Runs many co-simulation scenarios over a pool of FMU processes
+
+    Each pool process loads and instantiates both FMUs once and resets them
+    between scenarios. Results of a sweep are columnar: step columns (t,
+    ambient, headlamp, power) of all scenarios concatenated, with a
+    "scenario" index column, plus one row per scenario for its settings.
+    """
+
+    def __init__(self, auto_fmu_path: str, lamp_fmu_path: str, processes: Optional[int] = None):
+        """
+        Initialize batch runner
+
+        Args:
+            auto_fmu_path: Path to autoLamp FMU
+            lamp_fmu_path: Path to lampController FMU
+            processes: Number of worker processes (CPU count if None)
+        """
+        self.auto_fmu_path = auto_fmu_path
+        self.lamp_fmu_path = lamp_fmu_path
+        self.processes = processes or mp.cpu_count()
+
+    def run(self, scenarios: List[Union[Scenario, Dict[str, Any]]],
+            output_path: Optional[str] = None, chunksize: int = 1) -> Dict[str, np.ndarray]:
+        """
+        Run a sweep of scenarios
+
+        Args:
+            scenarios: Scenarios, or table rows (dicts) of Scenario fields
+            output_path: Write the sweep to this .npz or .parquet file
+            chunksize: Scenarios handed to a process at a time
+
+        Returns:
+            Dict of column name to array
+        """
+        scenarios = [s if isinstance(s, Scenario) else Scenario.from_dict(s) for s in scenarios]
+        start = time.perf_counter()
+
+        with mp.Pool(self.processes, initializer=_init_worker,
+                     initargs=(self.auto_fmu_path, self.lamp_fmu_path)) as pool:
+            runs = pool.map(_run_scenario, scenarios, chunksize=chunksize)
+
+        columns = {
+            name: np.concatenate([run[name] for run in runs]) if runs else np.empty(0)
+            for name in ("t", "ambient", "headlamp", "power")
+        }
+        lengths = np.array([len(run["t"]) for run in runs], dtype=np.int64)
+        columns["scenario"] = np.repeat(np.arange(len(runs), dtype=np.int32), lengths)
+
+        nan = float("nan")
+        columns["scenario_name"] = np.array([s.name for s in scenarios], dtype=str)
+        columns["scenario_threshold"] = np.array(
+            [nan if s.threshold is None else s.threshold for s in scenarios], dtype=np.float64)
+        columns["scenario_hysteresis"] = np.array(
+            [nan if s.hysteresis is None else s.hysteresis for s in scenarios], dtype=np.float64)
+        columns["scenario_T_END"] = np.array([s.T_END for s in scenarios], dtype=np.float64)
+        columns["scenario_dt"] = np.array([s.dt for s in scenarios], dtype=np.float64)
+
+        elapsed = time.perf_counter() - start
+        print(f"Ran {len(scenarios)} scenarios ({int(lengths.sum())} steps) "
+              f"on {self.processes} processes in {elapsed:.2f} s")
+
+        if output_path:
+            write_sweep(columns, output_path)
+        return columns
+
+def write_sweep(columns: Dict[str, np.ndarray], output_path: str):
+    """
+    Write sweep results to a .npz or .parquet file
+
+    NPZ keeps step and scenario columns as separate arrays. Parquet holds
+    one row per step, with the scenario settings repeated on each row.
+
+    Args:
+        columns: Result of BatchRunner.run
+        output_path: Output file path
+    """
+    if output_path.endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        index = columns["scenario"]
+        table = {
+            name: columns[name] for name in ("scenario", "t", "ambient", "headlamp", "power")
+        }
+        for name, values in columns.items():
+            if name.startswith("scenario_"):
+                table[name[len("scenario_"):]] = values[index]
+        pq.write_table(pa.table(table), output_path)
+    else:
+        np.savez_compressed(output_path, **columns)
+    print(f"Sweep written to {output_path}")
@@ -0,0 +1,141 @@
+# fmu_cache.py
+import hashlib
+import os
+import pickle
+import shutil
+import time
+from typing import Any, Dict, Tuple
+from fmpy import read_model_description, extract
+
+# Cache location; override with the FMU_CACHE_DIR environment variable
+DEFAULT_CACHE_DIR = os.environ.get(
+    "FMU_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "vecu_fmu")
+)
+DEFAULT_MAX_ENTRIES = 16
+# Entries used more recently than this (seconds) are never evicted
+EVICT_GRACE = 600.0
+# Written last into an entry; an entry without it is incomplete and rebuilt
+_COMPLETE_MARKER = "complete"
+
+# (path, size, mtime) -> content hash, so an unchanged file is hashed once per process
+_hash_memo: Dict[Tuple[str, int, int], str] = {}
+
+def fmu_hash(fmu_path: str) -> str:
+    """SHA-256 of the FMU file content"""
+    st = os.stat(fmu_path)
+    key = (os.path.abspath(fmu_path), st.st_size, st.st_mtime_ns)
+    digest = _hash_memo.get(key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(fmu_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha.update(chunk)
+        digest = _hash_memo[key] = sha.hexdigest()
+    return digest
+
+def load_fmu(fmu_path: str, cache_dir: str = DEFAULT_CACHE_DIR,
+             max_entries: int = DEFAULT_MAX_ENTRIES) -> Tuple[Any, str]:
+    """
+    Get the model description and extracted directory of an FMU, using the cache
+
+    The first call for a given FMU content extracts it and pickles its model
+    description under cache_dir/<sha256>; later calls (also in new processes)
+    reuse both. The least recently used entries beyond max_entries are removed,
+    except entries used within EVICT_GRACE or still open by another process.
+    An entry is only reused if it is complete (see _COMPLETE_MARKER).
+
+    Args:
+        fmu_path: Path to the .fmu file
+        cache_dir: Cache directory
+        max_entries: Number of FMUs kept in the cache
+
+    Returns:
+        Tuple (model_description, unzipdir)
+    """
+    entry = os.path.join(cache_dir, fmu_hash(fmu_path))
+
+    if not _is_complete(entry):
+        os.makedirs(cache_dir, exist_ok=True)
+        # Extract next to the entry and rename, so a half-written entry is never used
+        tmp_entry = f"{entry}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_entry, ignore_errors=True)
+        extract(fmu_path, unzipdir=os.path.join(tmp_entry, "unzipped"))
+        open(os.path.join(tmp_entry, _COMPLETE_MARKER), "wb").close()
+        if os.path.isdir(entry):
+            # Leftover of an interrupted extraction or eviction
+            shutil.rmtree(entry, ignore_errors=True)
+        try:
+            os.rename(tmp_entry, entry)
+        except OSError:
+            if _is_complete(entry):
+                # Another process cached the same FMU first
+                shutil.rmtree(tmp_entry, ignore_errors=True)
+            else:
+                # The leftover could not be removed (files in use); use our own copy
+                entry = tmp_entry
+        _evict(cache_dir, max_entries, keep=entry)
+
+    unzipdir = os.path.join(entry, "unzipped")
+    md_file = os.path.join(entry, "model_description.pkl")
+
+    model_description = None
+    try:
+        with open(md_file, "rb") as f:
+            model_description = pickle.load(f)
+    except Exception:
+        pass
+
+    if model_description is None:
+        model_description = read_model_description(fmu_path)
+        try:
+            tmp_file = f"{md_file}.tmp-{os.getpid()}"
+            with open(tmp_file, "wb") as f:
+                pickle.dump(model_description, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, md_file)
+        except Exception as e:
+            print(f"Could not cache model description of {fmu_path}: {e}")
+
+    # Mark as recently used for eviction
+    os.utime(entry)
+    return model_description, unzipdir
+
+def _is_complete(entry: str) -> bool:
+    return os.path.isfile(os.path.join(entry, _COMPLETE_MARKER))
+
+def _evict(cache_dir: str, max_entries: int, keep: str):
+    """
+    Remove least recently used cache entries beyond max_entries
+
+    Entries used within EVICT_GRACE are kept, since another process (e.g. a
+    co-simulation worker) may be about to load them. An entry is renamed
+    away before deletion: the rename fails on Windows while its binaries
+    are loaded, so those entries are skipped, and a deletion that stops
+    halfway never leaves a half-deleted entry under the original name.
+    """
+    now = time.time()
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if ".tmp-" in name or path == keep or not os.path.isdir(path):
+            continue
+        if ".trash-" in name:
+            # Left over by an earlier eviction that could not finish
+            shutil.rmtree(path, ignore_errors=True)
+            continue
+        entries.append((os.path.getmtime(path), path))
+
+    entries.sort(reverse=True)
+    for mtime, path in entries[max(max_entries - 1, 0):]:
+        if now - mtime < EVICT_GRACE:
+            continue
+        trash = f"{path}.trash-{os.getpid()}"
+        try:
+            os.rename(path, trash)
+        except OSError:
+            continue  # in use
+        shutil.rmtree(trash, ignore_errors=True)
+
+def clear_cache(cache_dir: str = DEFAULT_CACHE_DIR):
+    """Remove all cached FMUs"""
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    _hash_memo.clear()
@@ -1,25 +1,37 @@
 # can_handler.py
 import numpy as np
 import time
-import os
-import csv
 import can
-import json
-from datetime import datetime
-from fmpy import read_model_description, extract
 from fmpy.fmi2 import FMU2Slave
-import asyncio
 from kuksa_client.grpc import Datapoint
-from kuksa_client.grpc.aio import VSSClient
 
 # Import the converter
 from can_vss_converter import CANtoVSSConverter
+from can_frame_store import CanFrameStore
+from can_rx_queue import CanRxQueue
+from can_trace import CanTraceWriter
+from sim_scheduler import RealTimeScheduler
+from sim_trace import TraceRecorder
+from progress_reporter import ProgressReporter, print_frame_summary
+from can_tx_scheduler import CyclicTxScheduler
+from can_encoder import CANMessageEncoder
+from fmu_cosim_master import CoSimMaster, FMUWorkerSpec
+from fmu_cache import load_fmu
+from fmu_io import FMUIOBinding, resolve_variables
+from fmu_batch import BatchRunner
+from kuksa_connection import acquire_connection, release_connection
+from kuksa_writer import KuksaBatchWriter
+
+# CAN ID of the FD frame carrying the 0x100 and 0x101 signals when can_fd is set
+FD_CONTAINER_ID = 0x180
 
 class CANHandler:
     def __init__(self, auto_fmu_path, lamp_fmu_path, 
                  can_interface='virtual', channel=0, bitrate=500000,
                  kuksa_host="localhost", kuksa_port=55555,
-                 enable_vss_converter=True):
+                 enable_vss_converter=True, rx_buffer_size=100000,
+                 rx_queue_size=10000, rx_overflow_policy="drop_oldest",
+                 cyclic_tx=None, fmu_workers=False, can_fd=False, filter_unmapped=True):
         """
         Initialize CAN Handler
         
@@ -31,6 +43,18 @@ class CANHandler:
             bitrate: CAN bus bitrate
             kuksa_host: Kuksa server host
             kuksa_port: Kuksa server port
+            rx_buffer_size: Number of received frames kept in the RX frame store
+            rx_queue_size: Capacity of the RX queue feeding Kuksa
+            rx_overflow_policy: "drop_oldest", "drop_newest" or "latest_per_id"
+            cyclic_tx: Transmit messages at their definition cycle_time instead
+                       of once per simulation step. None: only while
+                       run_simulation is paced (speed set), since the cycle
+                       is wall-clock time; False/True: never/always
+            fmu_workers: Run each FMU in its own worker process (CoSimMaster)
+            can_fd: Use a CAN FD bus and send the FMU outputs packed into
+                    one FD frame (FD_CONTAINER_ID) instead of 0x100/0x101
+            filter_unmapped: Open the bus with acceptance filters for the CAN IDs
+                             the VSS converter decodes (kernel filters on socketcan)
         """
         self.AUTO_FMU = auto_fmu_path
         self.LAMP_FMU = lamp_fmu_path
@@ -40,6 +64,8 @@ class CANHandler:
         self.kuksa_host = kuksa_host
         self.kuksa_port = kuksa_port
         self.enable_vss_converter = enable_vss_converter
+        self.can_fd = can_fd
+        self.filter_unmapped = filter_unmapped
         
         # Initialize attributes
         self.bus = None
@@ -47,8 +73,19 @@ class CANHandler:
         self.lamp_fmu = None
         self.md_auto = None
         self.md_lamp = None
-        self.rx_buffer = []
+        self.auto_io = None
+        self.lamp_io = None
+        self.rx_buffer = CanFrameStore(capacity=rx_buffer_size, payload_size=64 if can_fd else 8)
+        self.rx_queue = CanRxQueue(capacity=rx_queue_size, policy=rx_overflow_policy)
         self.simulation_time = 0.0
+        self.scheduler = None
+        self.trace = None
+        self.cyclic_tx = cyclic_tx
+        self.tx_scheduler = None
+        self._cyclic_active = cyclic_tx is True
+        self.fmu_workers = fmu_workers
+        self.cosim_master = None
+        self.kuksa_connection = None
         
         # Initialize VSS converter
         if enable_vss_converter:
@@ -59,21 +96,49 @@ class CANHandler:
         else:
             self.vss_converter = None
         
+        # Message definitions drive both the TX encoder and cyclic TX timing;
+        # codec holds them (a private converter when VSS conversion is disabled)
+        self.codec = self.vss_converter or CANtoVSSConverter()
+        self._build_fd_container()
+        
         # Initialize CAN bus
         self.init_can_bus()
         
+        message_definitions = self.codec.message_definitions
+        self.encoder = CANMessageEncoder(message_definitions)
+        if cyclic_tx is not False:
+            self.tx_scheduler = CyclicTxScheduler(self.bus, message_definitions)
+        
         # Load FMUs
         self.load_fmus()
         
+    def _build_fd_container(self):
+        """(Re)build the FD frame from the current 0x100/0x101 definitions when can_fd is set"""
+        if self.can_fd:
+            self.codec.add_fd_container(FD_CONTAINER_ID, "LampOutputsFD", [0x100, 0x101])
+    
     def init_can_bus(self):
         """Initialize virtual CAN bus"""
         self.bus = can.interface.Bus(
             interface=self.can_interface,
             channel=self.channel,
             bitrate=self.bitrate,
-            receive_own_messages=True
+            fd=self.can_fd,
+            receive_own_messages=True,
+            can_filters=self._can_filters()
         )
         print(f"Virtual CAN bus initialized on interface {self.can_interface}, channel {self.channel}")
+    
+    def _can_filters(self):
+        """Acceptance filters for the mapped CAN IDs, or None to receive everything"""
+        if not (self.filter_unmapped and self.vss_converter):
+            return None
+        return self.vss_converter.can_filters() or None
+    
+    def update_can_filters(self):
+        """Re-apply acceptance filters after the VSS mappings changed"""
+        if self.bus is not None and self.filter_unmapped and self.vss_converter:
+            self.bus.set_filters(self._can_filters())
         
     def fmu_to_can_messages(self, headlamp: bool, power: float):
         """
@@ -86,34 +151,23 @@ class CANHandler:
         Returns:
             List of CAN messages
         """
-        messages = []
-        
-        # Headlamp message (CAN ID 0x100)
-        headlamp_data = bytearray(8)
-        headlamp_data[0] = 1 if headlamp else 0
-        msg_headlamp = can.Message(
-            arbitration_id=0x100,
-            data=headlamp_data,
-            is_extended_id=False
-        )
-        messages.append(msg_headlamp)
-        
-        # Power message (CAN ID 0x101)
-        power_data = bytearray(8)
-        power_int = int(power * 1)  # scale if needed
-        power_data[0] = power_int & 0xFF
-        power_data[1] = (power_int >> 8) & 0xFF
-        msg_power = can.Message(
-            arbitration_id=0x101,
-            data=power_data,
-            is_extended_id=False
-        )
-        messages.append(msg_power)
-        
-        return messages
+        if self.can_fd:
+            return [self.encoder.encode(FD_CONTAINER_ID, {"HeadlampStatus": headlamp, "LampPower": power})]
+        return [
+            self.encoder.encode(0x100, {"HeadlampStatus": headlamp}),
+            self.encoder.encode(0x101, {"LampPower": power})
+        ]
     
     def send_can_messages(self, messages):
-        """Send multiple CAN messages to bus"""
+        """
+        Send multiple CAN messages to bus
+        
+        With cyclic TX, messages that have a cycle_time only update the
+        content the TX scheduler sends at that rate.
+        """
+        if self.tx_scheduler and self._cyclic_active:
+            self.tx_scheduler.update_many(messages)
+            return
         for msg in messages:
             try:
                 self.bus.send(msg)
@@ -125,9 +179,12 @@ class CANHandler:
         """Load and instantiate both FMUs"""
         print("\nLoading FMUs...")
         
-        # Load auto FMU
-        self.md_auto = read_model_description(self.AUTO_FMU)
-        unzipdir_auto = extract(self.AUTO_FMU)
+        if self.fmu_workers:
+            self.load_fmu_workers()
+            return
+        
+        # Load auto FMU (extraction and model description are cached on disk)
+        self.md_auto, unzipdir_auto = load_fmu(self.AUTO_FMU)
         self.auto_fmu = FMU2Slave(
             guid=self.md_auto.guid,
             unzipDirectory=unzipdir_auto,
@@ -136,8 +193,7 @@ class CANHandler:
         )
         
         # Load lamp FMU
-        self.md_lamp = read_model_description(self.LAMP_FMU)
-        unzipdir_lamp = extract(self.LAMP_FMU)
+        self.md_lamp, unzipdir_lamp = load_fmu(self.LAMP_FMU)
         self.lamp_fmu = FMU2Slave(
             guid=self.md_lamp.guid,
             unzipDirectory=unzipdir_lamp,
@@ -159,8 +215,40 @@ class CANHandler:
         self.auto_fmu.exitInitializationMode()
         self.lamp_fmu.exitInitializationMode()
         
+        # Resolve I/O variables by name once; each step then reads/writes them in bulk
+        self.auto_io = FMUIOBinding(self.auto_fmu, self.md_auto,
+                                    inputs=["ambient_light"], outputs=["headlamp"])
+        self.lamp_io = FMUIOBinding(self.lamp_fmu, self.md_lamp,
+                                    inputs=["headlamp"], outputs=["lamp_power"])
+        
         print("FMUs loaded and initialized successfully")
     
+    def load_fmu_workers(self):
+        """Start both FMUs in worker processes coordinated by a CoSimMaster"""
+        self.md_auto, _ = load_fmu(self.AUTO_FMU)
+        self.md_lamp, _ = load_fmu(self.LAMP_FMU)
+        ambient_light, auto_headlamp = resolve_variables(self.md_auto, ["ambient_light", "headlamp"])
+        lamp_headlamp, lamp_power = resolve_variables(self.md_lamp, ["headlamp", "lamp_power"])
+        self._worker_vars = (ambient_light, auto_headlamp, lamp_power)
+        
+        self.cosim_master = CoSimMaster([
+            FMUWorkerSpec(
+                name="autoLamp",
+                fmu_path=self.AUTO_FMU,
+                inputs=[ambient_light],
+                outputs=[auto_headlamp]
+            ),
+            FMUWorkerSpec(
+                name="lampController",
+                fmu_path=self.LAMP_FMU,
+                inputs=[lamp_headlamp],
+                outputs=[lamp_power]
+            )
+        ])
+        self.cosim_master.connect("autoLamp", auto_headlamp, "lampController", lamp_headlamp)
+        self.cosim_master.start()
+        print(f"FMU workers started in {len(self.cosim_master.stages)} stage(s)")
+    
     async def connect_vss_converter(self):
         """Connect VSS converter to Kuksa"""
         if self.vss_converter:
@@ -176,6 +264,7 @@ class CANHandler:
         """Callback for received CAN messages with VSS conversion"""
         if msg:
             self.rx_buffer.append(msg)
+            self.rx_queue.put(msg)
             
             # If VSS converter is enabled, process the message
             # if self.vss_converter:
@@ -193,6 +282,8 @@ class CANHandler:
         """Load VSS mappings from JSON file"""
         if self.vss_converter:
             self.vss_converter.load_mappings_from_json(json_file)
+            self._build_fd_container()
+            self.update_can_filters()
         else:
             print("VSS converter is not enabled")
     
@@ -200,6 +291,8 @@ class CANHandler:
         """Add CAN to VSS mapping"""
         if self.vss_converter:
             self.vss_converter.add_vss_mapping(can_id, signal_name, vss_path)
+            self._build_fd_container()
+            self.update_can_filters()
         else:
             print("VSS converter is not enabled")
     
@@ -214,6 +307,12 @@ class CANHandler:
         if self.vss_converter:
             self.vss_converter.print_statistics()
     
+    async def get_kuksa_connection(self):
+        """Get the shared, persistent Kuksa connection"""
+        if self.kuksa_connection is None:
+            self.kuksa_connection = await acquire_connection(self.kuksa_host, self.kuksa_port)
+        return self.kuksa_connection
+    
     async def send_to_kuksa(self, ambient, threshold, hysteresis, is_high_beam, power):
         """
         Send data to Kuksa server
@@ -225,15 +324,15 @@ class CANHandler:
             is_high_beam: High beam state
             power: Power value
         """
-        async with VSSClient(host=self.kuksa_host, port=self.kuksa_port) as client:
-            data_to_send = {
-                "Vehicle.Body.Lights.AmbientLight": Datapoint(value=ambient),
-                "Vehicle.Body.Lighting.Threshold": Datapoint(value=threshold),
-                "Vehicle.Body.Lighting.Hysteresis": Datapoint(value=hysteresis),
-                "Vehicle.Body.Lights.IsHighBeamOn": Datapoint(value=is_high_beam),
-                "Vehicle.Body.Lighting.Power": Datapoint(value=power)
-            }
-            await client.set_current_values(data_to_send)
+        client = await self.get_kuksa_connection()
+        data_to_send = {
+            "Vehicle.Body.Lights.AmbientLight": Datapoint(value=ambient),
+            "Vehicle.Body.Lighting.Threshold": Datapoint(value=threshold),
+            "Vehicle.Body.Lighting.Hysteresis": Datapoint(value=hysteresis),
+            "Vehicle.Body.Lights.IsHighBeamOn": Datapoint(value=is_high_beam),
+            "Vehicle.Body.Lighting.Power": Datapoint(value=power)
+        }
+        await client.set_current_values(data_to_send)
     
     def co_sim_step(self, t, dt=0.05):
         """
@@ -249,30 +348,32 @@ class CANHandler:
         # Generate test ambient signal
         ambient = 250 + 100 * np.sin(t)
         
-        # Set input to autoLamp FMU
-        self.auto_fmu.setReal([0], [ambient])  # ambient_light
+        if self.cosim_master:
+            # Worker processes; headlamp is forwarded between stages by the master
+            ambient_light, auto_headlamp, lamp_power = self._worker_vars
+            self.cosim_master.set_input("autoLamp", ambient_light, ambient)
+            self.cosim_master.step(t, dt)
+            headlamp = bool(self.cosim_master.get_output("autoLamp", auto_headlamp))
+            power = float(self.cosim_master.get_output("lampController", lamp_power))
+            return ambient, headlamp, power, self.fmu_to_can_messages(headlamp, power)
         
         # Step autoLamp FMU
+        self.auto_io.set_inputs({"ambient_light": ambient})
         self.auto_fmu.doStep(t, dt)
-        
-        # Get output from autoLamp FMU
-        headlamp = self.auto_fmu.getBoolean([0])[0]  # headlamp
-        
-        # Set input to lampController FMU
-        self.lamp_fmu.setBoolean([0], [headlamp])
+        headlamp = bool(self.auto_io.read_outputs()["headlamp"])
         
         # Step lampController FMU
+        self.lamp_io.set_inputs({"headlamp": headlamp})
         self.lamp_fmu.doStep(t, dt)
-        
-        # Get output from lampController FMU
-        power = self.lamp_fmu.getReal([1])[0]  # lamp_power
+        power = float(self.lamp_io.read_outputs()["lamp_power"])
         
         # Convert to CAN messages
         can_msgs = self.fmu_to_can_messages(headlamp, power)
         
         return ambient, headlamp, power, can_msgs
     
-    def run_simulation(self, T_END=10.0, dt=0.05, print_progress=True):
+    def run_simulation(self, T_END=10.0, dt=0.05, print_progress=True, speed=None,
+                       trace_path=None, progress_level="info", progress_interval=1.0):
         """
         Run co-simulation and CAN transmission
         
@@ -280,19 +381,39 @@ class CANHandler:
             T_END: Total simulation time
             dt: Time step
             print_progress: Whether to print progress to console
+            speed: Wall-clock pacing (1.0 real time, 10.0 ten times faster,
+                   None as fast as possible)
+            trace_path: Record t/ambient/headlamp/power of every step to this
+                        NPZ file (no recording if None); also kept in self.trace
+            progress_level: "info" prints steps/s and the latest values once per
+                            progress_interval seconds, "debug" also every step
+            progress_interval: Seconds between progress lines
         """
         t = 0.0
+        # An unpaced run finishes faster than any cycle_time: send every step instead
+        cyclic = self.tx_scheduler is not None and (self.cyclic_tx or speed is not None)
+        if self._cyclic_active and not cyclic:
+            self.tx_scheduler.stop()
+        self._cyclic_active = cyclic
+        self.scheduler = RealTimeScheduler(dt, speed=speed)
+        self.trace = TraceRecorder(trace_path, enabled=trace_path is not None)
+        record = self.trace.record
+        progress = ProgressReporter(
+            "sim",
+            fields={"t": "6.2f", "ambient": "8.2f", "headlamp": "", "power": "7.1f"},
+            interval=progress_interval,
+            level=progress_level if print_progress else "off"
+        )
         
         if print_progress:
             print(f"\nStarting simulation for {T_END} seconds with dt={dt}")
-            print("-" * 50)
-            print(f"{'Time':>6} | {'Ambient':>8} | {'Headlamp':>8} | {'Power':>7}")
-            print("-" * 50)
         
         try:
+            self.scheduler.start()
             while t < T_END:
                 # Execute co-simulation step
                 ambient, headlamp, power, can_msgs = self.co_sim_step(t, dt)
+                record(t, ambient, headlamp, power)
                 
                 # Send CAN messages
                 self.send_can_messages(can_msgs)
@@ -304,19 +425,40 @@ class CANHandler:
                 # except can.CanError:
                 #     pass
                 
-                # Print progress
-                if print_progress:
-                    print(f"{t:6.2f} | {ambient:8.2f} | {'ON' if headlamp else 'OFF':^8} | {power:7.1f}")
+                # Progress is aggregated and printed once per interval
+                progress.update(t, ambient, headlamp, power)
                 
                 t += dt
                 
+                # Hold the step deadline (no-op when running as fast as possible)
+                self.scheduler.wait_next()
+                
         finally:
+            self.trace.close()
+            progress.close()
+            if print_progress:
+                self.scheduler.print_statistics()
             # if print_progress:
             #     self.print_received_messages()
                 # if self.vss_converter:
                 #     self.print_vss_statistics()
             print ("Message sent")
     
+    def run_batch(self, scenarios, output_path=None, processes=None):
+        """
+        Run many scenarios on a process pool, without CAN or pacing
+        
+        Args:
+            scenarios: List of fmu_batch.Scenario or dicts of its fields
+            output_path: Optional .npz or .parquet file for the results
+            processes: Number of worker processes (CPU count if None)
+            
+        Returns:
+            Dict of column name to array (see BatchRunner.run)
+        """
+        runner = BatchRunner(self.AUTO_FMU, self.LAMP_FMU, processes=processes)
+        return runner.run(scenarios, output_path=output_path)
+    
     # def _process_received_messages(self):
     #     """Process received CAN messages (non-blocking)"""
     #     try:
@@ -330,20 +472,25 @@ class CANHandler:
     #     except can.CanError:
     #         pass
 
-    def print_received_messages(self):
-        """Print all received CAN messages"""
-        if self.rx_buffer:
-            print("\nReceived CAN messages:")
-            print("-" * 50)
-            print(f"{'ID':>5} | {'DLC':>2} | {'Data':>10}")
-            print("-" * 50)
-            for msg in self.rx_buffer:
-                # print(f"ID: 0x{msg.arbitration_id:03X} DL: {msg.dlc} bytes "
-                #       f"DATA: {' '.join(f'{b:02X}' for b in msg.data)}")
-                print(f"0x{msg.arbitration_id:03X} | {msg.dlc:>3} | "
-                      f"{' '.join(f'{b:02X}' for b in msg.data)}")
-        else:
-            print("\nNo CAN messages received")
+    def print_received_messages(self, debug=False):
+        """
+        Print received CAN messages
+        
+        Args:
+            debug: Print every frame instead of one summary line per CAN ID
+        """
+        print_frame_summary(self.rx_buffer, debug=debug)
+    
+    def save_rx_trace(self, path):
+        """
+        Write the frames held in the RX buffer to a binary trace file
+        
+        Args:
+            path: Trace file path (replay with can_trace.replay_into_converter)
+        """
+        with CanTraceWriter(path, payload_size=self.rx_buffer.payload_size) as writer:
+            writer.write_store(self.rx_buffer)
+        print(f"Saved {len(self.rx_buffer)} CAN frames to {path}")
     
     def get_can_data(self, can_id=None):
         """
@@ -358,8 +505,8 @@ class CANHandler:
         if can_id is not None:
             if isinstance(can_id, str):
                 can_id = int(can_id, 16)
-            return [msg for msg in self.rx_buffer if msg.arbitration_id == can_id]
-        return self.rx_buffer
+            return self.rx_buffer.get_by_id(can_id)
+        return list(self.rx_buffer)
     
     def get_simulation_data(self):
         """
@@ -369,9 +516,9 @@ class CANHandler:
             Dictionary with simulation data
         """
         return {
-            'ambient': self.auto_fmu.getReal([0])[0] if self.auto_fmu else None,
-            'headlamp': self.auto_fmu.getBoolean([0])[0] if self.auto_fmu else None,
-            'power': self.lamp_fmu.getReal([1])[0] if self.lamp_fmu else None
+            'ambient': float(self.auto_io.inputs["ambient_light"]) if self.auto_io else None,
+            'headlamp': bool(self.auto_io.read_outputs()["headlamp"]) if self.auto_io else None,
+            'power': float(self.lamp_io.read_outputs()["lamp_power"]) if self.lamp_io else None
         }
     
     async def shutdown(self):
@@ -382,11 +529,22 @@ class CANHandler:
         if self.vss_converter:
             await self.disconnect_vss_converter()
         
+        # Release shared Kuksa connection
+        if self.kuksa_connection:
+            await release_connection(self.kuksa_connection)
+            self.kuksa_connection = None
+        
+        # Stop cyclic transmission before the bus goes away
+        if self.tx_scheduler:
+            self.tx_scheduler.stop()
+        
         # Shutdown CAN bus
         if self.bus:
             self.bus.shutdown()
         
         # Terminate FMUs
+        if self.cosim_master:
+            self.cosim_master.shutdown()
         if self.auto_fmu:
             self.auto_fmu.terminate()
             self.auto_fmu.freeInstance()
@@ -443,27 +601,19 @@ class CANHandler:
     #         self.print_received_messages()
 
     async def data_to_Kuksa(self):
+        """Decode the buffered frames with the VSS converter and publish them to Kuksa"""
+        if not self.vss_converter:
+            print("VSS converter is not enabled")
+            return
         try:
-            async with VSSClient(host=self.kuksa_host, port=self.kuksa_port) as client:
-                for msg in self.rx_buffer:
-                    can_id_hex = hex(msg.arbitration_id)
-                    if can_id_hex == "0x100":
-                        value = "true" if msg.data[0] else "false"
-                        print(f"CAN ID 0x100 -> Vehicle.Body.Lights.IsHighBeamOn = {value}")
-                        await client.set_current_values({
-                            "Vehicle.Body.Lights.IsHighBeamOn": Datapoint(value=value)})
-                        await asyncio.sleep(0.1)
-                    elif can_id_hex == "0x101":
-                        # Power value (2 bytes, little-endian)
-                        if len(msg.data) >= 2:
-                            power_value = (msg.data[1] << 8) | msg.data[0]
-                            print(f"CAN ID 0x101 -> Vehicle.Body.Lighting.Power = {power_value}")
-                            
-                            # Send to Kuksa
-                            await client.set_current_values({
-                                "Vehicle.Body.Lighting.Power": Datapoint(value=power_value)
-                            })
-                            await asyncio.sleep(0.1)
+            client = await self.get_kuksa_connection()
+            # Coalesce all buffered frames into one RPC instead of one per frame
+            writer = KuksaBatchWriter(client)
+            for msg in self.rx_queue.drain():
+                vss_signals = self.vss_converter.convert_can_message(msg)
+                if vss_signals:
+                    writer.submit(vss_signals)
+            await writer.flush()
         except Exception as e:
             print(f"Lỗi kết nối: {e}")
 
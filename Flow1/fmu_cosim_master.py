@@ -0,0 +1,264 @@
+# fmu_cosim_master.py
+import multiprocessing as mp
+import threading
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import Dict, List, Tuple
+import numpy as np
+
+# Shared memory header: [t, dt, command]
+_HEADER = 3
+_CMD_STEP = 0.0
+_CMD_STOP = 1.0
+
+@dataclass
+class FMUWorkerSpec:
+    """
+    One FMU run in its own worker process
+
+    Inputs and outputs are (type, value reference) pairs with type "real"
+    or "bool".
+    """
+    name: str
+    fmu_path: str
+    inputs: List[Tuple[str, int]] = field(default_factory=list)
+    outputs: List[Tuple[str, int]] = field(default_factory=list)
+    start_time: float = 0.0
+
+def _split(variables, offset):
+    """Split (type, vr) pairs into real/bool value references and shm slots"""
+    real_vrs, real_slots, bool_vrs, bool_slots = [], [], [], []
+    for i, (kind, vr) in enumerate(variables):
+        if kind == "real":
+            real_vrs.append(vr)
+            real_slots.append(offset + i)
+        elif kind == "bool":
+            bool_vrs.append(vr)
+            bool_slots.append(offset + i)
+        else:
+            raise ValueError(f"Unsupported variable type: {kind}")
+    return real_vrs, real_slots, bool_vrs, bool_slots
+
+def _fmu_worker(spec: FMUWorkerSpec, shm_name: str, in_offset: int, out_offset: int,
+                start_barrier, done_barrier):
+    """Worker process: load one FMU, then step it each time the master releases the barrier"""
+    from fmpy.fmi2 import FMU2Slave
+    from fmu_cache import load_fmu
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    fmu = None
+    values = None
+    instantiated = initialized = False
+    try:
+        values = np.ndarray((shm.size // 8,), dtype=np.float64, buffer=shm.buf)
+        in_real_vrs, in_real_slots, in_bool_vrs, in_bool_slots = _split(spec.inputs, in_offset)
+        out_real_vrs, out_real_slots, out_bool_vrs, out_bool_slots = _split(spec.outputs, out_offset)
+
+        md, unzipdir = load_fmu(spec.fmu_path)
+        fmu = FMU2Slave(
+            guid=md.guid,
+            unzipDirectory=unzipdir,
+            modelIdentifier=md.coSimulation.modelIdentifier,
+            instanceName=f"{spec.name}_instance"
+        )
+        fmu.instantiate()
+        instantiated = True
+        fmu.setupExperiment(startTime=spec.start_time)
+        fmu.enterInitializationMode()
+        fmu.exitInitializationMode()
+        initialized = True
+
+        while True:
+            start_barrier.wait()
+            if values[2] == _CMD_STOP:
+                break
+
+            if in_real_vrs:
+                fmu.setReal(in_real_vrs, values[in_real_slots].tolist())
+            if in_bool_vrs:
+                fmu.setBoolean(in_bool_vrs, [bool(v) for v in values[in_bool_slots]])
+
+            fmu.doStep(values[0], values[1])
+
+            if out_real_vrs:
+                values[out_real_slots] = fmu.getReal(out_real_vrs)
+            if out_bool_vrs:
+                values[out_bool_slots] = fmu.getBoolean(out_bool_vrs)
+
+            done_barrier.wait()
+    except threading.BrokenBarrierError:
+        pass
+    except Exception as e:
+        print(f"FMU worker {spec.name} failed: {e}")
+        start_barrier.abort()
+        done_barrier.abort()
+    finally:
+        # Only undo the steps that succeeded, so cleanup cannot hide the real error
+        if instantiated:
+            try:
+                if initialized:
+                    fmu.terminate()
+                fmu.freeInstance()
+            except Exception as e:
+                print(f"FMU worker {spec.name} cleanup failed: {e}")
+        values = None  # release the buffer view before closing
+        shm.close()
+
+class CoSimMaster:
+    """
+    Co-simulation master running every FMU in its own process
+
+    FMU inputs and outputs live in one shared-memory float64 array. FMUs
+    are grouped into stages from their connections: FMUs in the same stage
+    do not depend on each other within a macro step and run concurrently,
+    released by a barrier; outputs are copied to connected inputs between
+    stages, so results match serial stepping in dependency order.
+    """
+
+    def __init__(self, specs: List[FMUWorkerSpec]):
+        """
+        Initialize master
+
+        Args:
+            specs: One FMUWorkerSpec per FMU; names must be unique
+        """
+        self.specs = {spec.name: spec for spec in specs}
+        if len(self.specs) != len(specs):
+            raise ValueError("FMU worker names must be unique")
+
+        # Shared memory layout: header, then inputs and outputs of each FMU
+        self._slots: Dict[Tuple[str, str, Tuple[str, int]], int] = {}
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        size = _HEADER
+        for spec in specs:
+            in_offset = size
+            out_offset = in_offset + len(spec.inputs)
+            size = out_offset + len(spec.outputs)
+            self._offsets[spec.name] = (in_offset, out_offset)
+            for i, var in enumerate(spec.inputs):
+                self._slots[(spec.name, "in", tuple(var))] = in_offset + i
+            for i, var in enumerate(spec.outputs):
+                self._slots[(spec.name, "out", tuple(var))] = out_offset + i
+        self._size = size
+
+        # (source FMU, source slot, destination FMU, destination slot)
+        self.connections: List[Tuple[str, int, str, int]] = []
+        self.stages: List[List[str]] = []
+
+        self._shm = None
+        self.values = None
+        self._processes = []
+        self._barriers = []
+
+    def connect(self, src: str, src_var: Tuple[str, int], dst: str, dst_var: Tuple[str, int]):
+        """
+        Feed an FMU output into another FMU's input every macro step
+
+        Args:
+            src: Source FMU name
+            src_var: Source output (type, value reference)
+            dst: Destination FMU name
+            dst_var: Destination input (type, value reference)
+        """
+        self.connections.append((
+            src, self._slots[(src, "out", tuple(src_var))],
+            dst, self._slots[(dst, "in", tuple(dst_var))]
+        ))
+
+    def _build_stages(self) -> List[List[str]]:
+        """Group FMUs into dependency stages (Kahn's algorithm)"""
+        deps = {name: set() for name in self.specs}
+        for src, _, dst, _ in self.connections:
+            if src != dst:
+                deps[dst].add(src)
+
+        stages, done = [], set()
+        while len(done) < len(deps):
+            stage = [name for name, d in deps.items() if name not in done and d <= done]
+            if not stage:
+                raise ValueError("FMU connections form an algebraic loop")
+            stages.append(stage)
+            done.update(stage)
+        return stages
+
+    def start(self):
+        """Create shared memory and start one worker process per FMU"""
+        self.stages = self._build_stages()
+        self._shm = shared_memory.SharedMemory(create=True, size=self._size * 8)
+        self.values = np.ndarray((self._size,), dtype=np.float64, buffer=self._shm.buf)
+        self.values[:] = 0.0
+
+        for stage in self.stages:
+            start_barrier = mp.Barrier(len(stage) + 1)
+            done_barrier = mp.Barrier(len(stage) + 1)
+            self._barriers.append((start_barrier, done_barrier))
+            for name in stage:
+                in_offset, out_offset = self._offsets[name]
+                process = mp.Process(
+                    target=_fmu_worker,
+                    args=(self.specs[name], self._shm.name, in_offset, out_offset,
+                          start_barrier, done_barrier),
+                    name=f"fmu-{name}",
+                    daemon=True
+                )
+                process.start()
+                self._processes.append(process)
+
+        # Per stage: connections whose source FMU is in that stage
+        stage_of = {name: i for i, stage in enumerate(self.stages) for name in stage}
+        self._stage_links = [([], []) for _ in self.stages]
+        for src, src_slot, _, dst_slot in self.connections:
+            src_slots, dst_slots = self._stage_links[stage_of[src]]
+            src_slots.append(src_slot)
+            dst_slots.append(dst_slot)
+
+    def set_input(self, name: str, var: Tuple[str, int], value: float):
+        """Set an external FMU input for the next step"""
+        self.values[self._slots[(name, "in", tuple(var))]] = value
+
+    def get_output(self, name: str, var: Tuple[str, int]) -> float:
+        """Get an FMU output from the last step"""
+        return self.values[self._slots[(name, "out", tuple(var))]]
+
+    def step(self, t: float, dt: float):
+        """
+        Advance all FMUs by one macro step
+
+        Args:
+            t: Current simulation time
+            dt: Time step
+        """
+        values = self.values
+        values[0] = t
+        values[1] = dt
+        values[2] = _CMD_STEP
+        for (start_barrier, done_barrier), (src_slots, dst_slots) in zip(self._barriers, self._stage_links):
+            try:
+                start_barrier.wait()
+                done_barrier.wait()
+            except threading.BrokenBarrierError:
+                raise RuntimeError("An FMU worker failed; see its error above")
+            if src_slots:
+                values[dst_slots] = values[src_slots]
+
+    def shutdown(self):
+        """Stop workers (they terminate their FMUs) and free shared memory"""
+        if self.values is not None:
+            self.values[2] = _CMD_STOP
+            for start_barrier, _ in self._barriers:
+                try:
+                    start_barrier.wait(timeout=5.0)
+                except threading.BrokenBarrierError:
+                    pass
+        for process in self._processes:
+            process.join(timeout=5.0)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        self._barriers = []
+
+        if self._shm is not None:
+            self.values = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
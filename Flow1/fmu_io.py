@@ -0,0 +1,130 @@
+# fmu_io.py
+from ctypes import c_double
+from typing import Dict, List, Tuple, Union
+import numpy as np
+from fmpy.fmi2 import fmi2Boolean, fmi2Real, fmi2ValueReference
+
+# FMI variable type -> binding group
+_KINDS = {"Real": "real", "Boolean": "bool"}
+
+def resolve_variables(model_description, names: List[str]) -> List[Tuple[str, int]]:
+    """
+    Resolve variable names to (type, value reference) pairs
+
+    Args:
+        model_description: fmpy model description
+        names: Variable names
+
+    Returns:
+        List of ("real" | "bool", value reference), in the order of names
+    """
+    variables = {var.name: var for var in model_description.modelVariables}
+    refs = []
+    for name in names:
+        var = variables.get(name)
+        if var is None:
+            raise KeyError(f"Variable '{name}' not found in {model_description.modelName}")
+        kind = _KINDS.get(var.type)
+        if kind is None:
+            raise ValueError(f"Variable '{name}' has unsupported type {var.type}")
+        refs.append((kind, var.valueReference))
+    return refs
+
+class _VariableBlock:
+    """
+    Values of a set of FMU variables in one buffer
+
+    Reals are laid out first, then booleans, so each group is one contiguous
+    ctypes array passed straight to fmi2Set*/fmi2Get*. A NumPy structured
+    view over the same buffer gives access by variable name without copies.
+    """
+
+    def __init__(self, names: List[str], refs: List[Tuple[str, int]]):
+        real = [(name, vr) for name, (kind, vr) in zip(names, refs) if kind == "real"]
+        bools = [(name, vr) for name, (kind, vr) in zip(names, refs) if kind == "bool"]
+        real_bytes = len(real) * 8
+        size = real_bytes + len(bools) * 4
+
+        # c_double storage keeps the buffer 8-byte aligned
+        self._storage = (c_double * max((size + 7) // 8, 1))()
+
+        self.real_vrs = (fmi2ValueReference * len(real))(*[vr for _, vr in real])
+        self.real_values = (fmi2Real * len(real)).from_buffer(self._storage)
+        self.bool_vrs = (fmi2ValueReference * len(bools))(*[vr for _, vr in bools])
+        self.bool_values = (fmi2Boolean * len(bools)).from_buffer(self._storage, real_bytes)
+
+        dtype = np.dtype({
+            "names": [name for name, _ in real] + [name for name, _ in bools],
+            "formats": [np.float64] * len(real) + [np.int32] * len(bools),
+            "offsets": [8 * i for i in range(len(real))] + [real_bytes + 4 * i for i in range(len(bools))],
+            "itemsize": len(self._storage) * 8
+        })
+        self.values = np.frombuffer(self._storage, dtype=dtype, count=1).reshape(())
+
+class FMUIOBinding:
+    """
+    Name-based, vectorized access to the inputs and outputs of one FMU
+
+    Variable names are resolved to value references once. Each step then
+    costs one fmi2SetReal/fmi2SetBoolean call for all inputs and one
+    fmi2GetReal/fmi2GetBoolean call for all outputs, on preallocated ctypes
+    buffers, however many variables are bound.
+    """
+
+    def __init__(self, fmu, model_description, inputs: List[str], outputs: List[str]):
+        """
+        Initialize binding
+
+        Args:
+            fmu: Instantiated fmpy FMU2Slave
+            model_description: Model description of the FMU
+            inputs: Input variable names (Real or Boolean)
+            outputs: Output variable names (Real or Boolean)
+        """
+        self.fmu = fmu
+        self._in = _VariableBlock(inputs, resolve_variables(model_description, inputs))
+        self._out = _VariableBlock(outputs, resolve_variables(model_description, outputs))
+
+    @property
+    def inputs(self) -> np.ndarray:
+        """Input values by name (0-d structured array); sent by write_inputs"""
+        return self._in.values
+
+    @property
+    def outputs(self) -> np.ndarray:
+        """Output values by name (0-d structured array); updated by read_outputs"""
+        return self._out.values
+
+    def set_inputs(self, values: Dict[str, Union[float, bool]]):
+        """
+        Set input values by name and send all inputs to the FMU
+
+        Args:
+            values: Variable name to value; inputs not given keep their last value
+        """
+        inputs = self._in.values
+        for name, value in values.items():
+            inputs[name] = value
+        self.write_inputs()
+
+    def write_inputs(self):
+        """Send all input values to the FMU"""
+        fmu, block = self.fmu, self._in
+        if block.real_vrs:
+            fmu.fmi2SetReal(fmu.component, block.real_vrs, len(block.real_vrs), block.real_values)
+        if block.bool_vrs:
+            fmu.fmi2SetBoolean(fmu.component, block.bool_vrs, len(block.bool_vrs), block.bool_values)
+
+    def read_outputs(self) -> np.ndarray:
+        """
+        Read all outputs from the FMU
+
+        Returns:
+            Output values by name; the array is reused by the next read
+        """
+        fmu, block = self.fmu, self._out
+        if block.real_vrs:
+            fmu.fmi2GetReal(fmu.component, block.real_vrs, len(block.real_vrs), block.real_values)
+        if block.bool_vrs:
+            fmu.fmi2GetBoolean(fmu.component, block.bool_vrs, len(block.bool_vrs), block.bool_values)
+        return block.values
@@ -0,0 +1,267 @@
+# kuksa_connection.py
+import asyncio
+from typing import Dict, Any, Optional, Tuple
+from kuksa_client.grpc.aio import VSSClient
+
+# gRPC status codes meaning the channel failed, not the request:
+# CANCELLED, DEADLINE_EXCEEDED, UNAVAILABLE
+_TRANSPORT_STATUS_CODES = (1, 4, 14)
+
+def is_connection_error(exc: Exception) -> bool:
+    """
+    Tell connection failures from the server rejecting values
+
+    Args:
+        exc: Exception raised by a VSSClient call
+
+    Returns:
+        True if reconnecting may help
+    """
+    if isinstance(exc, (ConnectionError, OSError, asyncio.TimeoutError)):
+        return True
+    code = getattr(exc, "code", None)
+    if callable(code):
+        # grpc.RpcError: code() returns a StatusCode whose value is (int, name)
+        try:
+            code = code().value[0]
+        except Exception:
+            return True
+    else:
+        # kuksa_client VSSClientError carries the gRPC status in error["code"]
+        error = getattr(exc, "error", None)
+        code = error.get("code") if isinstance(error, dict) else None
+    return code in _TRANSPORT_STATUS_CODES
+
+class KuksaConnection:
+    """
+    Persistent VSSClient connection with automatic reconnect
+
+    Writes made while disconnected are held (latest value per VSS path) and
+    sent as soon as the connection is re-established.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 55555,
+                 backoff_initial: float = 0.5, backoff_max: float = 30.0,
+                 buffer_size: int = 10000):
+        """
+        Initialize Kuksa connection
+
+        Args:
+            host: Kuksa server host
+            port: Kuksa server port
+            backoff_initial: First reconnect delay in seconds
+            backoff_max: Upper bound of the reconnect delay in seconds
+            buffer_size: Maximum number of VSS paths held while disconnected
+        """
+        self.host = host
+        self.port = port
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.buffer_size = buffer_size
+
+        self.client: Optional[VSSClient] = None
+        self.connected = False
+        self.refcount = 0
+
+        # VSS path -> Datapoint held while disconnected
+        self.buffer: Dict[str, Any] = {}
+        self._reconnect_task: Optional[asyncio.Task] = None
+
+        # Statistics
+        self.stats = {
+            "connects": 0,
+            "disconnects": 0,
+            "writes": 0,
+            "buffered": 0,
+            "dropped": 0,
+            "rejected": 0,
+            "errors": 0
+        }
+
+    async def connect(self) -> bool:
+        """
+        Open the connection once; on failure keep retrying in the background
+
+        Returns:
+            True if connected now
+        """
+        if self.connected:
+            return True
+        if self._reconnect_task is not None and not self._reconnect_task.done():
+            return False
+        if await self._open():
+            return True
+        self._schedule_reconnect()
+        return False
+
+    async def _open(self) -> bool:
+        """Try to open a new VSSClient"""
+        try:
+            client = VSSClient(host=self.host, port=self.port)
+            await client.__aenter__()
+        except Exception as e:
+            print(f"Failed to connect to Kuksa at {self.host}:{self.port}: {e}")
+            return False
+
+        self.client = client
+        self.connected = True
+        self.stats["connects"] += 1
+        print(f"Connected to Kuksa server at {self.host}:{self.port}")
+        return True
+
+    async def _drop_client(self):
+        """Close the current client after a failure, ignoring errors"""
+        client, self.client = self.client, None
+        self.connected = False
+        self.stats["disconnects"] += 1
+        if client is not None:
+            try:
+                await client.__aexit__(None, None, None)
+            except Exception:
+                pass
+
+    def _schedule_reconnect(self):
+        """Start the reconnect loop unless it is already running"""
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self):
+        """Reconnect with exponential backoff, then flush held writes"""
+        delay = self.backoff_initial
+        while True:
+            while not self.connected:
+                await asyncio.sleep(delay)
+                if await self._open():
+                    break
+                delay = min(delay * 2, self.backoff_max)
+
+            if not self.buffer:
+                return
+            held, self.buffer = self.buffer, {}
+            try:
+                await self.client.set_current_values(held)
+                self.stats["writes"] += 1
+                return
+            except Exception as e:
+                self.stats["errors"] += 1
+                if not is_connection_error(e):
+                    self.stats["rejected"] += len(held)
+                    print(f"Kuksa rejected {len(held)} held values: {e}")
+                    return
+                print(f"Flushing held values to Kuksa failed, reconnecting: {e}")
+                await self._drop_client()
+                # Values held meanwhile are newer than the ones being put back
+                self._hold({path: dp for path, dp in held.items() if path not in self.buffer})
+
+    def _hold(self, updates: Dict[str, Any]):
+        """Keep updates until the connection is back"""
+        for vss_path, datapoint in updates.items():
+            if vss_path in self.buffer or len(self.buffer) < self.buffer_size:
+                self.buffer[vss_path] = datapoint
+                self.stats["buffered"] += 1
+            else:
+                self.stats["dropped"] += 1
+
+    async def set_current_values(self, updates: Dict[str, Any]):
+        """
+        Write datapoints, holding them if the connection is down
+
+        Values the server rejects (unknown path, wrong type, ...) are logged
+        and dropped without reconnecting; only connection failures drop the
+        client.
+
+        Args:
+            updates: Dictionary mapping VSS paths to Datapoint objects
+        """
+        if not self.connected:
+            self._hold(updates)
+            self._schedule_reconnect()
+            return
+
+        try:
+            await self.client.set_current_values(updates)
+            self.stats["writes"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            if not is_connection_error(e):
+                self.stats["rejected"] += len(updates)
+                print(f"Kuksa rejected write of {len(updates)} values: {e}")
+                return
+            print(f"Kuksa write failed, reconnecting: {e}")
+            await self._drop_client()
+            self._hold(updates)
+            self._schedule_reconnect()
+
+    async def close(self):
+        """Stop reconnecting, flush held writes if still connected and close the client"""
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            try:
+                await self._reconnect_task
+            except asyncio.CancelledError:
+                pass
+            self._reconnect_task = None
+
+        if self.buffer and self.connected:
+            held, self.buffer = self.buffer, {}
+            try:
+                await self.client.set_current_values(held)
+                self.stats["writes"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                self.buffer = held
+                print(f"Error flushing held values to Kuksa on close: {e}")
+        if self.buffer:
+            self.stats["dropped"] += len(self.buffer)
+            print(f"Dropped {len(self.buffer)} held values on close (Kuksa not reachable)")
+            self.buffer = {}
+
+        if self.client is not None:
+            try:
+                await self.client.__aexit__(None, None, None)
+                print("Disconnected from Kuksa server")
+            except Exception as e:
+                print(f"Error disconnecting from Kuksa: {e}")
+        self.client = None
+        self.connected = False
+
+    def get_statistics(self) -> Dict[str, int]:
+        """Get connection statistics"""
+        return self.stats.copy()
+
+
+# Shared connections keyed by (host, port)
+_connections: Dict[Tuple[str, int], KuksaConnection] = {}
+
+async def acquire_connection(host: str, port: int, **kwargs) -> KuksaConnection:
+    """
+    Get the shared connection for a Kuksa server, connecting it if needed
+
+    Args:
+        host: Kuksa server host
+        port: Kuksa server port
+        **kwargs: KuksaConnection options, used when the connection is created
+
+    Returns:
+        Shared KuksaConnection
+    """
+    key = (host, port)
+    connection = _connections.get(key)
+    if connection is None:
+        connection = KuksaConnection(host, port, **kwargs)
+        _connections[key] = connection
+    connection.refcount += 1
+    await connection.connect()
+    return connection
+
+async def release_connection(connection: KuksaConnection):
+    """
+    Release a shared connection; the last user closes it
+
+    Args:
+        connection: Connection returned by acquire_connection
+    """
+    connection.refcount -= 1
+    if connection.refcount <= 0:
+        _connections.pop((connection.host, connection.port), None)
+        await connection.close()
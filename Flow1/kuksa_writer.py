@@ -0,0 +1,101 @@
+# kuksa_writer.py
+import asyncio
+from typing import Dict, Any, Optional
+from kuksa_client.grpc import Datapoint
+
+class KuksaBatchWriter:
+    """
+    Async writer stage that coalesces VSS datapoints and sends them in batches
+
+    Values are collected over a flush window, only the latest value per VSS
+    path is kept, and each flush is a single set_current_values RPC.
+    """
+
+    def __init__(self, client=None, flush_interval: float = 0.1, max_batch_size: int = 256):
+        """
+        Initialize batch writer
+
+        Args:
+            client: Connected client exposing async set_current_values
+            flush_interval: Maximum time in seconds a value waits before flushing
+            max_batch_size: Number of distinct VSS paths that triggers an early flush
+        """
+        self.client = client
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+
+        # VSS path -> latest value waiting to be sent
+        self.pending: Dict[str, Any] = {}
+        self._flush_event = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        # Statistics
+        self.stats = {
+            "signals_submitted": 0,
+            "signals_coalesced": 0,
+            "signals_written": 0,
+            "batches_sent": 0,
+            "errors": 0
+        }
+
+    def submit(self, vss_signals: Dict[str, Any]):
+        """
+        Queue VSS values for the next flush
+
+        Args:
+            vss_signals: Dictionary mapping VSS paths to values
+        """
+        pending = self.pending
+        before = len(pending)
+        pending.update(vss_signals)
+        self.stats["signals_submitted"] += len(vss_signals)
+        self.stats["signals_coalesced"] += before + len(vss_signals) - len(pending)
+
+        if len(pending) >= self.max_batch_size:
+            self._flush_event.set()
+
+    async def flush(self):
+        """Send all pending values in one RPC"""
+        if not self.pending or self.client is None:
+            return
+
+        batch, self.pending = self.pending, {}
+        try:
+            await self.client.set_current_values(
+                {vss_path: Datapoint(value=value) for vss_path, value in batch.items()}
+            )
+            self.stats["batches_sent"] += 1
+            self.stats["signals_written"] += len(batch)
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"Error writing batch to Kuksa: {e}")
+
+    async def _run(self):
+        """Flush loop: flush when the window elapses or the batch is full"""
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_event.clear()
+            await self.flush()
+
+    def start(self):
+        """Start the background flush task on the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush task and send whatever is still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def get_statistics(self) -> Dict[str, int]:
+        """Get writer statistics"""
+        return self.stats.copy()
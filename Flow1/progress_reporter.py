@@ -0,0 +1,137 @@
+# progress_reporter.py
+import json
+import time
+from typing import Dict, Optional
+import numpy as np
+
+LEVELS = ("off", "info", "debug")
+
+class ProgressReporter:
+    """
+    Throttled console progress for high-rate loops
+
+    update() only counts events and keeps a reference to the latest values;
+    a line with the event rate over the last interval and those values is
+    rendered at most once per interval. At level "debug" every event is
+    printed as well; "off" prints nothing. With structured=True lines are
+    emitted as JSON objects for log collectors.
+    """
+
+    def __init__(self, label: str, fields: Optional[Dict[str, str]] = None, interval: float = 1.0,
+                 level: str = "info", structured: bool = False, unit: str = "steps"):
+        """
+        Initialize reporter
+
+        Args:
+            label: Name shown on every line
+            fields: Value name to format spec, in update() argument order
+            interval: Seconds between rendered lines
+            level: "off", "info" (interval lines) or "debug" (also every event)
+            structured: Emit JSON lines instead of text
+            unit: Name of the counted events, e.g. "steps" or "frames"
+        """
+        if level not in LEVELS:
+            raise ValueError(f"Unknown progress level: {level}")
+        self.label = label
+        self.fields = dict(fields or {})
+        self.interval = interval
+        self.level = level
+        self.structured = structured
+        self.unit = unit
+
+        self.total = 0
+        self._count = 0
+        self._values = ()
+        self._start = self._last_render = time.perf_counter()
+        self._next_render = self._start + interval
+
+    def _format(self, values) -> str:
+        return " ".join(
+            f"{name}={format(value, spec)}" for (name, spec), value in zip(self.fields.items(), values)
+        )
+
+    def _emit(self, rate: float, values, final: bool = False):
+        if self.structured:
+            record = {"label": self.label, "total": self.total, f"{self.unit}_per_sec": round(rate, 3)}
+            for name, value in zip(self.fields, values):
+                record[name] = value.item() if isinstance(value, np.generic) else value
+            if final:
+                record["final"] = True
+            print(json.dumps(record))
+        else:
+            text = self._format(values)
+            print(f"[{self.label}] {rate:.1f} {self.unit}/s | {self.total} {self.unit}"
+                  + (f" | {text}" if text else ""))
+
+    def update(self, *values, n: int = 1):
+        """
+        Count n events and remember the latest values
+
+        Args:
+            values: Latest values, in fields order
+            n: Number of events
+        """
+        if self.level == "off":
+            return
+        self.total += n
+        self._count += n
+        self._values = values
+        if self.level == "debug":
+            print(f"[{self.label}] {self._format(values)}")
+
+        now = time.perf_counter()
+        if now >= self._next_render:
+            self._emit(self._count / (now - self._last_render), values)
+            self._count = 0
+            self._last_render = now
+            self._next_render = now + self.interval
+
+    def close(self):
+        """Render a final line with the average rate over the whole run"""
+        if self.level == "off":
+            return
+        elapsed = time.perf_counter() - self._start
+        rate = self.total / elapsed if elapsed > 0 else 0.0
+        if self.structured:
+            self._emit(rate, self._values, final=True)
+            return
+        text = self._format(self._values)
+        print(f"[{self.label}] done | {self.total} {self.unit} in {elapsed:.2f} s "
+              f"({rate:.1f} {self.unit}/s)" + (f" | {text}" if text else ""))
+
+def print_frame_summary(frames, debug: bool = False):
+    """
+    Print received CAN frames as one line per CAN ID
+
+    Each line shows the frame count, the mean rate between the first and
+    last frame, and the latest payload. With debug=True every frame is
+    printed instead.
+
+    Args:
+        frames: CanFrameStore with the received frames
+        debug: Print every frame
+    """
+    if not len(frames):
+        print("\nNo CAN messages received")
+        return
+
+    print("\nReceived CAN messages:")
+    print("-" * 50)
+    if debug:
+        print(f"{'ID':>5} | {'DLC':>2} | {'Data':>10}")
+        print("-" * 50)
+        for msg in frames:
+            print(f"0x{msg.arbitration_id:03X} | {msg.dlc:>3} | "
+                  f"{' '.join(f'{b:02X}' for b in msg.data)}")
+        return
+
+    timestamps, ids, dlcs, payloads = frames.arrays()
+    print(f"{'ID':>5} | {'Count':>7} | {'Rate':>9} | {'Last data'}")
+    print("-" * 50)
+    for can_id in np.unique(ids):
+        rows = np.flatnonzero(ids == can_id)
+        first, last = rows[0], rows[-1]
+        span = timestamps[last] - timestamps[first]
+        rate = f"{(len(rows) - 1) / span:7.1f}/s" if span > 0 else f"{'-':>9}"
+        data = " ".join(f"{b:02X}" for b in payloads[last][:dlcs[last]])
+        print(f"0x{int(can_id):03X} | {len(rows):>7} | {rate} | {data}")
@@ -0,0 +1,121 @@
+# sim_scheduler.py
+import time
+from typing import Dict, Optional
+
+class RealTimeScheduler:
+    """
+    Paces co-simulation steps against wall-clock time using absolute deadlines
+
+    Step k is due at start + k * dt / speed, so the cost of each step does
+    not accumulate as drift. speed=None runs as fast as possible while
+    still collecting timing statistics.
+    """
+
+    def __init__(self, dt: float, speed: Optional[float] = 1.0, spin_margin: float = 0.001):
+        """
+        Initialize scheduler
+
+        Args:
+            dt: Simulation time step in seconds
+            speed: Simulation seconds per wall-clock second (1.0 real time,
+                   10.0 ten times faster, None as fast as possible)
+            spin_margin: Final part of each wait, in seconds, spent polling the
+                         clock instead of sleeping, for sub-millisecond accuracy
+        """
+        self.dt = dt
+        self.speed = speed
+        self.period = dt / speed if speed else 0.0
+        self.spin_margin = spin_margin
+
+        self._start = None
+        self._step = 0
+        self._last = None
+        self.reset_statistics()
+
+    def reset_statistics(self):
+        """Clear jitter and overrun statistics"""
+        self.stats = {
+            "steps": 0,
+            "overruns": 0,
+            "skipped_periods": 0,
+            "max_jitter": 0.0,
+            "total_jitter": 0.0,
+            "max_step_time": 0.0,
+            "total_step_time": 0.0
+        }
+
+    def start(self):
+        """Set the time base; call right before the first step"""
+        self._start = time.perf_counter()
+        self._last = self._start
+        self._step = 0
+
+    def wait_next(self):
+        """
+        Wait for the deadline of the next step
+
+        Call once at the end of every step. A step that finishes after its
+        deadline counts as an overrun; if it is late by whole periods, those
+        periods are skipped instead of being run back to back.
+        """
+        if self._start is None:
+            self.start()
+
+        now = time.perf_counter()
+        stats = self.stats
+        step_time = now - self._last
+        stats["steps"] += 1
+        stats["total_step_time"] += step_time
+        if step_time > stats["max_step_time"]:
+            stats["max_step_time"] = step_time
+
+        self._step += 1
+        if not self.period:
+            self._last = now
+            return
+
+        deadline = self._start + self._step * self.period
+        if now > deadline:
+            stats["overruns"] += 1
+            missed = int((now - deadline) / self.period)
+            if missed:
+                # Re-anchor on the current period rather than bursting to catch up
+                stats["skipped_periods"] += missed
+                self._step += missed
+                deadline += missed * self.period
+            if now > deadline:
+                self._last = now
+                return
+
+        remaining = deadline - now - self.spin_margin
+        if remaining > 0:
+            time.sleep(remaining)
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+
+        jitter = now - deadline
+        stats["total_jitter"] += jitter
+        if jitter > stats["max_jitter"]:
+            stats["max_jitter"] = jitter
+        self._last = now
+
+    def get_statistics(self) -> Dict[str, float]:
+        """Get timing statistics, including mean jitter and step time"""
+        stats = self.stats.copy()
+        steps = stats["steps"] or 1
+        stats["mean_jitter"] = stats["total_jitter"] / steps
+        stats["mean_step_time"] = stats["total_step_time"] / steps
+        return stats
+
+    def print_statistics(self):
+        """Print timing statistics"""
+        stats = self.get_statistics()
+        print("\n=== Scheduler Statistics ===")
+        print(f"Steps: {stats['steps']}")
+        print(f"Period: {self.period * 1000:.3f} ms")
+        print(f"Overruns: {stats['overruns']} (skipped periods: {stats['skipped_periods']})")
+        print(f"Jitter: mean {stats['mean_jitter'] * 1000:.3f} ms, max {stats['max_jitter'] * 1000:.3f} ms")
+        print(f"Step time: mean {stats['mean_step_time'] * 1000:.3f} ms, max {stats['max_step_time'] * 1000:.3f} ms")
+        print("============================\n")
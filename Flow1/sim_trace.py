@@ -0,0 +1,158 @@
+# sim_trace.py
+import csv
+import os
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+
+# Columns of a co-simulation step trace
+STEP_COLUMNS = {"t": np.float64, "ambient": np.float64, "headlamp": np.bool_, "power": np.float64}
+
+class TraceRecorder:
+    """
+    Records per-step simulation outputs into columnar NumPy buffers
+
+    Rows go into a preallocated structured chunk; a full chunk is kept and a
+    new one allocated, so recording never copies earlier rows. flush()
+    appends the full chunks not yet written to a raw "<path>.part" file on
+    a background thread (see load_partial_trace), so each row is written
+    once; close() writes the complete NPZ file and removes the part file.
+    A disabled recorder ignores every call.
+    """
+
+    def __init__(self, path: Optional[str] = None, columns: Dict[str, type] = None,
+                 chunk_size: int = 4096, enabled: bool = True, flush_every: int = 16):
+        """
+        Initialize recorder
+
+        Args:
+            path: NPZ file written by close (nothing is written if None)
+            columns: Column name to NumPy dtype, in record() argument order
+                     (STEP_COLUMNS by default)
+            chunk_size: Rows per preallocated chunk
+            enabled: Record anything at all
+            flush_every: Start a background flush every this many full chunks
+                         (0 = keep everything in memory until close)
+        """
+        self.path = path
+        self.columns = dict(columns or STEP_COLUMNS)
+        self.chunk_size = chunk_size
+        self.enabled = enabled
+        self.flush_every = flush_every
+
+        self._dtype = np.dtype(list(self.columns.items()))
+        self._chunks: List[np.ndarray] = []
+        self._chunk = np.empty(chunk_size, dtype=self._dtype) if enabled else None
+        self._pos = 0
+        self._writer = None
+        self._part_path = f"{path}.part" if path else None
+        self._chunks_written = 0
+
+    def record(self, *values):
+        """Append one row, values in column order"""
+        if not self.enabled:
+            return
+        self._chunk[self._pos] = values
+        self._pos += 1
+        if self._pos == self.chunk_size:
+            self._chunks.append(self._chunk)
+            self._chunk = np.empty(self.chunk_size, dtype=self._dtype)
+            self._pos = 0
+            if self.flush_every and len(self._chunks) % self.flush_every == 0:
+                self.flush()
+
+    def __len__(self) -> int:
+        return len(self._chunks) * self.chunk_size + self._pos
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Get the recorded trace
+
+        Returns:
+            Column name to array of all rows
+        """
+        if not self.enabled:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in self.columns.items()}
+        rows = np.concatenate(self._chunks + [self._chunk[:self._pos]])
+        return {name: rows[name] for name in self.columns}
+
+    def _append_part(self, chunks: List[np.ndarray], truncate: bool):
+        try:
+            with open(self._part_path, "wb" if truncate else "ab") as f:
+                for chunk in chunks:
+                    chunk.tofile(f)
+        except Exception as e:
+            print(f"Could not write trace {self._part_path}: {e}")
+
+    def _write(self, path: str, arrays: Dict[str, np.ndarray]):
+        # Write next to the target and rename, so readers never see a partial file
+        tmp_path = f"{path}.tmp.npz"
+        try:
+            np.savez(tmp_path, **arrays)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Could not write trace {path}: {e}")
+
+    def flush(self):
+        """Append full chunks not written yet to the part file on a background thread"""
+        if not self.enabled or not self.path:
+            return
+        new_chunks = self._chunks[self._chunks_written:]
+        if not new_chunks:
+            return
+        # One write at a time, so chunks land in order
+        self.wait()
+        truncate = self._chunks_written == 0
+        self._chunks_written = len(self._chunks)
+        self._writer = threading.Thread(
+            target=self._append_part, args=(new_chunks, truncate), name="trace-writer", daemon=True
+        )
+        self._writer.start()
+
+    def wait(self):
+        """Wait for a background flush to finish"""
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+
+    def close(self):
+        """Write the complete trace to path and remove the part file"""
+        self.wait()
+        if not self.enabled or not self.path:
+            return
+        self._write(self.path, self.arrays())
+        if self._chunks_written:
+            try:
+                os.remove(self._part_path)
+            except OSError:
+                pass
+            self._chunks_written = 0
+        print(f"Trace of {len(self)} steps written to {self.path}")
+
+    def to_csv(self, csv_path: str):
+        """Export the recorded trace as CSV, one row per step"""
+        arrays = self.arrays()
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.columns)
+            writer.writerows(zip(*(arrays[name].tolist() for name in self.columns)))
+
+def load_trace(path: str) -> Dict[str, np.ndarray]:
+    """Load a trace written by TraceRecorder"""
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+def load_partial_trace(part_path: str, columns: Dict[str, type] = None) -> Dict[str, np.ndarray]:
+    """
+    Load the rows flushed so far by a recorder that was not closed
+
+    Args:
+        part_path: "<path>.part" file of the recorder
+        columns: Column name to NumPy dtype used by the recorder (STEP_COLUMNS by default)
+
+    Returns:
+        Column name to array of the flushed rows
+    """
+    columns = dict(columns or STEP_COLUMNS)
+    rows = np.fromfile(part_path, dtype=np.dtype(list(columns.items())))
+    return {name: rows[name] for name in columns}
@@ -3,8 +3,10 @@ import asyncio
 import json
 import can
 from fmu_can_handler import CANHandler
+from can_frame_store import CanFrameStore
+from progress_reporter import print_frame_summary
 
-rx_buffer=[]
+rx_buffer = CanFrameStore(capacity=100000)
 # Đường dẫn FMU
 AUTO_FMU = r"C:\Users\LOQ\Workspace\06_Emtek\01_Workspace\Test_vECU\autoLamp.fmu"
 LAMP_FMU = r"C:\Users\LOQ\Workspace\06_Emtek\01_Workspace\Test_vECU\lampController.fmu"
@@ -23,20 +25,9 @@ def on_msg_received(msg):
     if msg:
         rx_buffer.append(msg)
 
-def print_received_messages():
-        """Print all received CAN messages"""
-        if rx_buffer:
-            print("\nReceived CAN messages:")
-            print("-" * 50)
-            print(f"{'ID':>5} | {'DLC':>2} | {'Data':>10}")
-            print("-" * 50)
-            for msg in rx_buffer:
-                # print(f"ID: 0x{msg.arbitration_id:03X} DL: {msg.dlc} bytes "
-                #       f"DATA: {' '.join(f'{b:02X}' for b in msg.data)}")
-                print(f"0x{msg.arbitration_id:03X} | {msg.dlc:>3} | "
-                      f"{' '.join(f'{b:02X}' for b in msg.data)}")
-        else:
-            print("\nNo CAN messages received")
+def print_received_messages(debug=False):
+        """Print received CAN messages: one summary line per CAN ID, or every frame with debug=True"""
+        print_frame_summary(rx_buffer, debug=debug)
 
 async def main():
     # Tạo instance của CANHandler
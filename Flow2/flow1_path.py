@@ -0,0 +1,16 @@
+# flow1_path.py
+"""
+Makes the shared Flow1 modules importable
+
+Import this module before any Flow1 module. Flow1 is found next to Flow2
+by default; set FLOW1_DIR to use a copy somewhere else.
+"""
+import os
+import sys
+
+FLOW1_DIR = os.path.abspath(os.environ.get(
+    "FLOW1_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Flow1")
+))
+
+if FLOW1_DIR not in sys.path:
+    sys.path.insert(0, FLOW1_DIR)
@@ -12,26 +12,43 @@ from kuksa_client.grpc import Datapoint
 from kuksa_client.grpc.aio import VSSClient
 from can.interfaces.udp_multicast import UdpMulticastBus
 
+# Shared components live in Flow1
+import flow1_path  # noqa: F401
+from sim_scheduler import RealTimeScheduler
+from sim_trace import TraceRecorder
+from progress_reporter import ProgressReporter
+from can_encoder import CANMessageEncoder
+from fmu_cache import load_fmu
+from fmu_io import FMUIOBinding
+from vecu_messages import VECU_MESSAGE_DEFINITIONS
+
+# Compiled once; frames are reused and repacked every step
+encoder = CANMessageEncoder(VECU_MESSAGE_DEFINITIONS)
+
 # Đường dẫn FMU
 AUTO_FMU = r"C:\Users\LOQ\Workspace\06_Emtek\01_Workspace\Test_vECU\autoLamp.fmu"
 LAMP_FMU = r"C:\Users\LOQ\Workspace\06_Emtek\01_Workspace\Test_vECU\lampController.fmu"
 
 # Can bus initialization
-def init_can_bus(_vCanBus: bool):
+def init_can_bus(_vCanBus: bool, fd: bool = False, can_filters=None):
+        # can_filters: acceptance filters (kernel-side on socketcan, python-can otherwise)
         if _vCanBus:
-            """Initialize virtual CAN bus"""
+            """Initialize virtual CAN bus (fd: CAN FD, frames up to 64 bytes)"""
             bus = can.interface.Bus(
                 interface='virtual',
                 channel=0,
                 bitrate=500000,
-                receive_own_messages=True
+                fd=fd,
+                receive_own_messages=True,
+                can_filters=can_filters
             )
             print(f"Virtual CAN bus initialized")
         else:
-            # Tạo bus multicast
+            # Tạo bus multicast (always carries CAN FD frames)
             bus = can.interface.Bus(
                 channel=UdpMulticastBus.DEFAULT_GROUP_IPv6,
-                interface='udp_multicast')
+                interface='udp_multicast',
+                can_filters=can_filters)
             print(f"UDP Multicast bus initialized")
         
         return bus
@@ -40,9 +57,8 @@ def init_can_bus(_vCanBus: bool):
 def load_fmus():
         """Load and instantiate both FMUs"""
         print("\nLoading FMUs...")
-        # Load auto FMU
-        md_auto = read_model_description(AUTO_FMU)
-        unzipdir_auto = extract(AUTO_FMU)
+        # Load auto FMU (extraction and model description are cached on disk)
+        md_auto, unzipdir_auto = load_fmu(AUTO_FMU)
         auto_fmu = FMU2Slave(
             guid=md_auto.guid,
             unzipDirectory=unzipdir_auto,
@@ -50,8 +66,7 @@ def load_fmus():
             instanceName="autoLamp_instance"
         )
         # Load lamp FMU
-        md_lamp = read_model_description(LAMP_FMU)
-        unzipdir_lamp = extract(LAMP_FMU)
+        md_lamp, unzipdir_lamp = load_fmu(LAMP_FMU)
         lamp_fmu = FMU2Slave(
             guid=md_lamp.guid,
             unzipDirectory=unzipdir_lamp,
@@ -71,7 +86,10 @@ def load_fmus():
         
         print("FMUs loaded and initialized successfully")
 
-        return auto_fmu, lamp_fmu
+        # Resolve I/O variables by name once; each step then reads/writes them in bulk
+        auto_io = FMUIOBinding(auto_fmu, md_auto, inputs=["ambient_light"], outputs=["headlamp"])
+        lamp_io = FMUIOBinding(lamp_fmu, md_lamp, inputs=["headlamp"], outputs=["lamp_power"])
+        return auto_io, lamp_io
 
 # FMU to CAN message conversion
 def fmu_to_can_messages(headlamp: bool, power: float):
@@ -85,31 +103,9 @@ def fmu_to_can_messages(headlamp: bool, power: float):
         Returns:
             List of CAN messages
         """
-        messages = []
-        # Headlamp message (CAN ID 0x100)
-        headlamp_data = bytearray(8)
-        headlamp_data[0] = 1 if headlamp else 0
-        headlamp_data[1] = int(power) & 0xFF
-        headlamp_data[2] = (int(power) >> 8) & 0xFF
-        msg_headlamp = can.Message(
-            arbitration_id=0x100,
-            data=headlamp_data,
-            is_extended_id=False
-        )
-        messages.append(msg_headlamp)
-        # # Power message (CAN ID 0x101)
-        # power_data = bytearray(8)
-        # power_int = int(power * 1)  # scale if needed
-        # power_data[0] = power_int & 0xFF
-        # power_data[1] = (power_int >> 8) & 0xFF
-        # msg_power = can.Message(
-        #     arbitration_id=0x101,
-        #     data=power_data,
-        #     is_extended_id=False
-        # )
-        # messages.append(msg_power)
-
-        return messages
+        return [
+            encoder.encode(0x100, {"HeadlampStatus": headlamp, "LampPower": power})
+        ]
 
 # CAN Tx function
 def send_can_messages(bus, messages):
@@ -121,12 +117,14 @@ def send_can_messages(bus, messages):
             except can.CanError as e:
                 print("CAN send failed:", e)
 
-def co_sim_step(t, auto_fmu, lamp_fmu, dt):
+def co_sim_step(t, auto_io, lamp_io, dt):
         """
         Execute one co-simulation step
         
         Args:
             t: Current simulation time
+            auto_io: I/O binding of the autoLamp FMU
+            lamp_io: I/O binding of the lampController FMU
             dt: Time step
             
         Returns:
@@ -135,30 +133,23 @@ def co_sim_step(t, auto_fmu, lamp_fmu, dt):
         # Generate test ambient signal
         ambient = 250 + 100 * np.sin(t)
         
-        # Set input to autoLamp FMU
-        auto_fmu.setReal([0], [ambient])  # ambient_light
-        
         # Step autoLamp FMU
-        auto_fmu.doStep(t, dt)
-        
-        # Get output from autoLamp FMU
-        headlamp = auto_fmu.getBoolean([0])[0]  # headlamp
-        
-        # Set input to lampController FMU
-        lamp_fmu.setBoolean([0], [headlamp])
+        auto_io.set_inputs({"ambient_light": ambient})
+        auto_io.fmu.doStep(t, dt)
+        headlamp = bool(auto_io.read_outputs()["headlamp"])
         
         # Step lampController FMU
-        lamp_fmu.doStep(t, dt)
-        
-        # Get output from lampController FMU
-        power = lamp_fmu.getReal([1])[0]  # lamp_power
+        lamp_io.set_inputs({"headlamp": headlamp})
+        lamp_io.fmu.doStep(t, dt)
+        power = float(lamp_io.read_outputs()["lamp_power"])
         
         # Convert to CAN messages
         can_msgs = fmu_to_can_messages(headlamp, power)
         
         return ambient, headlamp, power, can_msgs
     
-def run_simulation(bus, T_END, dt, print_progress=True):
+def run_simulation(bus, T_END, dt, print_progress=True, speed=1.0, trace_path=None,
+                   progress_level="info", progress_interval=1.0):
         """
         Run co-simulation and CAN transmission
         
@@ -166,23 +157,36 @@ def run_simulation(bus, T_END, dt, print_progress=True):
             T_END: Total simulation time
             dt: Time step
             print_progress: Whether to print progress to console
+            speed: Wall-clock pacing (1.0 real time, 10.0 ten times faster,
+                   None as fast as possible)
+            trace_path: Record t/ambient/headlamp/power of every step to this
+                        NPZ file (no recording if None)
+            progress_level: "info" prints steps/s and the latest values once per
+                            progress_interval seconds, "debug" also every step
+            progress_interval: Seconds between progress lines
         """
         t = 0.0
-        auto_fmu, lamp_fmu = load_fmus()
+        auto_io, lamp_io = load_fmus()
+        scheduler = RealTimeScheduler(dt, speed=speed)
+        trace = TraceRecorder(trace_path, enabled=trace_path is not None)
+        progress = ProgressReporter(
+            "sim",
+            fields={"t": "6.2f", "ambient": "8.2f", "headlamp": "", "power": "7.1f"},
+            interval=progress_interval,
+            level=progress_level if print_progress else "off"
+        )
         if print_progress:
             print(f"\nStarting simulation for {T_END} seconds with dt={dt}")
-            print("-" * 50)
-            print(f"{'Time':>6} | {'Ambient':>8} | {'Headlamp':>8} | {'Power':>7}")
-            print("-" * 50)
         
         try:
+            scheduler.start()
             while t < T_END:
                 # Execute co-simulation step
-                ambient, headlamp, power, can_msgs = co_sim_step(t, auto_fmu, lamp_fmu, dt)
+                ambient, headlamp, power, can_msgs = co_sim_step(t, auto_io, lamp_io, dt)
+                trace.record(t, ambient, headlamp, power)
                 
                 # Send CAN messages
                 send_can_messages(bus, can_msgs)
-                time.sleep(0.1)
                 # Try to receive CAN messages (non-blocking)
                 # try:
                 #     received_msg = self.bus.recv(timeout=0.001)
@@ -190,13 +194,19 @@ def run_simulation(bus, T_END, dt, print_progress=True):
                 # except can.CanError:
                 #     pass
                 
-                # Print progress
-                if print_progress:
-                    print(f"{t:6.2f} | {ambient:8.2f} | {'ON' if headlamp else 'OFF':^8} | {power:7.1f}")
+                # Progress is aggregated and printed once per interval
+                progress.update(t, ambient, headlamp, power)
                 
                 t += dt
                 
+                # Absolute-deadline pacing: step cost does not add up as drift
+                scheduler.wait_next()
+                
         finally:
+            trace.close()
+            progress.close()
+            if print_progress:
+                scheduler.print_statistics()
             # if print_progress:
             #     self.print_received_messages()
                 # if self.vss_converter:
@@ -207,7 +217,7 @@ def run_simulation(bus, T_END, dt, print_progress=True):
 async def main():
     
     vCan0 = init_can_bus(False)
-    run_simulation(vCan0,T_END=6, dt=1)
+    run_simulation(vCan0,T_END=6, dt=1, speed=10.0)
 
 # Run the async main function
 asyncio.run(main())
\ No newline at end of file
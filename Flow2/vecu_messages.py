@@ -0,0 +1,24 @@
+# vecu_messages.py
+
+# Shared CAN components live in Flow1
+import flow1_path  # noqa: F401
+from can_vss_converter import CANMessageDefinition, CANSignalDefinition, CANSignalType
+
+# Frames exchanged between fmu_sim (vECU) and the zonal controller
+VECU_MESSAGE_DEFINITIONS = {
+    # 0x100: byte 0 headlamp, bytes 1-2 lamp power (little-endian)
+    0x100: CANMessageDefinition(
+        can_id=0x100,
+        name="LampStatus",
+        dlc=8,
+        signals={
+            "HeadlampStatus": CANSignalDefinition(
+                name="HeadlampStatus", start_bit=0, bit_length=8,
+                signal_type=CANSignalType.BOOLEAN),
+            "LampPower": CANSignalDefinition(
+                name="LampPower", start_bit=8, bit_length=16,
+                signal_type=CANSignalType.UINT16, unit="W")
+        },
+        description="Headlamp state and lamp power from the vECU"
+    )
+}
@@ -1,28 +1,43 @@
 import asyncio
-import json
 import can
 from can.interfaces.udp_multicast import UdpMulticastBus
-from kuksa_client.grpc import Datapoint
-from kuksa_client.grpc.aio import VSSClient
 
-rx_buffer = []
+# Shared Kuksa/CAN components live in Flow1
+import flow1_path  # noqa: F401
+from can_frame_store import CanFrameStore
+from can_rx_queue import CanRxQueue
+from can_trace import CanTraceWriter
+from can_vss_converter import CANtoVSSConverter
+from progress_reporter import ProgressReporter, print_frame_summary
+from vecu_messages import VECU_MESSAGE_DEFINITIONS
+
+KUKSA_HOST = "localhost"
+KUKSA_PORT = 60000
+
+rx_buffer = CanFrameStore(capacity=100000, payload_size=64)
+# Frames waiting for upload; drained atomically so none are lost to a clear()
+rx_queue = CanRxQueue(capacity=10000, policy="drop_oldest")
 
 # Can bus initialization
-def init_can_bus(_vCanBus: bool):
+def init_can_bus(_vCanBus: bool, fd: bool = False, can_filters=None):
+        # can_filters: acceptance filters (kernel-side on socketcan, python-can otherwise)
         if _vCanBus:
-            """Initialize virtual CAN bus"""
+            """Initialize virtual CAN bus (fd: CAN FD, frames up to 64 bytes)"""
             bus = can.interface.Bus(
                 interface='virtual',
                 channel=0,
                 bitrate=500000,
-                receive_own_messages=True
+                fd=fd,
+                receive_own_messages=True,
+                can_filters=can_filters
             )
             print(f"Virtual CAN bus initialized")
         else:
-            # Tạo bus multicast
+            # Tạo bus multicast (always carries CAN FD frames)
             bus = can.interface.Bus(
                 channel=UdpMulticastBus.DEFAULT_GROUP_IPv6,
-                interface='udp_multicast')
+                interface='udp_multicast',
+                can_filters=can_filters)
             print(f"UDP Multicast bus initialized")
         
         return bus
@@ -45,85 +60,86 @@ def Receive_can_msg(bus):
             #           f"{' '.join(f'{b:02X}' for b in rx_msg.data)}")
             on_msg_received(rx_msg)
 
-# Polling mode 
-def can_listener(bus):
-    print("Starting Notifier (Press Ctrl+C to stop)...")
-    print("\nReceived CAN messages:")
-    print("-" * 50)
-    print(f"{'ID':>5} | {'DLC':>2} | {'Data':>10}")
-    print("-" * 50)
-
-    # Khởi tạo Notifier. 
-    # [on_msg_received] là danh sách các hàm/listener sẽ được gọi.
-    notifier = can.Notifier(bus, [on_msg_received])
-    
-    return notifier
-
 def on_msg_received(msg):
     if msg:
         rx_buffer.append(msg)
+        rx_queue.put(msg)
         # print(f"0x{msg.arbitration_id:03X} | {msg.dlc:>3} | "
         #               f"{' '.join(f'{b:02X}' for b in msg.data)}")
 
-def print_received_messages():
-    """Print all received CAN messages"""
-    if rx_buffer:
-        print("\nReceived CAN messages:")
-        print("-" * 50)
-        print(f"{'ID':>5} | {'DLC':>2} | {'Data':>10}")
-        print("-" * 50)
-        for msg in rx_buffer:
-                # print(f"ID: 0x{msg.arbitration_id:03X} DL: {msg.dlc} bytes "
-                #       f"DATA: {' '.join(f'{b:02X}' for b in msg.data)}")
-            print(f"0x{msg.arbitration_id:03X} | {msg.dlc:>3} | "
-                      f"{' '.join(f'{b:02X}' for b in msg.data)}")
-    else:
-        print("\nNo CAN messages received")
+def print_received_messages(debug=False):
+    """Print received CAN messages: one summary line per CAN ID, or every frame with debug=True"""
+    print_frame_summary(rx_buffer, debug=debug)
 
-async def data_to_Kuksa():
-        try:
-            async with VSSClient(host="localhost", port=60000) as client:
-                for msg in rx_buffer:
-                    can_id_hex = hex(msg.arbitration_id)
-                    if can_id_hex == "0x100":
-                        value = "true" if msg.data[0] else "false"
-                        print(f"CAN ID 0x100 -> Vehicle.Body.Lights.IsHighBeamOn = {value}")
-                        await client.set_current_values({
-                            "Vehicle.Body.Lights.IsHighBeamOn": Datapoint(value=value)})
-                        await asyncio.sleep(0.1)
+def create_converter():
+    """Create the CAN to VSS converter with the vECU frame layout"""
+    converter = CANtoVSSConverter(kuksa_host=KUKSA_HOST, kuksa_port=KUKSA_PORT)
+    for msg_def in VECU_MESSAGE_DEFINITIONS.values():
+        converter.add_message_definition(msg_def)
+    converter.add_vss_mapping(0x100, "LampPower", "Vehicle.Body.Lighting.Power")
+    return converter
 
-                        power_value = (msg.data[2] << 8) | msg.data[1]
-                        print(f"CAN ID 0x100 -> Vehicle.Body.Lighting.Power = {power_value}")
-                            
-                        # Send to Kuksa
-                        await client.set_current_values({
-                            "Vehicle.Body.Lighting.Power": Datapoint(value=power_value)
-                        })
-                        await asyncio.sleep(0.1)
-                    # elif can_id_hex == "0x101":
-                    #     # Power value (2 bytes, little-endian)
-                    #     if len(msg.data) >= 2:
-                    #         power_value = (msg.data[1] << 8) | msg.data[0]
-                    #         print(f"CAN ID 0x101 -> Vehicle.Body.Lighting.Power = {power_value}")
-                            
-                    #         # Send to Kuksa
-                    #         await client.set_current_values({
-                    #             "Vehicle.Body.Lighting.Power": Datapoint(value=power_value)
-                    #         })
-                    #         await asyncio.sleep(0.1)
-                rx_buffer.clear()
-        except Exception as e:
-            print(f"Lỗi kết nối: {e}")
+async def can_pipeline(bus, converter, trace_path=None, heartbeat_interval=0.5):
+    """
+    Event-driven CAN -> VSS pipeline
 
-async def main():
-    vCan0 = init_can_bus(False)
+    The notifier runs on the event loop and wakes the decode stage only when
+    frames arrive; decoded signals go to the converter's batched writer,
+    which publishes on its own flush window. With trace_path, every frame
+    the bus delivers is also recorded to a binary trace file for later
+    replay; a bus opened with can_filters (as in main) delivers only the
+    mapped IDs, so open it without filters to capture all traffic.
+    Every heartbeat_interval seconds, also while no frames arrive, values
+    past their max_silence are republished.
+    """
+    loop = asyncio.get_running_loop()
+    frames_ready = asyncio.Event()
+
+    def on_frame(msg):
+        on_msg_received(msg)
+        frames_ready.set()
+
+    listeners = [on_frame]
+    recorder = CanTraceWriter(trace_path, payload_size=64) if trace_path else None
+    if recorder:
+        listeners.append(recorder)
+    notifier = can.Notifier(bus, listeners, loop=loop)
+    progress = ProgressReporter("can-rx", fields={"last_id": "#05x"}, unit="frames")
+    next_heartbeat = loop.time() + heartbeat_interval
     try:
-        notifier = can_listener(vCan0)
         while True:
-            await data_to_Kuksa()
-    except KeyboardInterrupt:
-        print("Stopped by user")
+            try:
+                await asyncio.wait_for(frames_ready.wait(), timeout=heartbeat_interval)
+            except asyncio.TimeoutError:
+                pass
+            frames_ready.clear()
+            frames = rx_queue.drain()
+            for msg in frames:
+                await converter.process_and_send_can_message(msg)
+            if frames:
+                progress.update(frames[-1].arbitration_id, n=len(frames))
+            # Heartbeats run on the timer, not only when frames arrive
+            if loop.time() >= next_heartbeat:
+                converter.republish_silent()
+                next_heartbeat = loop.time() + heartbeat_interval
+    finally:
         notifier.stop()
+        progress.close()
+        if recorder:
+            recorder.close()
+
+async def main():
+    converter = create_converter()
+    # Only frames the converter decodes are delivered to the pipeline
+    vCan0 = init_can_bus(False, can_filters=converter.can_filters() or None)
+    # One persistent broker connection, reconnected with backoff if it drops
+    await converter.connect_to_kuksa()
+    try:
+        await can_pipeline(vCan0, converter)
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        print("Stopped by user")
+    finally:
+        await converter.disconnect_from_kuksa()
         vCan0.shutdown()
 
 # Run the async main function
@@ -1,28 +1,176 @@
 import can
 from collections import deque
+import os
+import sys
 import threading
 
+
+def _use_flow1():
+    """Make the shared Flow1 modules importable (FLOW1_DIR overrides the location)"""
+    flow1_dir = os.path.abspath(os.environ.get(
+        "FLOW1_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "Flow1")
+    ))
+    if flow1_dir not in sys.path:
+        sys.path.insert(0, flow1_dir)
+
+class SpscRing:
+    """
+    Single-producer ring buffer addressed by sequence numbers
+
+    The producer (notifier thread) never blocks: it writes the slot and then
+    publishes the new head. Consumers keep their own cursor and detect
+    overruns by comparing it against the head.
+    """
+
+    def __init__(self, capacity=1024):
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self.capacity = size
+        self._mask = size - 1
+        self._slots = [None] * size
+        self.head = 0  # sequence number of the next write
+
+    def push(self, item):
+        seq = self.head
+        self._slots[seq & self._mask] = item
+        self.head = seq + 1  # publish only after the slot is written
+
+    def read_from(self, cursor):
+        """
+        Read items published since cursor
+
+        Returns:
+            Tuple (items, new_cursor, lost) where lost counts items
+            overwritten before they could be read
+        """
+        head = self.head
+        start = max(cursor, head - self.capacity)
+        items = self._slice(start, head)
+
+        # Producer may have overwritten the oldest slots while we copied
+        valid_from = self.head + 1 - self.capacity
+        if valid_from > start:
+            items = items[valid_from - start:]
+            start = valid_from
+
+        return items, head, start - cursor
+
+    def snapshot(self):
+        """Get the items currently held, oldest first"""
+        items, _, _ = self.read_from(0)
+        return items
+
+    def _slice(self, start, end):
+        if start >= end:
+            return []
+        i, j = start & self._mask, end & self._mask
+        if i < j:
+            return self._slots[i:j]
+        return self._slots[i:] + self._slots[:j]
+
+    def __len__(self):
+        return min(self.head, self.capacity)
+
+
+class RingReader:
+    """Consumer cursor over an SpscRing with overrun counters"""
+
+    def __init__(self, ring, from_oldest=False):
+        self.ring = ring
+        # The oldest slot may be mid-overwrite, so read_from never returns it
+        # once the ring is full; starting there would count a false overrun
+        self.cursor = max(0, ring.head + 1 - ring.capacity) if from_oldest else ring.head
+        self.overruns = 0
+        self.frames_lost = 0
+
+    def read(self):
+        """Get all items published since the last read"""
+        items, self.cursor, lost = self.ring.read_from(self.cursor)
+        if lost:
+            self.overruns += 1
+            self.frames_lost += lost
+        return items
+
+
+def _filter_predicate(can_filters):
+    """Software check of a frame against python-can acceptance filters"""
+    def accept(msg):
+        for f in can_filters:
+            if "extended" in f and f["extended"] != msg.is_extended_id:
+                continue
+            if not (msg.arbitration_id ^ f["can_id"]) & f["can_mask"]:
+                return True
+        return False
+    return accept
+
+
 class CanInterface:
-    def __init__(self, channel=0, bitrate=500000, rx_buffer_size=1000):
+    def __init__(self, channel=0, bitrate=500000, rx_buffer_size=1000, history_size=0,
+                 lock_free=False, compact=False, fd=False, data_bitrate=2000000, can_filters=None):
+        # fd: CAN FD bus (frames up to 64 bytes, data phase at data_bitrate with BRS)
+        # can_filters: acceptance filters, e.g. CANtoVSSConverter.can_filters(); they
+        #              apply to every listener, recorders included (see start_recording)
+        self.fd = fd
+        self.can_filters = can_filters
         self.bus = can.interface.Bus(
             interface="virtual",
             channel=channel,
             bitrate=bitrate,
-            receive_own_messages=True
+            fd=fd,
+            data_bitrate=data_bitrate if fd else None,
+            receive_own_messages=True,
+            can_filters=can_filters
         )
 
-        self.rx_buffer = deque(maxlen=rx_buffer_size)
+        # lock_free: SPSC ring, consumers read incrementally via create_reader()
+        # compact: columnar CanFrameStore instead of can.Message objects
+        self.lock_free = lock_free
+        if lock_free:
+            self.rx_buffer = SpscRing(rx_buffer_size)
+        elif compact:
+            _use_flow1()
+            from can_frame_store import CanFrameStore
+            self.rx_buffer = CanFrameStore(capacity=rx_buffer_size, payload_size=64 if fd else 8)
+        else:
+            self.rx_buffer = deque(maxlen=rx_buffer_size)
         self.lock = threading.Lock()
 
-        self.listener = can.Listener()
-        self.listener.on_message_received = self._on_msg_received
+        # Per-ID index: last frame, plus optional ring of the last history_size frames
+        self.latest = {}
+        self.history_size = history_size
+        self.history = {}
+
+        # Notifier accepts plain callables (can.Listener is abstract)
+        if lock_free:
+            self.listener = self._on_msg_received_lock_free
+        else:
+            self.listener = self._on_msg_received
         self.notifier = can.Notifier(self.bus, [self.listener])
+        self.recorder = None
+        self._filtered_listener = None
 
         print("Virtual CAN bus initialized")
 
     def _on_msg_received(self, msg):
         with self.lock:
             self.rx_buffer.append(msg)
+            self.latest[msg.arbitration_id] = msg
+            if self.history_size:
+                self._append_history(msg)
+
+    def _on_msg_received_lock_free(self, msg):
+        self.rx_buffer.push(msg)
+        self.latest[msg.arbitration_id] = msg
+        if self.history_size:
+            with self.lock:
+                self._append_history(msg)
+
+    def _append_history(self, msg):
+        ring = self.history.get(msg.arbitration_id)
+        if ring is None:
+            ring = self.history[msg.arbitration_id] = deque(maxlen=self.history_size)
+        ring.append(msg)
 
     # ---------- TX ----------
     def send(self, msg: can.Message):
@@ -38,17 +186,72 @@ class CanInterface:
     # ---------- RX ----------
     def get_latest(self, can_id):
         """Get latest message of specific CAN ID"""
+        # Single dict lookup is atomic, no need to take the lock
+        return self.latest.get(can_id)
+
+    def get_history(self, can_id):
+        """Get the last history_size messages of specific CAN ID, oldest first"""
         with self.lock:
-            for msg in reversed(self.rx_buffer):
-                if msg.arbitration_id == can_id:
-                    return msg
-        return None
+            ring = self.history.get(can_id)
+            return list(ring) if ring else []
 
     def get_all(self):
         """Get snapshot of RX buffer"""
+        if self.lock_free:
+            return self.rx_buffer.snapshot()
         with self.lock:
             return list(self.rx_buffer)
 
+    def create_reader(self, from_oldest=False):
+        """
+        Create an incremental consumer of the RX ring (lock_free mode only)
+
+        Each reader keeps its own cursor; reader.read() returns only frames
+        received since its last call and counts overruns when it falls behind.
+        """
+        if not self.lock_free:
+            raise RuntimeError("create_reader requires CanInterface(lock_free=True)")
+        return RingReader(self.rx_buffer, from_oldest)
+
+    # ---------- Recording ----------
+    def start_recording(self, path, payload_size=None, all_traffic=False):
+        """
+        Record received frames to a binary trace file (see can_trace.CanTrace)
+
+        Bus acceptance filters (can_filters) also apply to the recorder, so by
+        default the trace holds only the accepted IDs. With all_traffic=True
+        the bus filters are lifted while recording and applied in software
+        to the RX buffers instead, so the trace holds every frame.
+        """
+        self.stop_recording()
+        if payload_size is None:
+            payload_size = 64 if self.fd else 8
+        _use_flow1()
+        from can_trace import CanTraceWriter
+        self.recorder = CanTraceWriter(path, payload_size=payload_size)
+        self.notifier.add_listener(self.recorder)
+        if all_traffic and self.can_filters:
+            accept = _filter_predicate(self.can_filters)
+            listener = self.listener
+            self._filtered_listener = lambda msg: listener(msg) if accept(msg) else None
+            self.notifier.add_listener(self._filtered_listener)
+            self.notifier.remove_listener(self.listener)
+            self.bus.set_filters(None)
+        return self.recorder
+
+    def stop_recording(self):
+        """Stop recording and close the trace file"""
+        if self._filtered_listener is not None:
+            self.bus.set_filters(self.can_filters)
+            self.notifier.add_listener(self.listener)
+            self.notifier.remove_listener(self._filtered_listener)
+            self._filtered_listener = None
+        if self.recorder is not None:
+            self.notifier.remove_listener(self.recorder)
+            self.recorder.close()
+            self.recorder = None
+
     def shutdown(self):
         self.notifier.stop()
+        self.stop_recording()
         self.bus.shutdown()
@@ -0,0 +1,9 @@
+# conftest.py
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Flow1 modules import each other as top-level modules; can_interface lives at the root
+sys.path.insert(0, os.path.join(ROOT, "Flow1"))
+sys.path.insert(0, ROOT)
@@ -0,0 +1,107 @@
+# test_can_codec.py
+"""Round trips between CANMessageEncoder and the single-frame and batch decoders"""
+import math
+import random
+
+import numpy as np
+import pytest
+
+from can_encoder import CANMessageEncoder
+from can_vss_converter import (
+    CANMessageDefinition,
+    CANSignalDefinition,
+    CANSignalType,
+    CANtoVSSConverter,
+    compile_signal,
+    decode_signal,
+    decode_signal_batch,
+    motorola_lsb,
+)
+
+CAN_ID = 0x321
+
+# name, start_bit, bit_length, type, byte order, scale, offset, test values
+SIGNALS = [
+    ("le_u8", 0, 8, CANSignalType.UINT8, "little_endian", 1, 0, [0, 1, 0x5A, 255]),
+    ("le_u12_cross", 4, 12, CANSignalType.UINT16, "little_endian", 1, 0, [0, 0xABC, 0xFFF]),
+    ("le_s16_cross", 3, 16, CANSignalType.INT16, "little_endian", 1, 0, [-32768, -1, 0, 1234, 32767]),
+    ("le_scaled", 5, 10, CANSignalType.FLOAT, "little_endian", 0.5, -40, [-40.0, 0.0, 471.5]),
+    ("le_bool", 13, 1, CANSignalType.BOOLEAN, "little_endian", 1, 0, [False, True]),
+    ("be_u16", 7, 16, CANSignalType.UINT16, "big_endian", 1, 0, [0, 0x1234, 0xFFFF]),
+    ("be_u12_cross", 3, 12, CANSignalType.UINT16, "big_endian", 1, 0, [0, 0xABC, 0xFFF]),
+    ("be_s10_cross", 2, 10, CANSignalType.INT16, "big_endian", 1, 0, [-512, -3, 0, 511]),
+    ("le_f32_aligned", 0, 32, CANSignalType.FLOAT32, "little_endian", 1, 0, [0.0, -1.5, 3.25e7]),
+    ("le_f32_unaligned", 3, 32, CANSignalType.FLOAT32, "little_endian", 1, 0, [0.0, -1.5, 3.25e7]),
+    ("be_f32_aligned", 7, 32, CANSignalType.FLOAT32, "big_endian", 1, 0, [0.0, -1.5, 3.25e7]),
+    ("be_f32_unaligned", 4, 32, CANSignalType.FLOAT32, "big_endian", 1, 0, [0.0, -1.5, 3.25e7]),
+    ("le_f64_aligned", 0, 64, CANSignalType.FLOAT64, "little_endian", 1, 0, [0.0, -2.0 ** -30, 1e300]),
+    ("be_f64_aligned", 7, 64, CANSignalType.FLOAT64, "big_endian", 1, 0, [0.0, -2.0 ** -30, 1e300]),
+    ("le_f64_unaligned", 4, 64, CANSignalType.FLOAT64, "little_endian", 1, 0, [0.0, -2.0 ** -30, 1e300]),
+]
+
+def _signal(name, start_bit, bit_length, signal_type, byte_order, scale, offset):
+    return CANSignalDefinition(
+        name=name, start_bit=start_bit, bit_length=bit_length, signal_type=signal_type,
+        scale=scale, offset=offset, byte_order=byte_order
+    )
+
+def _setup(spec):
+    name, start_bit, bit_length, signal_type, byte_order, scale, offset, _ = spec
+    signal_def = _signal(name, start_bit, bit_length, signal_type, byte_order, scale, offset)
+    msg_def = CANMessageDefinition(can_id=CAN_ID, name="Test", dlc=16, signals={name: signal_def})
+    converter = CANtoVSSConverter()
+    converter.add_message_definition(msg_def)
+    converter.add_vss_mapping(CAN_ID, name, f"Test.{name}")
+    return signal_def, converter, CANMessageEncoder(converter.message_definitions)
+
+def _same(a, b):
+    return a == b or (isinstance(a, float) and math.isclose(a, b, rel_tol=1e-6))
+
+@pytest.mark.parametrize("spec", SIGNALS, ids=[s[0] for s in SIGNALS])
+def test_encode_then_decode(spec):
+    name, values = spec[0], spec[-1]
+    signal_def, converter, encoder = _setup(spec)
+    compiled = compile_signal(signal_def)
+    for value in values:
+        msg = encoder.encode(CAN_ID, {name: value})
+        assert _same(converter.convert_can_message(msg)[f"Test.{name}"], value)
+        assert _same(decode_signal(bytes(msg.data), compiled), value)
+
+# random payloads include NaN/inf float patterns
+@pytest.mark.filterwarnings("ignore:invalid value encountered in cast:RuntimeWarning")
+@pytest.mark.parametrize("spec", SIGNALS, ids=[s[0] for s in SIGNALS])
+def test_single_frame_and_batch_decode_agree(spec):
+    signal_def, _, _ = _setup(spec)
+    compiled = compile_signal(signal_def)
+    rng = random.Random(spec[0])
+    frames = [bytes(rng.getrandbits(8) for _ in range(16)) for _ in range(200)]
+
+    batch = decode_signal_batch(np.frombuffer(b"".join(frames), dtype=np.uint8).reshape(-1, 16), compiled)
+    for frame, batch_value in zip(frames, batch.tolist()):
+        value = decode_signal(frame, compiled)
+        if isinstance(value, float) and math.isnan(value):
+            assert math.isnan(batch_value)
+        else:
+            assert _same(batch_value, value)
+
+@pytest.mark.parametrize("signal, value, payload", [
+    (("le_u16", 0, 16, CANSignalType.UINT16, "little_endian"), 0x1234, "3412"),
+    (("le_u12", 4, 12, CANSignalType.UINT16, "little_endian"), 0xABC, "c0ab"),
+    (("be_u16", 7, 16, CANSignalType.UINT16, "big_endian"), 0x1234, "1234"),
+    (("be_u12", 3, 12, CANSignalType.UINT16, "big_endian"), 0xABC, "0abc"),
+    (("be_f32", 7, 32, CANSignalType.FLOAT32, "big_endian"), 1.0, "3f800000"),
+    (("le_f32", 0, 32, CANSignalType.FLOAT32, "little_endian"), 1.0, "0000803f"),
+])
+def test_wire_layout(signal, value, payload):
+    name = signal[0]
+    signal_def = _signal(*signal, 1, 0)
+    msg_def = CANMessageDefinition(can_id=CAN_ID, name="Test", dlc=len(payload) // 2, signals={name: signal_def})
+    msg = CANMessageEncoder({CAN_ID: msg_def}).encode(CAN_ID, {name: value})
+    assert bytes(msg.data).hex() == payload
+
+def test_motorola_lsb():
+    # DBC numbering: bit 7 of byte 0 is the first bit on the wire
+    assert motorola_lsb(7, 8) == 7
+    assert motorola_lsb(7, 16) == 15
+    assert motorola_lsb(3, 12) == 15
+    assert motorola_lsb(15, 1) == 8
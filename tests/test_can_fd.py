@@ -0,0 +1,79 @@
+# test_can_fd.py
+"""CAN FD payload lengths and packing classic messages into one FD frame"""
+import can
+import pytest
+
+from can_encoder import CANMessageEncoder
+from can_vss_converter import (
+    CAN_FD_LENGTHS,
+    CANMessageDefinition,
+    CANSignalDefinition,
+    CANSignalType,
+    CANtoVSSConverter,
+    can_fd_length,
+    pack_fd_message,
+)
+
+@pytest.mark.parametrize("size, length", [
+    (0, 0), (1, 1), (8, 8), (9, 12), (12, 12), (13, 16), (21, 24), (33, 48), (49, 64), (64, 64)
+])
+def test_can_fd_length(size, length):
+    assert can_fd_length(size) == length
+    assert length in CAN_FD_LENGTHS
+
+def test_can_fd_length_too_long():
+    with pytest.raises(ValueError):
+        can_fd_length(65)
+
+def _sources():
+    a = CANMessageDefinition(0x110, "A", 8, {
+        "A1": CANSignalDefinition("A1", 0, 8, CANSignalType.UINT8),
+        "A2": CANSignalDefinition("A2", 8, 16, CANSignalType.UINT16),
+    }, cycle_time=100)
+    b = CANMessageDefinition(0x120, "B", 3, {
+        "B1": CANSignalDefinition("B1", 0, 12, CANSignalType.UINT16),
+        "B2": CANSignalDefinition("B2", 23, 8, CANSignalType.INT8, byte_order="big_endian"),
+    }, cycle_time=20)
+    c = CANMessageDefinition(0x130, "C", 2, {
+        "C1": CANSignalDefinition("C1", 0, 16, CANSignalType.INT16),
+    })
+    return [a, b, c]
+
+def test_pack_fd_message_layout():
+    msg_def = pack_fd_message(0x180, "Container", _sources(), bitrate_switch=False)
+
+    assert (msg_def.can_id, msg_def.name) == (0x180, "Container")
+    assert msg_def.dlc == 16  # 8 + 3 + 2 = 13 bytes, next FD length
+    assert msg_def.is_fd and not msg_def.bitrate_switch
+    assert msg_def.cycle_time == 20
+    starts = {name: signal.start_bit for name, signal in msg_def.signals.items()}
+    assert starts == {"A1": 0, "A2": 8, "B1": 64, "B2": 87, "C1": 88}
+
+def test_pack_fd_message_rejects_duplicate_signals():
+    a = _sources()[0]
+    with pytest.raises(ValueError):
+        pack_fd_message(0x180, "Container", [a, a])
+
+def test_pack_fd_message_rejects_more_than_64_bytes():
+    messages = [
+        CANMessageDefinition(0x140 + i, f"M{i}", 8, {f"S{i}": CANSignalDefinition(f"S{i}", 0, 8, CANSignalType.UINT8)})
+        for i in range(9)
+    ]
+    with pytest.raises(ValueError):
+        pack_fd_message(0x180, "Container", messages)
+
+def test_fd_container_round_trip():
+    converter = CANtoVSSConverter()
+    for msg_def in _sources():
+        converter.add_message_definition(msg_def)
+        for name in msg_def.signals:
+            converter.add_vss_mapping(msg_def.can_id, name, f"Fd.{name}")
+    converter.add_fd_container(0x180, "Container", [0x110, 0x120, 0x130])
+
+    values = {"A1": 200, "A2": 0xBEEF, "B1": 0xABC, "B2": -5, "C1": -1234}
+    msg = CANMessageEncoder(converter.message_definitions).encode(0x180, values)
+
+    assert isinstance(msg, can.Message)
+    assert msg.is_fd and msg.bitrate_switch
+    assert len(msg.data) == 16
+    assert converter.convert_can_message(msg) == {f"Fd.{name}": value for name, value in values.items()}
@@ -0,0 +1,92 @@
+# test_can_filters.py
+"""Acceptance filters built from the mapped CAN IDs"""
+import random
+
+import can
+import pytest
+
+from can_interface import _filter_predicate
+from can_vss_converter import (
+    CANMessageDefinition,
+    CANSignalDefinition,
+    CANSignalType,
+    CANtoVSSConverter,
+    build_can_filters,
+)
+
+
+def _accepts(filters, can_id, extended):
+    return any(
+        f["extended"] == extended and not (can_id ^ f["can_id"]) & f["can_mask"]
+        for f in filters
+    )
+
+def test_one_exact_filter_per_id():
+    filters = build_can_filters([0x200, 0x100, 0x100, 0x18FF0001])
+    assert filters == [
+        {"can_id": 0x100, "can_mask": 0x7FF, "extended": False},
+        {"can_id": 0x200, "can_mask": 0x7FF, "extended": False},
+        {"can_id": 0x18FF0001, "can_mask": 0x1FFFFFFF, "extended": True},
+    ]
+
+def test_extended_ids_below_0x7ff():
+    filters = build_can_filters([0x100], extended_ids={0x100})
+    assert filters == [{"can_id": 0x100, "can_mask": 0x1FFFFFFF, "extended": True}]
+
+def test_merge_keeps_common_bits():
+    assert build_can_filters([0x100, 0x101], max_filters=1) == [
+        {"can_id": 0x100, "can_mask": 0x7FE, "extended": False}
+    ]
+
+def test_standard_and_extended_never_merge():
+    filters = build_can_filters([0x100, 0x101, 0x18FF0001], max_filters=1)
+    assert len(filters) == 2
+    assert {f["extended"] for f in filters} == {False, True}
+
+@pytest.mark.parametrize("count, max_filters", [(50, 1), (400, 8), (5000, 16), (5000, 64)])
+def test_max_filters_bound_and_every_id_accepted(count, max_filters):
+    rng = random.Random(count + max_filters)
+    standard = rng.sample(range(0x800), min(count, 0x800) // 2)
+    extended = rng.sample(range(0x800, 0x20000000), count - len(standard))
+    filters = build_can_filters(standard + extended, max_filters)
+
+    # standard and extended IDs always need a filter each
+    assert len(filters) <= max(max_filters, 2)
+    for can_id in standard:
+        assert _accepts(filters, can_id, False)
+    for can_id in extended:
+        assert _accepts(filters, can_id, True)
+
+def test_converter_filters_only_mapped_ids():
+    converter = CANtoVSSConverter()
+    # drop the built-in demo messages
+    converter.message_definitions.clear()
+    converter.can_to_vss_mapping.clear()
+    converter.compile_decode_plans()
+    signal = CANSignalDefinition("S", 0, 8, CANSignalType.UINT8)
+    for can_id in (0x10, 0x20, 0x1ABCDEF):
+        converter.add_message_definition(CANMessageDefinition(can_id, f"M{can_id}", 8, {"S": signal}))
+    converter.add_vss_mapping(0x10, "S", "A.S")
+    converter.add_vss_mapping(0x1ABCDEF, "S", "B.S")
+
+    assert converter.can_filters() == [
+        {"can_id": 0x10, "can_mask": 0x7FF, "extended": False},
+        {"can_id": 0x1ABCDEF, "can_mask": 0x1FFFFFFF, "extended": True},
+    ]
+
+def test_software_filter_matches_bus_semantics():
+    accept = _filter_predicate(build_can_filters([0x100, 0x101, 0x18FF0001], max_filters=2))
+
+    assert accept(can.Message(arbitration_id=0x100, is_extended_id=False))
+    assert accept(can.Message(arbitration_id=0x101, is_extended_id=False))
+    assert not accept(can.Message(arbitration_id=0x102, is_extended_id=False))
+    assert accept(can.Message(arbitration_id=0x18FF0001, is_extended_id=True))
+    # same number, other frame format
+    assert not accept(can.Message(arbitration_id=0x100, is_extended_id=True))
+    assert not accept(can.Message(arbitration_id=0x18FF0002, is_extended_id=True))
+
+def test_software_filter_without_extended_key():
+    accept = _filter_predicate([{"can_id": 0x200, "can_mask": 0x700}])
+    assert accept(can.Message(arbitration_id=0x2AB, is_extended_id=False))
+    assert accept(can.Message(arbitration_id=0x2AB, is_extended_id=True))
+    assert not accept(can.Message(arbitration_id=0x300, is_extended_id=False))
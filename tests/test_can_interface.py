@@ -0,0 +1,70 @@
+# test_can_interface.py
+"""
+Lock-free RX ring: incremental reads and overrun counting
+
+Once the ring is full, the oldest slot is the one the producer writes
+next, so readers never return it: a ring of capacity n yields at most
+n - 1 items per read.
+"""
+from can_interface import RingReader, SpscRing
+
+def test_capacity_rounds_up_to_power_of_two():
+    assert SpscRing(1000).capacity == 1024
+    assert SpscRing(8).capacity == 8
+
+def test_reader_gets_each_item_once():
+    ring = SpscRing(8)
+    reader = RingReader(ring)
+    for i in range(5):
+        ring.push(i)
+    assert reader.read() == [0, 1, 2, 3, 4]
+    assert reader.read() == []
+    ring.push(5)
+    assert reader.read() == [5]
+    assert (reader.overruns, reader.frames_lost) == (0, 0)
+
+def test_overrun_counts_lost_items():
+    ring = SpscRing(8)
+    reader = RingReader(ring)
+    for i in range(20):
+        ring.push(i)
+    # 20 pushed into 8 slots: only the 7 newest are still readable
+    assert reader.read() == list(range(13, 20))
+    assert (reader.overruns, reader.frames_lost) == (1, 13)
+
+    for i in range(20, 30):
+        ring.push(i)
+    assert reader.read() == list(range(23, 30))
+    assert (reader.overruns, reader.frames_lost) == (2, 16)
+
+    ring.push(30)
+    assert reader.read() == [30]
+    assert reader.overruns == 2
+
+def test_readers_are_independent():
+    ring = SpscRing(4)
+    fast, slow = RingReader(ring), RingReader(ring)
+    for i in range(6):
+        ring.push(i)
+        fast.read()
+    assert fast.frames_lost == 0
+    assert slow.read() == [3, 4, 5]
+    assert slow.frames_lost == 3
+
+def test_reader_start_position():
+    ring = SpscRing(4)
+    for i in range(6):
+        ring.push(i)
+    assert RingReader(ring).read() == []
+    oldest = RingReader(ring, from_oldest=True)
+    assert oldest.read() == [3, 4, 5]
+    assert oldest.overruns == 0
+    assert ring.snapshot() == [3, 4, 5]
+
+def test_partly_filled_ring_reads_everything():
+    ring = SpscRing(4)
+    for i in range(3):
+        ring.push(i)
+    reader = RingReader(ring, from_oldest=True)
+    assert reader.read() == [0, 1, 2]
+    assert reader.overruns == 0
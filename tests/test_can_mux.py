@@ -0,0 +1,83 @@
+# test_can_mux.py
+"""Multiplexed messages: page dispatch per frame and masked batch results"""
+import can
+import numpy as np
+
+from can_encoder import CANMessageEncoder
+from can_vss_converter import CANMessageDefinition, CANSignalDefinition, CANSignalType, CANtoVSSConverter
+
+CAN_ID = 0x210
+
+def _converter():
+    signals = {
+        "Page": CANSignalDefinition("Page", 0, 8, CANSignalType.UINT8, multiplexer=True),
+        "Common": CANSignalDefinition("Common", 8, 8, CANSignalType.UINT8),
+        "Temp": CANSignalDefinition("Temp", 16, 8, CANSignalType.INT8, mux_value=1),
+        "Volt": CANSignalDefinition("Volt", 16, 16, CANSignalType.FLOAT, scale=0.01, mux_value=2),
+    }
+    converter = CANtoVSSConverter()
+    converter.add_message_definition(CANMessageDefinition(CAN_ID, "Muxed", 8, signals))
+    for name in signals:
+        converter.add_vss_mapping(CAN_ID, name, f"Mux.{name}")
+    return converter
+
+def _frame(data):
+    return can.Message(arbitration_id=CAN_ID, data=bytes(data).ljust(8, b"\x00"), is_extended_id=False)
+
+def test_page_dispatch():
+    converter = _converter()
+    assert converter.convert_can_message(_frame([1, 7, 0xF6])) == {
+        "Mux.Page": 1, "Mux.Common": 7, "Mux.Temp": -10
+    }
+    assert converter.convert_can_message(_frame([2, 7, 0x10, 0x27])) == {
+        "Mux.Page": 2, "Mux.Common": 7, "Mux.Volt": 100.0
+    }
+
+def test_unknown_page_decodes_common_signals_only():
+    assert _converter().convert_can_message(_frame([9, 7, 0xFF])) == {"Mux.Page": 9, "Mux.Common": 7}
+
+def test_encoder_packs_selected_page():
+    converter = _converter()
+    encoder = CANMessageEncoder(converter.message_definitions)
+    msg = encoder.encode(CAN_ID, {"Page": 2, "Common": 3, "Temp": -1, "Volt": 12.34})
+    assert converter.convert_can_message(msg) == {"Mux.Page": 2, "Mux.Common": 3, "Mux.Volt": 12.34}
+
+def test_frame_matrix_masks_inactive_pages():
+    converter = _converter()
+    matrix = np.array([
+        [1, 10, 0xFE, 0, 0, 0, 0, 0],
+        [2, 11, 0x64, 0, 0, 0, 0, 0],
+        [1, 12, 0x05, 0, 0, 0, 0, 0],
+        [3, 13, 0xFF, 0xFF, 0, 0, 0, 0],
+    ], dtype=np.uint8)
+    arrays = converter.convert_frame_matrix(CAN_ID, matrix)
+
+    assert arrays["Mux.Page"].tolist() == [1, 2, 1, 3]
+    assert arrays["Mux.Common"].tolist() == [10, 11, 12, 13]
+    assert not np.ma.isMaskedArray(arrays["Mux.Common"])
+
+    temp = arrays["Mux.Temp"]
+    assert np.ma.isMaskedArray(temp)
+    assert np.ma.getmaskarray(temp).tolist() == [False, True, False, True]
+    assert temp.compressed().tolist() == [-2, 5]
+    assert temp.dtype == arrays["Mux.Common"].dtype
+
+    volt = arrays["Mux.Volt"]
+    assert np.ma.getmaskarray(volt).tolist() == [True, False, True, True]
+    assert volt.compressed().tolist() == [1.0]
+    assert volt.dtype == np.float64
+
+def test_frame_matrix_matches_single_frames():
+    converter = _converter()
+    rng = np.random.default_rng(1)
+    matrix = rng.integers(0, 256, size=(100, 8), dtype=np.uint8)
+    matrix[:, 0] = rng.integers(0, 4, size=100)
+    arrays = converter.convert_frame_matrix(CAN_ID, matrix)
+
+    for row, data in enumerate(matrix):
+        expected = converter.convert_can_message(_frame(data.tobytes()))
+        for vss_path, values in arrays.items():
+            if np.ma.getmaskarray(values)[row]:
+                assert vss_path not in expected
+            else:
+                assert values[row] == expected[vss_path]
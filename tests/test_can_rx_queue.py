@@ -0,0 +1,53 @@
+# test_can_rx_queue.py
+"""CanRxQueue overflow policies"""
+import can
+import pytest
+
+from can_rx_queue import CanRxQueue, OverflowPolicy
+
+def _frame(can_id, value=0):
+    return can.Message(arbitration_id=can_id, data=[value])
+
+def _ids(frames):
+    return [(msg.arbitration_id, msg.data[0]) for msg in frames]
+
+def test_drop_oldest():
+    queue = CanRxQueue(capacity=3, policy=OverflowPolicy.DROP_OLDEST)
+    results = [queue.put(_frame(i)) for i in range(5)]
+
+    assert results == [True] * 5
+    assert _ids(queue.drain()) == [(2, 0), (3, 0), (4, 0)]
+    stats = queue.get_statistics()
+    assert (stats["received"], stats["dropped"], stats["drained"], stats["high_watermark"]) == (5, 2, 3, 3)
+
+def test_drop_newest():
+    queue = CanRxQueue(capacity=3, policy="drop_newest")
+    results = [queue.put(_frame(i)) for i in range(5)]
+
+    assert results == [True, True, True, False, False]
+    assert _ids(queue.drain()) == [(0, 0), (1, 0), (2, 0)]
+    assert queue.get_statistics()["dropped"] == 2
+
+def test_latest_per_id():
+    queue = CanRxQueue(capacity=2, policy=OverflowPolicy.LATEST_PER_ID)
+    results = [queue.put(frame) for frame in (_frame(1, 1), _frame(2, 1), _frame(1, 2), _frame(3, 1), _frame(2, 2))]
+
+    # 0x3 is a third distinct ID in a 2-ID queue; repeats replace the queued frame in place
+    assert results == [True, True, True, False, True]
+    assert _ids(queue.drain()) == [(1, 2), (2, 2)]
+    stats = queue.get_statistics()
+    assert (stats["coalesced"], stats["dropped"]) == (2, 1)
+
+@pytest.mark.parametrize("policy", list(OverflowPolicy))
+def test_partial_drain_keeps_order(policy):
+    queue = CanRxQueue(capacity=10, policy=policy)
+    for i in range(5):
+        queue(_frame(i))
+    assert _ids(queue.drain(max_items=2)) == [(0, 0), (1, 0)]
+    assert len(queue) == 3
+    assert _ids(queue.drain()) == [(2, 0), (3, 0), (4, 0)]
+    assert len(queue) == 0
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        CanRxQueue(policy="drop_random")
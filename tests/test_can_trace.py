@@ -0,0 +1,130 @@
+# test_can_trace.py
+"""Binary CAN traces: writing, memory-mapped reading, offline decode and replay"""
+import asyncio
+
+import can
+import numpy as np
+import pytest
+
+from can_frame_store import CanFrameStore
+from can_trace import CanTrace, CanTraceWriter, decode_trace, replay_into_converter
+from can_vss_converter import CANMessageDefinition, CANSignalDefinition, CANSignalType, CANtoVSSConverter
+
+SPEED_ID = 0x230
+MUX_ID = 0x231
+
+def _frames():
+    frames = []
+    for i in range(10):
+        frames.append(can.Message(timestamp=0.01 * i, arbitration_id=SPEED_ID, is_extended_id=False,
+                                  data=[i, 0, 0, 0, 0, 0, 0, 0]))
+        frames.append(can.Message(timestamp=0.01 * i + 0.005, arbitration_id=MUX_ID, is_extended_id=False,
+                                  data=[i % 2, 10 + i]))
+    return frames
+
+def _converter():
+    converter = CANtoVSSConverter(publish_on_change=False)
+    converter.add_message_definition(CANMessageDefinition(SPEED_ID, "Speed", 8, {
+        "Speed": CANSignalDefinition("Speed", 0, 8, CANSignalType.FLOAT, scale=0.5),
+    }))
+    converter.add_message_definition(CANMessageDefinition(MUX_ID, "Muxed", 2, {
+        "Page": CANSignalDefinition("Page", 0, 8, CANSignalType.UINT8, multiplexer=True),
+        "Odd": CANSignalDefinition("Odd", 8, 8, CANSignalType.UINT8, mux_value=1),
+    }))
+    converter.add_vss_mapping(SPEED_ID, "Speed", "T.Speed")
+    converter.add_vss_mapping(MUX_ID, "Odd", "T.Odd")
+    return converter
+
+@pytest.fixture
+def trace_path(tmp_path):
+    path = str(tmp_path / "bus.trc")
+    with CanTraceWriter(path, buffer_frames=3) as writer:
+        for msg in _frames():
+            writer(msg)
+    return path
+
+def test_write_and_read_back(trace_path):
+    trace = CanTrace(trace_path)
+    assert isinstance(trace.records, np.memmap)
+    assert len(trace) == 20
+    for original, read in zip(_frames(), trace):
+        assert read.arbitration_id == original.arbitration_id
+        assert read.timestamp == original.timestamp
+        assert bytes(read.data) == bytes(original.data)
+        assert read.dlc == original.dlc
+
+def test_flags_round_trip(tmp_path):
+    path = str(tmp_path / "flags.trc")
+    with CanTraceWriter(path, payload_size=64) as writer:
+        writer(can.Message(arbitration_id=0x18FF0001, is_extended_id=True, is_fd=True,
+                           bitrate_switch=True, data=bytes(range(12))))
+        writer(can.Message(arbitration_id=0x10, is_extended_id=False, is_remote_frame=True, dlc=4))
+    fd, remote = CanTrace(path)
+    assert (fd.is_extended_id, fd.is_fd, fd.bitrate_switch, fd.dlc) == (True, True, True, 12)
+    assert bytes(fd.data) == bytes(range(12))
+    assert remote.is_remote_frame and remote.dlc == 4 and not remote.data
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        CanTrace(str(path))
+
+def test_empty_trace(tmp_path):
+    path = str(tmp_path / "empty.trc")
+    CanTraceWriter(path).close()
+    assert len(CanTrace(path)) == 0
+
+def test_write_store(tmp_path):
+    store = CanFrameStore(capacity=4)
+    frames = _frames()[:6]
+    for msg in frames:
+        store.append(msg)
+    path = str(tmp_path / "store.trc")
+    with CanTraceWriter(path) as writer:
+        writer.write_store(store)
+    # capacity 4: the two oldest frames were overwritten in the store
+    assert [bytes(m.data) for m in CanTrace(path)] == [bytes(m.data) for m in frames[2:]]
+
+def test_payload_longer_than_trace_rows(tmp_path):
+    path = str(tmp_path / "short.trc")
+    with CanTraceWriter(path) as writer:
+        writer(can.Message(arbitration_id=0x10, is_fd=True, data=bytes(range(16))))
+    assert writer.truncated == 1
+    msg, = CanTrace(path)
+    assert msg.dlc == 8 and bytes(msg.data) == bytes(range(8))
+
+def test_decode_trace(trace_path):
+    decoded = decode_trace(trace_path, _converter())
+
+    timestamps, speeds = decoded["T.Speed"]
+    assert speeds.tolist() == [0.5 * i for i in range(10)]
+    assert timestamps.tolist() == [0.01 * i for i in range(10)]
+
+    # only frames on mux page 1 carry T.Odd
+    timestamps, odd = decoded["T.Odd"]
+    assert odd.tolist() == [11, 13, 15, 17, 19]
+    assert timestamps.tolist() == [0.01 * i + 0.005 for i in (1, 3, 5, 7, 9)]
+
+def _replay(trace_path, speed, chunk_size=4096):
+    converter = _converter()
+    sent = []
+    converter.vss_client = object()  # only checked for truthiness
+    converter.writer.submit = sent.append
+    count = asyncio.run(replay_into_converter(trace_path, converter, speed=speed, chunk_size=chunk_size))
+    return count, sent
+
+@pytest.mark.parametrize("chunk_size", [3, 4096])
+def test_replay_unpaced_matches_frame_by_frame(trace_path, chunk_size):
+    expected = [values for values in map(_converter().convert_can_message, _frames()) if values]
+    count, sent = _replay(trace_path, None, chunk_size)
+    assert count == 20
+    assert sent == expected
+    assert {"T.Odd": 10} not in sent  # page 0 frames publish nothing
+
+def test_replay_paced(trace_path):
+    count, sent = _replay(trace_path, 100.0)
+    assert count == 20
+    assert sent[0] == {"T.Speed": 0.0}
+    assert sent[-1] == {"T.Odd": 19}
+    assert len(sent) == 15
@@ -0,0 +1,115 @@
+# test_dbc_loader.py
+"""DBC parsing and the pre-parsed cache"""
+import os
+
+import pytest
+
+import dbc_loader
+from can_vss_converter import CANSignalType
+from dbc_loader import load_dbc, parse_dbc
+
+DBC = '''VERSION ""
+
+BO_ 256 Lights: 8 BCM
+ SG_ HeadlampStatus : 0|8@1+ (1,0) [0|0] "" Vector__XXX
+ SG_ Power : 8|16@1+ (0.1,-10) [-10|500] "W" Vector__XXX
+ SG_ Speed : 31|16@0- (0.5,0) [0|0] "km/h" Vector__XXX
+
+BO_ 2566848513 Extended: 8 ECU
+ SG_ Ratio : 0|32@1- (1,0) [0|0] "" Vector__XXX
+
+BO_ 512 Muxed: 8 ECU
+ SG_ Page M : 0|8@1+ (1,0) [0|0] "" Vector__XXX
+ SG_ Common : 8|8@1+ (1,0) [0|0] "" Vector__XXX
+ SG_ Temp m1 : 16|8@1- (1,-40) [0|0] "degC" Vector__XXX
+ SG_ Volt m2M : 16|16@1+ (0.01,0) [0|0] "V" Vector__XXX
+
+BO_ 768 Fd: 64 ECU
+ SG_ Blob : 0|64@1+ (1,0) [0|0] "" Vector__XXX
+
+CM_ BO_ 256 "Front lights";
+CM_ SG_ 256 Power "Lamp power";
+BA_ "GenMsgCycleTime" BO_ 256 50;
+BA_ "VFrameFormat" BO_ 768 14;
+BA_ "CANFD_BRS" BO_ 768 0;
+SIG_VALTYPE_ 2566848513 Ratio : 1;
+'''
+
+@pytest.fixture
+def dbc_path(tmp_path):
+    path = tmp_path / "vehicle.dbc"
+    path.write_text(DBC)
+    return str(path)
+
+def test_messages_and_signals():
+    messages = parse_dbc(DBC)
+    assert sorted(messages) == [0x100, 0x200, 0x300, 0x18FF0001]
+
+    lights = messages[0x100]
+    assert (lights.name, lights.dlc, lights.cycle_time, lights.description) == ("Lights", 8, 50, "Front lights")
+    assert not lights.is_extended and not lights.is_fd
+
+    power = lights.signals["Power"]
+    assert (power.start_bit, power.bit_length, power.signal_type) == (8, 16, CANSignalType.UINT16)
+    assert (power.scale, power.offset, power.min_val, power.max_val) == (0.1, -10, -10, 500)
+    assert (power.unit, power.description) == ("W", "Lamp power")
+
+    status = lights.signals["HeadlampStatus"]
+    assert status.min_val is None and status.max_val is None  # [0|0] is unbounded
+
+    speed = lights.signals["Speed"]
+    assert speed.byte_order == "big_endian"
+    assert speed.signal_type == CANSignalType.INT16
+
+def test_extended_id_and_float_signal():
+    msg_def = parse_dbc(DBC)[0x18FF0001]
+    assert msg_def.is_extended
+    assert msg_def.signals["Ratio"].signal_type == CANSignalType.FLOAT32
+
+def test_multiplexed_signals():
+    signals = parse_dbc(DBC)[0x200].signals
+    assert signals["Page"].multiplexer and signals["Page"].mux_value is None
+    assert signals["Common"].mux_value is None
+    assert signals["Temp"].mux_value == 1
+    assert signals["Volt"].mux_value == 2
+
+def test_fd_attributes():
+    msg_def = parse_dbc(DBC)[0x300]
+    assert msg_def.is_fd
+    assert not msg_def.bitrate_switch
+
+def test_standard_and_extended_id_collision():
+    text = 'BO_ 256 A: 8 X\nBO_ 2147483904 B: 8 X\n'
+    with pytest.raises(ValueError, match="0x100"):
+        parse_dbc(text)
+
+def test_cache_round_trip(dbc_path, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    parsed = load_dbc(dbc_path, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 1
+    cached = load_dbc(dbc_path, cache_dir=cache_dir)
+    assert cached == parsed
+
+def test_cache_is_used(dbc_path, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    load_dbc(dbc_path, cache_dir=cache_dir)
+
+    def fail(text):
+        raise AssertionError("cached DBC parsed again")
+    monkeypatch.setattr(dbc_loader, "parse_dbc", fail)
+    assert 0x100 in load_dbc(dbc_path, cache_dir=cache_dir)
+
+def test_cache_keyed_by_content(dbc_path, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    load_dbc(dbc_path, cache_dir=cache_dir)
+    with open(dbc_path, "a") as f:
+        f.write('\nBO_ 1024 Added: 2 ECU\n SG_ Flag : 0|1@1+ (1,0) [0|0] "" Vector__XXX\n')
+    assert 0x400 in load_dbc(dbc_path, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 2
+
+def test_corrupt_cache_is_reparsed(dbc_path, tmp_path):
+    cache_dir = tmp_path / "cache"
+    load_dbc(dbc_path, cache_dir=str(cache_dir))
+    for entry in cache_dir.iterdir():
+        entry.write_bytes(b"not marshal data")
+    assert sorted(load_dbc(dbc_path, cache_dir=str(cache_dir))) == [0x100, 0x200, 0x300, 0x18FF0001]
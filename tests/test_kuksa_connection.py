@@ -0,0 +1,196 @@
+# test_kuksa_connection.py
+"""Connection-error classification, holding values and reconnecting"""
+import asyncio
+
+import pytest
+
+import kuksa_connection
+from kuksa_connection import KuksaConnection, is_connection_error
+
+
+class FakeClient:
+    """Stands in for VSSClient; each class attribute is shared by all instances"""
+    refuse_connect = 0  # number of connect attempts to fail
+    errors = []  # exceptions raised by the next set_current_values calls
+    sent = []
+
+    def __init__(self, host=None, port=None):
+        pass
+
+    async def __aenter__(self):
+        if FakeClient.refuse_connect:
+            FakeClient.refuse_connect -= 1
+            raise ConnectionRefusedError("refused")
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def set_current_values(self, updates):
+        if FakeClient.errors:
+            raise FakeClient.errors.pop(0)
+        FakeClient.sent.append(dict(updates))
+
+
+class StatusCode:
+    def __init__(self, number):
+        self.value = (number, "STATUS")
+
+class RpcError(Exception):
+    def __init__(self, number):
+        super().__init__(number)
+        self._code = StatusCode(number)
+
+    def code(self):
+        return self._code
+
+class VSSClientError(Exception):
+    def __init__(self, number):
+        super().__init__(number)
+        self.error = {"code": number, "reason": "test", "message": ""}
+
+
+@pytest.fixture(autouse=True)
+def fake_client(monkeypatch):
+    monkeypatch.setattr(kuksa_connection, "VSSClient", FakeClient)
+    FakeClient.refuse_connect = 0
+    FakeClient.errors = []
+    FakeClient.sent = []
+
+def _run(coro):
+    return asyncio.run(coro)
+
+async def _settle(connection):
+    """Let the background reconnect loop finish"""
+    for _ in range(200):
+        task = connection._reconnect_task
+        if task is None or task.done():
+            return
+        await asyncio.sleep(0.005)
+    raise AssertionError("reconnect did not finish")
+
+@pytest.mark.parametrize("exc, expected", [
+    (ConnectionResetError(), True),
+    (OSError(), True),
+    (asyncio.TimeoutError(), True),
+    (RpcError(14), True),  # UNAVAILABLE
+    (RpcError(4), True),  # DEADLINE_EXCEEDED
+    (RpcError(1), True),  # CANCELLED
+    (RpcError(3), False),  # INVALID_ARGUMENT
+    (RpcError(5), False),  # NOT_FOUND
+    (VSSClientError(14), True),
+    (VSSClientError(404), False),
+    (ValueError("bad datapoint"), False),
+])
+def test_is_connection_error(exc, expected):
+    assert is_connection_error(exc) is expected
+
+def test_write_while_connected():
+    async def main():
+        connection = KuksaConnection()
+        assert await connection.connect()
+        await connection.set_current_values({"A": 1})
+        await connection.close()
+        return connection.stats
+    stats = _run(main())
+    assert FakeClient.sent == [{"A": 1}]
+    assert stats["writes"] == 1
+
+def test_rejected_values_keep_the_connection():
+    async def main():
+        connection = KuksaConnection()
+        await connection.connect()
+        FakeClient.errors = [RpcError(3)]
+        await connection.set_current_values({"A": 1, "B": 2})
+        connected = connection.connected
+        await connection.close()
+        return connected, connection.stats
+    connected, stats = _run(main())
+    assert connected
+    assert (stats["rejected"], stats["disconnects"], stats["buffered"]) == (2, 0, 0)
+
+def test_connection_error_holds_and_reconnects():
+    async def main():
+        connection = KuksaConnection(backoff_initial=0.001)
+        await connection.connect()
+        FakeClient.errors = [RpcError(14)]
+        await connection.set_current_values({"A": 1})
+        assert not connection.connected
+        # newer value for the same path replaces the held one
+        await connection.set_current_values({"A": 2, "B": 3})
+        await _settle(connection)
+        connected = connection.connected
+        await connection.close()
+        return connected, connection.stats
+    connected, stats = _run(main())
+    assert connected
+    assert FakeClient.sent == [{"A": 2, "B": 3}]
+    assert (stats["connects"], stats["disconnects"], stats["dropped"]) == (2, 1, 0)
+
+def test_initial_connect_retries_in_background():
+    FakeClient.refuse_connect = 3
+    async def main():
+        connection = KuksaConnection(backoff_initial=0.001)
+        assert not await connection.connect()
+        await connection.set_current_values({"A": 1})
+        await _settle(connection)
+        await connection.close()
+        return connection.stats
+    stats = _run(main())
+    assert FakeClient.sent == [{"A": 1}]
+    assert stats["connects"] == 1
+
+def test_failed_flush_after_reconnect_is_retried():
+    async def main():
+        connection = KuksaConnection(backoff_initial=0.001)
+        await connection.connect()
+        # the write fails, then the flush right after reconnecting fails too
+        FakeClient.errors = [ConnectionResetError(), ConnectionResetError()]
+        await connection.set_current_values({"A": 1})
+        await _settle(connection)
+        await connection.close()
+        return connection.stats
+    stats = _run(main())
+    assert FakeClient.sent == [{"A": 1}]
+    assert (stats["connects"], stats["disconnects"], stats["dropped"]) == (3, 2, 0)
+
+def test_rejected_flush_is_not_retried():
+    async def main():
+        connection = KuksaConnection(backoff_initial=0.001)
+        await connection.connect()
+        FakeClient.errors = [ConnectionResetError(), VSSClientError(400)]
+        await connection.set_current_values({"A": 1})
+        await _settle(connection)
+        connected = connection.connected
+        await connection.close()
+        return connected, connection.stats
+    connected, stats = _run(main())
+    assert connected
+    assert FakeClient.sent == []
+    assert (stats["rejected"], stats["connects"]) == (1, 2)
+
+def test_hold_buffer_limit():
+    FakeClient.refuse_connect = 1000
+    async def main():
+        connection = KuksaConnection(backoff_initial=10, buffer_size=2)
+        await connection.connect()
+        await connection.set_current_values({"A": 1, "B": 2, "C": 3})
+        await connection.set_current_values({"A": 4})
+        held = dict(connection.buffer)
+        await connection.close()
+        return held, connection.stats
+    held, stats = _run(main())
+    assert held == {"A": 4, "B": 2}
+    # C was over the limit; A and B were still held when closing
+    assert stats["dropped"] == 3
+
+def test_close_flushes_held_values_while_connected():
+    async def main():
+        connection = KuksaConnection()
+        await connection.connect()
+        connection.buffer = {"A": 1}
+        await connection.close()
+        return connection.stats
+    stats = _run(main())
+    assert FakeClient.sent == [{"A": 1}]
+    assert stats["dropped"] == 0
@@ -0,0 +1,97 @@
+# test_publish_on_change.py
+"""Deadband suppression and max_silence heartbeats of CANtoVSSConverter"""
+import pytest
+
+from can_vss_converter import CANMessageDefinition, CANSignalDefinition, CANSignalType, CANtoVSSConverter
+
+CAN_ID = 0x220
+
+@pytest.fixture
+def converter():
+    signals = {
+        "Abs": CANSignalDefinition("Abs", 0, 16, CANSignalType.UINT16, deadband=5, max_silence=0),
+        "Rel": CANSignalDefinition("Rel", 16, 16, CANSignalType.UINT16, deadband_rel=0.1, max_silence=0),
+        "Beat": CANSignalDefinition("Beat", 32, 8, CANSignalType.UINT8, max_silence=2.0),
+        "Flag": CANSignalDefinition("Flag", 40, 1, CANSignalType.BOOLEAN, deadband=5, max_silence=0),
+    }
+    converter = CANtoVSSConverter(publish_on_change=True, max_silence=10.0)
+    converter.add_message_definition(CANMessageDefinition(CAN_ID, "Publish", 8, signals))
+    for name in signals:
+        converter.add_vss_mapping(CAN_ID, name, f"P.{name}")
+    return converter
+
+def _age(converter, seconds):
+    """Pretend every value was last published seconds earlier"""
+    for vss_path, (value, last_time) in converter.last_published.items():
+        converter.last_published[vss_path] = (value, last_time - seconds)
+
+def test_first_value_always_passes(converter):
+    values = {"P.Abs": 1, "P.Rel": 1, "P.Beat": 1, "P.Flag": False}
+    assert converter.filter_changes(values) == values
+
+def test_absolute_deadband(converter):
+    converter.filter_changes({"P.Abs": 100})
+    assert converter.filter_changes({"P.Abs": 105}) == {}
+    assert converter.filter_changes({"P.Abs": 95}) == {}
+    assert converter.filter_changes({"P.Abs": 106}) == {"P.Abs": 106}
+    # measured from the last published value, not the last seen one
+    assert converter.filter_changes({"P.Abs": 102}) == {}
+    assert converter.filter_changes({"P.Abs": 100}) == {"P.Abs": 100}
+
+def test_relative_deadband(converter):
+    converter.filter_changes({"P.Rel": 1000})
+    assert converter.filter_changes({"P.Rel": 1100}) == {}
+    assert converter.filter_changes({"P.Rel": 1101}) == {"P.Rel": 1101}
+
+def test_booleans_ignore_deadband(converter):
+    converter.filter_changes({"P.Flag": False})
+    assert converter.filter_changes({"P.Flag": False}) == {}
+    assert converter.filter_changes({"P.Flag": True}) == {"P.Flag": True}
+
+def test_suppressed_values_are_counted(converter):
+    converter.filter_changes({"P.Abs": 1, "P.Beat": 1})
+    converter.filter_changes({"P.Abs": 2, "P.Beat": 1})
+    assert converter.get_statistics()["signals_suppressed"] == 2
+
+def test_max_silence_lets_unchanged_value_through(converter):
+    converter.filter_changes({"P.Beat": 7, "P.Abs": 7})
+    assert converter.filter_changes({"P.Beat": 7, "P.Abs": 7}) == {}
+    _age(converter, 2.0)
+    # P.Abs has max_silence=0: no heartbeat
+    assert converter.filter_changes({"P.Beat": 7, "P.Abs": 7}) == {"P.Beat": 7}
+
+def test_republish_silent_without_frames(converter):
+    sent = []
+    converter.vss_client = object()  # only checked for truthiness
+    converter.writer.submit = sent.append
+
+    converter.filter_changes({"P.Beat": 3, "P.Abs": 4})
+    assert converter.republish_silent() == 0
+    _age(converter, 2.0)
+    assert converter.republish_silent() == 1
+    assert sent == [{"P.Beat": 3}]
+    # the heartbeat restarts the silence timer
+    assert converter.republish_silent() == 0
+
+def test_republish_silent_needs_connection(converter):
+    converter.filter_changes({"P.Beat": 3})
+    _age(converter, 2.0)
+    assert converter.republish_silent() == 0
+
+def test_remapping_drops_stale_deadbands(converter):
+    converter.filter_changes({"P.Abs": 100, "P.Beat": 1})
+    converter.can_to_vss_mapping[CAN_ID] = {"Abs": "P.Other"}
+    converter.compile_decode_plans()
+
+    assert "P.Abs" not in converter.last_published
+    assert "P.Beat" not in converter.last_published
+
+def test_redefined_message_drops_removed_signals(converter):
+    converter.filter_changes({"P.Abs": 100, "P.Beat": 1})
+    beat = converter.message_definitions[CAN_ID].signals["Beat"]
+    converter.add_message_definition(CANMessageDefinition(CAN_ID, "Publish", 8, {"Beat": beat}))
+
+    assert set(converter.last_published) == {"P.Beat"}
+    # the removed signal's deadband no longer applies to its old path
+    assert converter.filter_changes({"P.Abs": 100}) == {"P.Abs": 100}
+    assert converter.filter_changes({"P.Abs": 101}) == {"P.Abs": 101}